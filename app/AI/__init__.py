@@ -1,10 +1,25 @@
 # Make ai directory a Python package
-from .sentiment import analyze_sentiment, analyze_sentiment_advanced, analyze_emotion_trends
+from .sentiment import analyze_sentiment, analyze_sentiment_advanced, analyze_sentiment_batch, analyze_emotion_trends
 from .summarizer import generate_weekly_summary
+from .cache import analysis_cache, analyze_sentiment_cached, analyze_sentiment_batch_cached
 
 __all__ = [
     "analyze_sentiment", 
     "analyze_sentiment_advanced", 
+    "analyze_sentiment_batch",
     "analyze_emotion_trends",
-    "generate_weekly_summary"
-]
\ No newline at end of file
+    "generate_weekly_summary",
+    "analysis_cache",
+    "analyze_sentiment_cached",
+    "analyze_sentiment_batch_cached",
+    "cohort_trends",
+    "rolling_sentiment"
+]
+
+
+def __getattr__(name):
+    # app.AI.cohort needs NumPy, which the API doesn't import at start-up
+    if name in ("cohort_trends", "rolling_sentiment"):
+        from . import cohort
+        return getattr(cohort, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,200 @@
+"""
+Content-hash cache in front of analyze_sentiment_advanced.
+
+Keys are the SHA-256 of the analyzer version plus the text, so identical
+entries are only analyzed once. The analyzer version is a fingerprint of the
+emotion lexicon, the label thresholds and the TextBlob version. It is only
+recomputed when sentiment.configure_analyzer() has changed them (every key
+compares sentiment.analyzer_revision, an int), which moves every key to the
+new version and so invalidates old results automatically.
+
+There is always a bounded in-memory LRU tier. Set MINDMATE_ANALYSIS_CACHE_PATH
+to also keep results in a SQLite file that survives restarts.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from importlib.metadata import version as package_version
+from typing import Iterable, List, Optional
+from ..utils.cache import LRUCache
+from . import sentiment
+
+ANALYSIS_CACHE_SIZE = int(os.getenv("MINDMATE_ANALYSIS_CACHE_SIZE", "2048"))
+ANALYSIS_CACHE_PATH = os.getenv("MINDMATE_ANALYSIS_CACHE_PATH")
+
+# The TextBlob release decides the polarity lexicon
+TEXTBLOB_VERSION = package_version("textblob")
+
+
+def analyzer_version() -> str:
+    """Fingerprint of everything that affects analyze_sentiment_advanced output"""
+    settings = {
+        "textblob": TEXTBLOB_VERSION,
+        "emotion_keywords": sentiment.EMOTION_KEYWORDS,
+        "whole_words": sentiment.EMOTION_MATCH_WHOLE_WORDS,
+        "thresholds": sentiment.SENTIMENT_THRESHOLDS,
+        "lowest_label": sentiment.LOWEST_SENTIMENT_LABEL,
+    }
+    encoded = json.dumps(settings, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+class AnalysisCache:
+    def __init__(self, maxsize: int = ANALYSIS_CACHE_SIZE, path: Optional[str] = ANALYSIS_CACHE_PATH):
+        self.memory = LRUCache(maxsize)
+        self.path = path
+        self.disk_hits = 0
+        self._conn = None
+        self._lock = threading.Lock()
+        self._revision = sentiment.analyzer_revision
+        self._set_version(analyzer_version())
+
+    # ----- keys and versioning -----
+
+    def _set_version(self, version: str):
+        self.version = version
+        # Hash state after the version prefix, key() only adds the text
+        self._key_prefix = hashlib.sha256(version.encode("utf-8") + b"\0")
+
+    def reload(self) -> bool:
+        """
+        Fingerprint the analyzer again (key() does when analyzer_revision
+        moved). A new version drops the in-memory results and the stored ones
+        of other versions; returns whether the version changed
+        """
+        self._revision = sentiment.analyzer_revision
+        version = analyzer_version()
+        if version == self.version:
+            return False
+        self._set_version(version)
+        self.memory.clear()
+        self._purge_old_versions()
+        return True
+
+    def key(self, text: str) -> str:
+        if self._revision != sentiment.analyzer_revision:
+            self.reload()
+        digest = self._key_prefix.copy()
+        digest.update(text.encode("utf-8"))
+        return digest.hexdigest()
+
+    # ----- persistent tier -----
+
+    def _disk(self) -> Optional[sqlite3.Connection]:
+        if not self.path:
+            return None
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_cache ("
+                "key TEXT PRIMARY KEY, version TEXT NOT NULL, result TEXT NOT NULL, created_at REAL)"
+            )
+            # Results of an older analyzer can never be hit again
+            self._conn.execute("DELETE FROM analysis_cache WHERE version != ?", (self.version,))
+            self._conn.commit()
+        return self._conn
+
+    def _purge_old_versions(self):
+        with self._lock:
+            conn = self._disk()
+            if conn is not None:
+                conn.execute("DELETE FROM analysis_cache WHERE version != ?", (self.version,))
+                conn.commit()
+
+    def _disk_get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            conn = self._disk()
+            if conn is None:
+                return None
+            row = conn.execute("SELECT result FROM analysis_cache WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _disk_set_many(self, items: List[tuple]):
+        with self._lock:
+            conn = self._disk()
+            if conn is None:
+                return
+            now = time.time()
+            conn.executemany(
+                "INSERT OR REPLACE INTO analysis_cache (key, version, result, created_at) VALUES (?, ?, ?, ?)",
+                [(key, self.version, json.dumps(result), now) for key, result in items]
+            )
+            conn.commit()
+
+    # ----- lookups -----
+
+    def get(self, text: str) -> Optional[dict]:
+        key = self.key(text)
+        result = self.memory.get(key)
+        if result is None:
+            result = self._disk_get(key)
+            if result is not None:
+                self.disk_hits += 1
+                self.memory.set(key, result)
+        return sentiment._copy_result(result) if result is not None else None
+
+    def set_many(self, texts: List[str], results: List[dict]):
+        items = [(self.key(text), result) for text, result in zip(texts, results)]
+        for key, result in items:
+            self.memory.set(key, sentiment._copy_result(result))
+        self._disk_set_many(items)
+
+    def analyze(self, text: str) -> dict:
+        result = self.get(text)
+        if result is None:
+            result = sentiment.analyze_sentiment_advanced(text)
+            self.set_many([text], [result])
+        return result
+
+    def analyze_batch(self, texts: Iterable[str], workers: Optional[int] = None) -> List[dict]:
+        texts = list(texts)
+        results = [self.get(text) for text in texts]
+        missing = list(dict.fromkeys(t for t, r in zip(texts, results) if r is None))
+        if missing:
+            fresh = sentiment.analyze_sentiment_batch(missing, workers=workers)
+            self.set_many(missing, fresh)
+            by_text = dict(zip(missing, fresh))
+            results = [
+                r if r is not None else sentiment._copy_result(by_text[t])
+                for t, r in zip(texts, results)
+            ]
+        return results
+
+    def clear(self):
+        self.memory.clear()
+        with self._lock:
+            conn = self._disk()
+            if conn is not None:
+                conn.execute("DELETE FROM analysis_cache")
+                conn.commit()
+
+    def stats(self) -> dict:
+        stats = self.memory.stats()
+        # Memory misses that the disk tier answered are not real misses
+        hits = stats["hits"] + self.disk_hits
+        misses = stats["misses"] - self.disk_hits
+        stats.update({
+            "hits": hits,
+            "misses": misses,
+            "disk_hits": self.disk_hits,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+        })
+        stats["persistent"] = bool(self.path)
+        stats["version"] = self.version
+        return stats
+
+
+analysis_cache = AnalysisCache()
+
+
+def analyze_sentiment_cached(text: str) -> dict:
+    """analyze_sentiment_advanced, answered from the cache when possible"""
+    return analysis_cache.analyze(text)
+
+
+def analyze_sentiment_batch_cached(texts: Iterable[str], workers: Optional[int] = None) -> List[dict]:
+    """analyze_sentiment_batch, only analyzing texts that are not cached yet"""
+    return analysis_cache.analyze_batch(texts, workers=workers)
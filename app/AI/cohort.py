@@ -0,0 +1,135 @@
+"""
+Vectorized trend analytics for many users at once (clinician and cohort
+dashboards).
+
+Inputs are columnar arrays with one element (or row) per entry, in any
+order: user ids, timestamps (datetime64 or epoch seconds), sentiment scores
+and an (n, 8) emotion matrix in EMOTIONS column order, with NaN rows for
+entries that have no emotion scores. Everything is computed with grouped
+NumPy operations (sort once, then reduceat / cumulative sums over the user
+groups), never with a Python loop over users or entries.
+
+Per user, average_sentiment, trend and dominant_emotion match
+analyze_emotion_trends on that user's entries in time order.
+"""
+from typing import Dict, Optional
+import numpy as np
+from .sentiment import EMOTIONS
+
+# Entries in the "recent" average that trend compares with the overall one,
+# as in analyze_emotion_trends
+RECENT_ENTRIES = 3
+TREND_THRESHOLD = 0.1
+
+
+def _as_days(timestamps) -> np.ndarray:
+    """Timestamps as float days (datetime64, or numbers taken as epoch seconds)"""
+    timestamps = np.asarray(timestamps)
+    if np.issubdtype(timestamps.dtype, np.datetime64):
+        return timestamps.astype("datetime64[ms]").astype(np.float64) / 86_400_000.0
+    return timestamps.astype(np.float64) / 86_400.0
+
+
+def _groups(user_ids, timestamps):
+    """Sort order by (user, time), group start offsets, group sizes and user ids"""
+    user_ids = np.asarray(user_ids)
+    days = _as_days(timestamps)
+    order = np.lexsort((days, user_ids))
+    sorted_users = user_ids[order]
+    if len(sorted_users) == 0:
+        return order, days[order], np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp), sorted_users
+    starts = np.flatnonzero(np.r_[True, sorted_users[1:] != sorted_users[:-1]])
+    counts = np.diff(np.r_[starts, len(sorted_users)])
+    return order, days[order], starts, counts, sorted_users[starts]
+
+
+def _window_means(values: np.ndarray, group_starts: np.ndarray, ends: np.ndarray, sizes: np.ndarray) -> np.ndarray:
+    """Means of values[max(end - size, group_start):end] for each end, from one cumulative sum"""
+    cumulative = np.r_[0.0, np.cumsum(values)]
+    begins = np.maximum(ends - sizes, group_starts)
+    return (cumulative[ends] - cumulative[begins]) / (ends - begins)
+
+
+def rolling_sentiment(user_ids, timestamps, sentiment, window: int = 7) -> np.ndarray:
+    """
+    Trailing mean of each entry's last `window` entries (itself included) by
+    the same user, aligned with the input order
+    """
+    order, _, starts, counts, _ = _groups(user_ids, timestamps)
+    scores = np.asarray(sentiment, dtype=np.float64)[order]
+    ends = np.arange(1, len(scores) + 1)
+    group_starts = np.repeat(starts, counts)
+    rolling = np.empty(len(scores))
+    rolling[order] = _window_means(scores, group_starts, ends, window)
+    return rolling
+
+
+def cohort_trends(user_ids, timestamps, sentiment, emotions: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Per-user trend statistics, one array element per user (sorted by id):
+
+    - entry_count, average_sentiment
+    - recent_sentiment: mean of the last RECENT_ENTRIES entries (the last
+      entry only for users with two, as analyze_emotion_trends does)
+    - trend: "improving" / "declining" / "stable" / "insufficient_data"
+    - slope_per_day: least-squares slope of sentiment over time (NaN with
+      fewer than two distinct timestamps)
+    - volatility: standard deviation of sentiment
+    - dominant_emotion: emotion with the highest total ("neutral" when no
+      entry has emotion scores)
+    """
+    order, days, starts, counts, users = _groups(user_ids, timestamps)
+    scores = np.asarray(sentiment, dtype=np.float64)[order]
+    if len(scores) == 0:
+        empty = np.zeros(0)
+        return {
+            "user_id": users, "entry_count": counts, "average_sentiment": empty, "recent_sentiment": empty,
+            "trend": np.zeros(0, dtype=object), "slope_per_day": empty, "volatility": empty,
+            "dominant_emotion": np.zeros(0, dtype=object),
+        }
+
+    average = np.add.reduceat(scores, starts) / counts
+    ends = starts + counts
+    recent_sizes = np.where(counts >= RECENT_ENTRIES, RECENT_ENTRIES, 1)
+    # Gathered rather than from a cumulative sum, which drifts over long
+    # histories and could flip a trend that sits on the threshold
+    offsets = np.arange(RECENT_ENTRIES)
+    recent_rows = scores[np.maximum(ends[:, None] - recent_sizes[:, None] + offsets, 0)]
+    recent = np.where(offsets < recent_sizes[:, None], recent_rows, 0.0).sum(axis=1) / recent_sizes
+    trend = np.select(
+        [counts < 2, recent > average + TREND_THRESHOLD, recent < average - TREND_THRESHOLD],
+        ["insufficient_data", "improving", "declining"],
+        default="stable"
+    ).astype(object)
+
+    # Deviations from the group means keep the sums small and well conditioned
+    day_means = np.add.reduceat(days, starts) / counts
+    day_deviation = days - np.repeat(day_means, counts)
+    score_deviation = scores - np.repeat(average, counts)
+    covariance = np.add.reduceat(day_deviation * score_deviation, starts)
+    day_variance = np.add.reduceat(day_deviation * day_deviation, starts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.where(day_variance > 0, covariance / day_variance, np.nan)
+    volatility = np.sqrt(np.add.reduceat(score_deviation * score_deviation, starts) / counts)
+
+    names = np.array(EMOTIONS + ("neutral",), dtype=object)
+    dominant = np.full(len(users), len(EMOTIONS))
+    if emotions is not None:
+        matrix = np.asarray(emotions, dtype=np.float64)[order]
+        has_scores = ~np.isnan(matrix).all(axis=1)
+        totals = np.add.reduceat(np.nan_to_num(matrix), starts, axis=0)
+        scored_users = np.add.reduceat(has_scores.astype(np.int64), starts) > 0
+        # argmax takes the first of equal totals, like max() over the emotion
+        # dict; rounding keeps summation order from breaking exact ties
+        dominant = np.where(scored_users, np.round(totals, 9).argmax(axis=1), len(EMOTIONS))
+
+    return {
+        "user_id": users,
+        "entry_count": counts,
+        "average_sentiment": average,
+        "recent_sentiment": recent,
+        "trend": trend,
+        "slope_per_day": slope,
+        "volatility": volatility,
+        "dominant_emotion": names[dominant],
+    }
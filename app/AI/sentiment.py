@@ -1,38 +1,48 @@
-from textblob import TextBlob
-import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+import os
 import re
+from ..metrics import time_stage
+
+# Shared analyzer - this is what TextBlob(text).sentiment uses under the hood,
+# without rebuilding the blob (and its lowercased copy) for every entry. Built
+# on first use: importing TextBlob (and NLTK) is most of the app's start-up time
+_analyzer = None
+
+# Batches smaller than this are not worth the process pool start-up cost
+PROCESS_POOL_MIN_BATCH = 200
+
+# Polarity thresholds for the sentiment label, checked top to bottom
+SENTIMENT_THRESHOLDS = [
+    (0.3, "very positive"),
+    (0.1, "positive"),
+    (-0.1, "neutral"),
+    (-0.3, "negative"),
+]
+LOWEST_SENTIMENT_LABEL = "very negative"
 
 def analyze_sentiment_advanced(text: str) -> dict:
     """
     Advanced sentiment analysis with emotion detection
     Returns: sentiment score, label, and emotion breakdown
     """
-    # Basic sentiment analysis
-    analysis = TextBlob(text)
-    sentiment_score = analysis.sentiment.polarity
+    # Basic sentiment analysis (polarity and subjectivity in one pass)
+    analyzer = get_analyzer()
+    with time_stage("polarity"):
+        sentiment_score, subjectivity = analyzer.analyze(text)
     
     # Enhanced emotion detection
-    emotions = detect_emotions(text)
+    with time_stage("emotions"):
+        emotions = detect_emotions(text)
     
     # Determine primary label with better thresholds
-    if sentiment_score > 0.3:
-        label = "very positive"
-    elif sentiment_score > 0.1:
-        label = "positive"
-    elif sentiment_score > -0.1:
-        label = "neutral"
-    elif sentiment_score > -0.3:
-        label = "negative"
-    else:
-        label = "very negative"
-    
-    # Calculate subjectivity
-    subjectivity = analysis.sentiment.subjectivity
+    label = sentiment_label(sentiment_score)
     
     # Detect key phrases
-    key_phrases = extract_key_phrases(text)
+    with time_stage("key_phrases"):
+        key_phrases = extract_key_phrases(text)
     
     return {
         "sentiment_score": round(sentiment_score, 3),
@@ -43,41 +53,196 @@ def analyze_sentiment_advanced(text: str) -> dict:
         "word_count": len(text.split())
     }
 
-def detect_emotions(text: str) -> Dict[str, float]:
+def get_analyzer():
+    global _analyzer
+    if _analyzer is None:
+        from textblob.sentiments import PatternAnalyzer
+        _analyzer = PatternAnalyzer()
+    return _analyzer
+
+def warm_up():
+    """Import TextBlob and NumPy and run one analysis, so no request pays for it"""
+    import numpy  # noqa: F401 - analyze_emotion_trends imports it on first use
+    analyze_sentiment_advanced("Warming up the sentiment analyzer.")
+
+def sentiment_label(sentiment_score: float) -> str:
+    """Map a polarity score to its label using SENTIMENT_THRESHOLDS"""
+    for threshold, label in SENTIMENT_THRESHOLDS:
+        if sentiment_score > threshold:
+            return label
+    return LOWEST_SENTIMENT_LABEL
+
+def analyze_sentiment_batch(
+    texts: Iterable[str],
+    workers: Optional[int] = None,
+    chunksize: int = 32
+) -> List[dict]:
     """
-    Detect emotional content in text
-    Returns dictionary of emotion scores (0-1)
+    Analyze many texts at once, e.g. when re-scoring the backlog.
+    Results are identical to calling analyze_sentiment_advanced on each text.
+    Duplicate texts are only analyzed once, and batches of at least
+    PROCESS_POOL_MIN_BATCH unique texts are spread over a process pool
+    when workers > 1.
+    Each text still runs the three stages separately: they split text
+    differently (the pattern tokenizer, single spaces for emotion keywords,
+    sentence punctuation), so shared tokens would change results, and the
+    polarity stage is about 95% of the time anyway. Compare with a plain
+    loop using benchmarks/bench_sentiment_batch.py.
     """
-    text_lower = text.lower()
-    emotions = {
-        "joy": 0,
-        "sadness": 0,
-        "anger": 0,
-        "fear": 0,
-        "surprise": 0,
-        "trust": 0,
-        "anticipation": 0,
-        "disgust": 0
-    }
-    
-    # Emotion keyword dictionaries
-    emotion_keywords = {
-        "joy": ["happy", "joy", "excited", "great", "wonderful", "amazing", "love", "enjoy", "delighted"],
-        "sadness": ["sad", "unhappy", "depressed", "lonely", "miserable", "grief", "sorrow", "tearful"],
-        "anger": ["angry", "mad", "furious", "annoyed", "frustrated", "irritated", "rage", "outraged"],
-        "fear": ["afraid", "scared", "fear", "worried", "anxious", "terrified", "nervous", "panic"],
-        "surprise": ["surprised", "shocked", "amazed", "astonished", "unexpected", "wow"],
-        "trust": ["trust", "confident", "secure", "reliable", "faith", "believe", "dependable"],
-        "anticipation": ["excited", "expect", "anticipate", "look forward", "hope", "await", "eager"],
-        "disgust": ["disgust", "dislike", "hate", "repulsed", "gross", "nasty", "awful"]
-    }
+    texts = list(texts)
+    unique_texts = list(dict.fromkeys(texts))
     
-    # Count emotion keywords
-    for emotion, keywords in emotion_keywords.items():
-        count = sum(1 for keyword in keywords if keyword in text_lower)
-        emotions[emotion] = min(count / 5, 1.0)  # Normalize to 0-1
+    if workers and workers > 1 and len(unique_texts) >= PROCESS_POOL_MIN_BATCH:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(analyze_sentiment_advanced, unique_texts, chunksize=chunksize))
+    else:
+        results = [analyze_sentiment_advanced(text) for text in unique_texts]
     
-    return emotions
+    by_text = dict(zip(unique_texts, results))
+    # Hand out independent copies so callers can mutate results freely
+    return [_copy_result(by_text[text]) for text in texts]
+
+def _copy_result(result: dict) -> dict:
+    """Copy an analysis result, including its nested emotions and phrases"""
+    copied = dict(result)
+    copied["emotions"] = dict(result["emotions"])
+    copied["key_phrases"] = list(result["key_phrases"])
+    return copied
+
+# Emotion keyword dictionaries
+EMOTION_KEYWORDS = {
+    "joy": ["happy", "joy", "excited", "great", "wonderful", "amazing", "love", "enjoy", "delighted"],
+    "sadness": ["sad", "unhappy", "depressed", "lonely", "miserable", "grief", "sorrow", "tearful"],
+    "anger": ["angry", "mad", "furious", "annoyed", "frustrated", "irritated", "rage", "outraged"],
+    "fear": ["afraid", "scared", "fear", "worried", "anxious", "terrified", "nervous", "panic"],
+    "surprise": ["surprised", "shocked", "amazed", "astonished", "unexpected", "wow"],
+    "trust": ["trust", "confident", "secure", "reliable", "faith", "believe", "dependable"],
+    "anticipation": ["excited", "expect", "anticipate", "look forward", "hope", "await", "eager"],
+    "disgust": ["disgust", "dislike", "hate", "repulsed", "gross", "nasty", "awful"]
+}
+EMOTIONS = tuple(EMOTION_KEYWORDS)
+
+# Opt-in: only match whole words, so "mad" no longer matches "made"
+EMOTION_MATCH_WHOLE_WORDS = os.getenv("MINDMATE_EMOTION_WHOLE_WORDS", "0") == "1"
+
+_WORD_RE = re.compile(r"\w+")
+
+class EmotionMatcher:
+    """
+    Keyword index built once for a keyword table.
+    The text is split on single spaces in one pass and every distinct piece
+    is looked up (and memoized) instead of scanning the text once per keyword.
+    Multi-word keywords such as "look forward" are only confirmed against the
+    full text when their first and last words both show up.
+    """
+
+    def __init__(self, emotion_keywords: Dict[str, List[str]], cache_size: int = 50000):
+        self.emotions = tuple(emotion_keywords)
+        self.keyword_emotions: Dict[str, Tuple[str, ...]] = {}
+        for emotion, keywords in emotion_keywords.items():
+            for keyword in keywords:
+                self.keyword_emotions[keyword] = self.keyword_emotions.get(keyword, ()) + (emotion,)
+        
+        self._words = tuple(k for k in self.keyword_emotions if " " not in k)
+        self._word_set = frozenset(self._words)
+        self._phrases = {}
+        for phrase in self.keyword_emotions:
+            parts = phrase.split(" ")
+            if len(parts) > 1:
+                pattern = re.compile(r"\b" + r"\s+".join(map(re.escape, parts)) + r"\b")
+                self._phrases[phrase] = (parts[0], parts[-1], pattern)
+        # Words worth remembering in whole-word mode: keywords and phrase ends
+        self._lookup_words = self._word_set | {
+            word for first, last, _ in self._phrases.values() for word in (first, last)
+        }
+        
+        self._substring_piece = lru_cache(maxsize=cache_size)(self._match_substring_piece)
+        self._word_piece = lru_cache(maxsize=cache_size)(self._match_word_piece)
+
+    def _match_substring_piece(self, piece: str) -> frozenset:
+        """Keywords inside one piece, plus markers for phrases it could start or end"""
+        found = {k for k in self._words if k in piece}
+        for phrase, (first, last, _) in self._phrases.items():
+            if piece.endswith(first):
+                found.add(("start", phrase))
+            if piece.startswith(last):
+                found.add(("end", phrase))
+        return frozenset(found)
+
+    def _match_word_piece(self, piece: str) -> frozenset:
+        """Whole words of one piece (keywords or phrase words)"""
+        return frozenset(w for w in _WORD_RE.findall(piece) if w in self._lookup_words)
+
+    def find_keywords(self, text_lower: str, whole_words: bool = False) -> set:
+        """Return every keyword that occurs in already lowercased text"""
+        pieces = set(text_lower.split(" "))
+        
+        if whole_words:
+            words = set().union(*map(self._word_piece, pieces))
+            found = words & self._word_set
+            for phrase, (first, last, pattern) in self._phrases.items():
+                if first in words and last in words and pattern.search(text_lower):
+                    found.add(phrase)
+            return found
+        
+        # Default: same substring semantics as `keyword in text_lower`
+        matches = set().union(*map(self._substring_piece, pieces))
+        found = {m for m in matches if isinstance(m, str)}
+        for phrase in self._phrases:
+            if ("start", phrase) in matches and ("end", phrase) in matches and phrase in text_lower:
+                found.add(phrase)
+        return found
+
+    def scores(self, text: str, whole_words: bool = False) -> Dict[str, float]:
+        """Emotion scores (0-1): distinct keywords per emotion, 5 or more is 1.0"""
+        counts = dict.fromkeys(self.emotions, 0)
+        for keyword in self.find_keywords(text.lower(), whole_words):
+            for emotion in self.keyword_emotions[keyword]:
+                counts[emotion] += 1
+        
+        return {emotion: min(count / 5, 1.0) for emotion, count in counts.items()}
+
+_emotion_matcher = EmotionMatcher(EMOTION_KEYWORDS)
+
+# Bumped by configure_analyzer; the analysis cache compares it on every lookup
+analyzer_revision = 0
+
+def configure_analyzer(
+    emotion_keywords: Optional[Dict[str, List[str]]] = None,
+    thresholds: Optional[List[Tuple[float, str]]] = None,
+    lowest_label: Optional[str] = None,
+    whole_words: Optional[bool] = None
+):
+    """
+    Change the emotion lexicon, label thresholds or whole-word matching at
+    runtime. Rebuilds the emotion matcher and bumps analyzer_revision, so
+    cached results of the old settings are no longer served. Change them
+    here rather than by editing the module globals, which nothing notices.
+    The emotions themselves are fixed (each has a column)
+    """
+    global _emotion_matcher, LOWEST_SENTIMENT_LABEL, EMOTION_MATCH_WHOLE_WORDS, analyzer_revision
+    if emotion_keywords is not None:
+        if tuple(emotion_keywords) != EMOTIONS:
+            raise ValueError(f"emotion_keywords must have exactly these emotions, in order: {EMOTIONS}")
+        # Updated in place, for modules that imported the dict
+        EMOTION_KEYWORDS.update({emotion: list(words) for emotion, words in emotion_keywords.items()})
+        _emotion_matcher = EmotionMatcher(EMOTION_KEYWORDS)
+    if thresholds is not None:
+        SENTIMENT_THRESHOLDS[:] = thresholds
+    if lowest_label is not None:
+        LOWEST_SENTIMENT_LABEL = lowest_label
+    if whole_words is not None:
+        EMOTION_MATCH_WHOLE_WORDS = whole_words
+    analyzer_revision += 1
+
+def detect_emotions(text: str, whole_words: Optional[bool] = None) -> Dict[str, float]:
+    """
+    Detect emotional content in text
+    Returns dictionary of emotion scores (0-1)
+    """
+    if whole_words is None:
+        whole_words = EMOTION_MATCH_WHOLE_WORDS
+    return _emotion_matcher.scores(text, whole_words)
 
 def extract_key_phrases(text: str) -> List[str]:
     """
@@ -89,10 +254,12 @@ def extract_key_phrases(text: str) -> List[str]:
     
     for sentence in sentences:
         sentence = sentence.strip()
-        if len(sentence.split()) >= 3 and len(sentence.split()) <= 8:
-            phrases.append(sentence.strip())
+        if 3 <= len(sentence.split()) <= 8:
+            phrases.append(sentence)
+            if len(phrases) == 5:
+                break
     
-    return phrases[:5]
+    return phrases
 
 def analyze_emotion_trends(entries: List[Dict]) -> Dict:
     """
@@ -101,6 +268,8 @@ def analyze_emotion_trends(entries: List[Dict]) -> Dict:
     if not entries:
         return {"trend": "insufficient_data"}
     
+    import numpy as np
+
     # Calculate weekly averages
     sentiment_scores = [e.get("sentiment_score", 0) for e in entries]
     avg_sentiment = np.mean(sentiment_scores) if sentiment_scores else 0
@@ -108,12 +277,7 @@ def analyze_emotion_trends(entries: List[Dict]) -> Dict:
     # Determine trend
     if len(sentiment_scores) >= 2:
         recent_avg = np.mean(sentiment_scores[-3:]) if len(sentiment_scores) >= 3 else sentiment_scores[-1]
-        if recent_avg > avg_sentiment + 0.1:
-            trend = "improving"
-        elif recent_avg < avg_sentiment - 0.1:
-            trend = "declining"
-        else:
-            trend = "stable"
+        trend = trend_direction(avg_sentiment, recent_avg)
     else:
         trend = "insufficient_data"
     
@@ -136,6 +300,14 @@ def analyze_emotion_trends(entries: List[Dict]) -> Dict:
         }
     }
 
+def trend_direction(avg_sentiment: float, recent_avg: float) -> str:
+    """Compare the recent average (last 3 entries) with the overall one"""
+    if recent_avg > avg_sentiment + 0.1:
+        return "improving"
+    elif recent_avg < avg_sentiment - 0.1:
+        return "declining"
+    return "stable"
+
 # Keep backward compatibility
 def analyze_sentiment(text: str) -> dict:
     """Original function for backward compatibility"""
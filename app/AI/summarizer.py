@@ -7,59 +7,79 @@ def generate_weekly_summary(entries: List[Dict]) -> Dict[str, Any]:
     Generate a weekly summary from journal entries
     """
     if not entries:
+        return summarize_week(0, 0, {}, None, None)
+    
+    # One pass for the running statistics (no need to sort for the date range)
+    sentiment_sum = 0
+    all_emotions = {}
+    dates = []
+    for entry in entries:
+        sentiment_sum += entry.get('sentiment_score', 0)
+        dates.append(entry.get('created_at', ''))
+        emotions = entry.get('emotions')
+        if emotions is None:
+            # Older callers pass the raw emotion_data JSON instead
+            emotions = _parse_emotion_data(entry.get('emotion_data'))
+        for emotion, score in emotions.items():
+            all_emotions[emotion] = all_emotions.get(emotion, 0) + score
+    
+    return summarize_week(
+        len(entries),
+        sentiment_sum / len(entries),
+        all_emotions,
+        min(dates),
+        max(dates)
+    )
+
+def summarize_week(entry_count: int, avg_sentiment: float, emotion_totals: Dict[str, float],
+                   start: Any, end: Any) -> Dict[str, Any]:
+    """
+    Build the weekly summary from aggregate statistics (e.g. daily rollups)
+    instead of the entries themselves
+    """
+    if not entry_count:
         return {
             "summary": "No entries this week.",
             "insights": [],
             "recommendations": []
         }
     
-    # Sort entries by date
-    entries_sorted = sorted(entries, key=lambda x: x.get('created_at', ''))
-    
-    # Calculate statistics
-    sentiment_scores = [e.get('sentiment_score', 0) for e in entries_sorted]
-    avg_sentiment = sum(sentiment_scores) / len(sentiment_scores) if sentiment_scores else 0
-    
-    # Emotion analysis
-    all_emotions = {}
-    for entry in entries_sorted:
-        emotion_data = entry.get('emotion_data')
-        if emotion_data:
-            try:
-                emotions = json.loads(emotion_data)
-                for emotion, score in emotions.items():
-                    all_emotions[emotion] = all_emotions.get(emotion, 0) + score
-            except:
-                pass
-    
     # Find dominant emotions
-    dominant_emotions = sorted(all_emotions.items(), key=lambda x: x[1], reverse=True)[:3]
+    dominant_emotions = sorted(emotion_totals.items(), key=lambda x: x[1], reverse=True)[:3]
     
     # Generate insights
-    insights = generate_insights(entries_sorted, avg_sentiment, dominant_emotions)
+    insights = generate_insights(entry_count, avg_sentiment, dominant_emotions)
     
     # Generate recommendations
     recommendations = generate_recommendations(avg_sentiment, dominant_emotions)
     
     # Create summary text
-    summary = create_summary_text(len(entries_sorted), avg_sentiment, dominant_emotions)
+    summary = create_summary_text(entry_count, avg_sentiment, dominant_emotions)
     
     return {
         "summary": summary,
         "statistics": {
-            "total_entries": len(entries_sorted),
+            "total_entries": entry_count,
             "average_sentiment": round(avg_sentiment, 3),
             "dominant_emotions": dominant_emotions,
             "date_range": {
-                "start": entries_sorted[0].get('created_at'),
-                "end": entries_sorted[-1].get('created_at')
+                "start": start,
+                "end": end
             }
         },
         "insights": insights,
         "recommendations": recommendations
     }
 
-def generate_insights(entries: List[Dict], avg_sentiment: float, dominant_emotions: List) -> List[str]:
+def _parse_emotion_data(emotion_data) -> Dict[str, float]:
+    if not emotion_data:
+        return {}
+    try:
+        return json.loads(emotion_data)
+    except (TypeError, ValueError):
+        return {}
+
+def generate_insights(entry_count: int, avg_sentiment: float, dominant_emotions: List) -> List[str]:
     """Generate insights from entries"""
     insights = []
     
@@ -76,11 +96,11 @@ def generate_insights(entries: List[Dict], avg_sentiment: float, dominant_emotio
         insights.append("It's been a tough week. Remember that difficult times pass.")
     
     # Entry frequency insight
-    if len(entries) >= 7:
+    if entry_count >= 7:
         insights.append("Great consistency! You journaled every day this week.")
-    elif len(entries) >= 5:
+    elif entry_count >= 5:
         insights.append("Good journaling habit! You wrote most days this week.")
-    elif len(entries) >= 3:
+    elif entry_count >= 3:
         insights.append("You're building a good journaling routine.")
     else:
         insights.append("Consider journaling more regularly to track your progress.")
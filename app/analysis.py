@@ -0,0 +1,194 @@
+"""
+Sentiment analysis for journal entries, inline or deferred.
+
+In deferred mode an entry is saved straight away with analysis_status
+"pending" and a small pool of worker threads fills in the analysis fields.
+The journal_entries table doubles as the durable queue: entries still pending
+when the process stopped are picked up again by requeue_pending() on startup.
+"""
+import asyncio
+import json
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from .database import SessionLocal, retry_on_busy
+from . import metrics, models
+from .AI.cache import analyze_sentiment_cached
+
+logger = logging.getLogger(__name__)
+
+# Defer analysis by default (clients can still choose per request)
+DEFER_ANALYSIS = os.getenv("MINDMATE_DEFER_ANALYSIS", "0") == "1"
+ANALYSIS_WORKERS = int(os.getenv("MINDMATE_ANALYSIS_WORKERS", "2"))
+# Bounded so a burst of long entries can't pile up unbounded work in memory
+ANALYSIS_QUEUE_SIZE = int(os.getenv("MINDMATE_ANALYSIS_QUEUE_SIZE", "256"))
+# Threads running inline (non-deferred) analysis for the async routes
+INLINE_ANALYSIS_WORKERS = int(os.getenv("MINDMATE_INLINE_ANALYSIS_WORKERS", "4"))
+
+PENDING = "pending"
+COMPLETE = "complete"
+FAILED = "failed"
+
+
+def analysis_columns(result: dict) -> dict:
+    """journal_entries column values for an analyze_sentiment_advanced result"""
+    emotions = result.get("emotions", {})
+    columns = {
+        "sentiment_score": result["sentiment_score"],
+        "sentiment_label": result["sentiment_label"],
+        "subjectivity": result.get("subjectivity"),
+        "word_count": result.get("word_count"),
+        "emotion_data": json.dumps(emotions),
+        "key_phrases": json.dumps(result.get("key_phrases", [])),
+        "analysis_status": COMPLETE,
+    }
+    for name in models.EMOTION_NAMES:
+        columns[f"emotion_{name}"] = emotions.get(name)
+    return columns
+
+
+def apply_analysis(entry: models.JournalEntry, result: dict):
+    """Copy an analyze_sentiment_advanced result onto an entry"""
+    for column, value in analysis_columns(result).items():
+        setattr(entry, column, value)
+
+
+def analyze_entry(entry: models.JournalEntry):
+    """Run the analysis inline (identical content is only analyzed once)"""
+    apply_analysis(entry, analyze_sentiment_cached(entry.content))
+
+
+# Keeps the event loop free while TextBlob runs
+analysis_executor = ThreadPoolExecutor(max_workers=INLINE_ANALYSIS_WORKERS, thread_name_prefix="analysis-inline")
+
+
+async def analyze_entry_async(entry: models.JournalEntry):
+    """analyze_entry for async routes, the analysis itself runs on analysis_executor"""
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(analysis_executor, analyze_sentiment_cached, entry.content)
+    apply_analysis(entry, result)
+
+
+def should_defer(requested: Optional[bool]) -> bool:
+    return DEFER_ANALYSIS if requested is None else requested
+
+
+class AnalysisQueue:
+    """
+    In-process worker pool that analyzes pending entries.
+    submit() never blocks: when the queue is full it returns False and the
+    caller analyzes inline instead (backpressure on the writer).
+    """
+
+    def __init__(self, workers: int = ANALYSIS_WORKERS, max_pending: int = ANALYSIS_QUEUE_SIZE,
+                 session_factory=SessionLocal):
+        self.workers = workers
+        self.session_factory = session_factory
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"analysis-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join(timeout)
+
+    def submit(self, entry_id: int) -> bool:
+        """Queue an entry for analysis, False if the queue is full"""
+        self.start()
+        try:
+            self._queue.put_nowait(entry_id)
+            return True
+        except queue.Full:
+            return False
+
+    def join(self):
+        """Block until everything queued so far has been processed"""
+        self._queue.join()
+
+    def pending_count(self) -> int:
+        return self._queue.qsize()
+
+    def requeue_pending(self) -> int:
+        """Queue entries left pending by a previous run, returns how many"""
+        db = self.session_factory()
+        try:
+            entry_ids = [row.id for row in db.query(models.JournalEntry.id).filter(
+                models.JournalEntry.analysis_status == PENDING
+            ).order_by(models.JournalEntry.id)]
+        finally:
+            db.close()
+
+        if entry_ids:
+            self.start()
+            # Blocking puts, but off the caller's thread
+            threading.Thread(
+                target=lambda: [self._queue.put(entry_id) for entry_id in entry_ids],
+                name="analysis-requeue",
+                daemon=True
+            ).start()
+        return len(entry_ids)
+
+    def _run(self):
+        while True:
+            entry_id = self._queue.get()
+            try:
+                if entry_id is None:
+                    return
+                self._process(entry_id)
+            except Exception:
+                logger.exception("Analysis failed for entry %s", entry_id)
+                metrics.errors.inc("analysis")
+                self._mark_failed(entry_id)
+            finally:
+                self._queue.task_done()
+
+    @retry_on_busy
+    def _process(self, entry_id: int):
+        db = self.session_factory()
+        try:
+            entry = db.get(models.JournalEntry, entry_id)
+            if entry is None or entry.analysis_status != PENDING:
+                return
+            content = entry.content
+            result = analyze_sentiment_cached(content)
+
+            # The entry may have been edited while we were analyzing it,
+            # in which case a newer job for it is already queued
+            db.refresh(entry)
+            if entry.content != content or entry.analysis_status != PENDING:
+                return
+            apply_analysis(entry, result)
+            db.commit()
+        finally:
+            db.close()
+
+    def _mark_failed(self, entry_id: int):
+        db = self.session_factory()
+        try:
+            entry = db.get(models.JournalEntry, entry_id)
+            if entry is not None and entry.analysis_status == PENDING:
+                entry.analysis_status = FAILED
+                db.commit()
+        except Exception:
+            logger.exception("Could not mark entry %s as failed", entry_id)
+        finally:
+            db.close()
+
+
+analysis_queue = AnalysisQueue()
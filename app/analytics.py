@@ -0,0 +1,156 @@
+"""
+Analytics computed inside the database.
+
+These mirror the Python helpers in app/AI (analyze_emotion_trends and
+friends) but only select the columns they need and let SQLite do the
+aggregation, so they don't load every entry (and its content) into memory.
+Whole days are read from the daily rollups; only the partial first day of a
+period is aggregated from journal_entries.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from . import models, rollups
+from .AI.sentiment import trend_direction
+
+# Points returned for the trend chart
+CHART_POINTS = 10
+
+
+def _analyzed_entries(user_id: int, start_date: datetime) -> list:
+    """Filters for a user's analyzed entries since start_date"""
+    return [
+        models.JournalEntry.user_id == user_id,
+        models.JournalEntry.created_at >= start_date,
+        models.JournalEntry.sentiment_score.isnot(None),  # skip entries still being analyzed
+    ]
+
+
+def period_totals(db: Session, user_id: int, start_date: datetime) -> Dict[str, Any]:
+    """
+    Rollup totals (entry_count, sentiment_sum, ... see rollups.TOTALS) of a
+    user's analyzed entries since start_date, plus first/last created_at
+    """
+    Rollup = models.DailyMoodRollup
+    start_day = start_date.date()
+    next_day = datetime.combine(start_day, time.min) + timedelta(days=1)
+
+    # Days after start_day are covered by the rollups as a whole
+    full_days = db.query(
+        *[func.coalesce(func.sum(getattr(Rollup, column)), 0) for column in rollups.TOTALS]
+    ).filter(Rollup.user_id == user_id, Rollup.day > start_day).one()
+
+    # start_day itself only counts from start_date on
+    partial_day = db.execute(
+        rollups.rollup_select().where(
+            models.JournalEntry.user_id == user_id,
+            models.JournalEntry.created_at >= start_date,
+            models.JournalEntry.created_at < next_day
+        )
+    ).first()
+
+    totals = dict(zip(rollups.TOTALS, full_days))
+    if partial_day is not None:
+        for column, value in zip(rollups.TOTALS, partial_day[2:]):
+            totals[column] += value
+
+    filters = _analyzed_entries(user_id, start_date)
+    first_created_at, last_created_at = db.query(
+        func.min(models.JournalEntry.created_at),
+        func.max(models.JournalEntry.created_at)
+    ).filter(*filters).one()
+    totals["first_created_at"] = first_created_at
+    totals["last_created_at"] = last_created_at
+    return totals
+
+
+def emotion_totals(totals: Dict[str, Any]) -> Dict[str, float]:
+    """Per-emotion sums from period_totals ({} when no entry has emotion scores)"""
+    if not totals["emotion_entry_count"]:
+        return {}
+    return {name: totals[f"{name}_sum"] for name in models.EMOTION_NAMES}
+
+
+def emotion_trends(db: Session, user_id: int, start_date: datetime) -> Dict[str, Any]:
+    """
+    Same result as feeding every entry since start_date to
+    analyze_emotion_trends, plus the last CHART_POINTS points for the chart.
+    """
+    filters = _analyzed_entries(user_id, start_date)
+    totals = period_totals(db, user_id, start_date)
+    entry_count = totals["entry_count"]
+
+    # Newest first from the index, flipped back to chronological order
+    recent = db.query(
+        models.JournalEntry.created_at,
+        models.JournalEntry.sentiment_score,
+        models.JournalEntry.sentiment_label
+    ).filter(*filters).order_by(
+        models.JournalEntry.created_at.desc(), models.JournalEntry.id.desc()
+    ).limit(CHART_POINTS).all()[::-1]
+
+    chart = [
+        {
+            "date": row.created_at.isoformat() if row.created_at else None,
+            "sentiment": row.sentiment_score,
+            "label": row.sentiment_label
+        }
+        for row in recent
+    ]
+
+    if not entry_count:
+        return {"total_entries": 0, "trend_analysis": {"trend": "insufficient_data"}, "entries": chart}
+
+    avg_sentiment = totals["sentiment_sum"] / entry_count
+    if entry_count >= 2:
+        recent_scores = [row.sentiment_score for row in recent[-3:]]
+        recent_avg = sum(recent_scores) / len(recent_scores) if entry_count >= 3 else recent_scores[-1]
+        trend = trend_direction(avg_sentiment, recent_avg)
+    else:
+        trend = "insufficient_data"
+
+    all_emotions = emotion_totals(totals)
+    dominant_emotion = max(all_emotions, key=all_emotions.get) if all_emotions else "neutral"
+
+    return {
+        "total_entries": entry_count,
+        "trend_analysis": {
+            "average_sentiment": round(avg_sentiment, 3),
+            "trend": trend,
+            "dominant_emotion": dominant_emotion,
+            "entry_count": entry_count,
+            "date_range": {
+                "start": totals["first_created_at"],
+                "end": totals["last_created_at"]
+            }
+        },
+        "entries": chart
+    }
+
+
+def user_activity(db: Session, user_id: int, today: date) -> Dict[str, Any]:
+    """
+    entry_count, last_entry_at and current_streak (consecutive days with an
+    analyzed entry, ending today or yesterday) in two indexed queries
+    """
+    entry_count, last_entry_at = db.query(
+        func.count(models.JournalEntry.id),
+        func.max(models.JournalEntry.created_at)
+    ).filter(models.JournalEntry.user_id == user_id).one()
+
+    # Days in a streak are exactly `position` days before the latest one
+    Rollup = models.DailyMoodRollup
+    days = select(
+        Rollup.day,
+        (func.row_number().over(order_by=Rollup.day.desc()) - 1).label("position")
+    ).where(Rollup.user_id == user_id, Rollup.day <= today).subquery()
+    latest = select(func.max(days.c.day)).scalar_subquery()
+    latest_day, streak = db.execute(select(
+        latest,
+        func.count().filter(func.julianday(latest) - func.julianday(days.c.day) == days.c.position)
+    )).one()
+
+    if latest_day is None or date.fromisoformat(str(latest_day)) < today - timedelta(days=1):
+        streak = 0
+    return {"entry_count": entry_count, "last_entry_at": last_entry_at, "current_streak": streak}
@@ -1,8 +1,8 @@
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import HTTPException, status
 import secrets
+from .utils.hashing import HashingBusy, hashing_pool
 
 # Secret key for JWT tokens
 SECRET_KEY = secrets.token_urlsafe(32)  
@@ -12,15 +12,45 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
 
-pwd_context = CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto")
+def _hashing_busy():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many login requests, please retry shortly",
+        headers={"Retry-After": "1"}
+    )
+
+def _hashing(fn, *args):
+    """Run a hashing_pool call, turning an overloaded pool into a 503"""
+    try:
+        return fn(*args)
+    except HashingBusy:
+        raise _hashing_busy()
+
+async def _hashing_async(fn, *args):
+    try:
+        return await fn(*args)
+    except HashingBusy:
+        raise _hashing_busy()
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return _hashing(hashing_pool.verify, plain_password, hashed_password)
+
+def verify_and_update_password(plain_password, hashed_password):
+    """(valid, new_hash) - new_hash is set when the hash settings have changed"""
+    return _hashing(hashing_pool.verify_and_update, plain_password, hashed_password)
 
 def get_password_hash(password):
     if len(password) > 72:
         password = password[:72]
-    return pwd_context.hash(password)
+    return _hashing(hashing_pool.hash, password)
+
+async def verify_and_update_password_async(plain_password, hashed_password):
+    return await _hashing_async(hashing_pool.verify_and_update_async, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    if len(password) > 72:
+        password = password[:72]
+    return await _hashing_async(hashing_pool.hash_async, password)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
@@ -0,0 +1,244 @@
+"""
+Bulk import of journal entries (POST /entries/bulk).
+
+The upload is NDJSON (one entry object per line) or a JSON array of entry
+objects, parsed incrementally as the body arrives. Valid entries are
+analyzed and inserted BULK_BATCH_SIZE at a time, one transaction per batch,
+and every item gets a result line ({"index", "status", "id" or "error"}).
+Lines are streamed back while the upload is still arriving: errors straight
+away and created entries once their batch has committed, so lines aren't in
+upload order. Only one batch plus one partial item is held in memory
+whatever the size of the upload.
+"""
+import asyncio
+import codecs
+import json
+import re
+from datetime import date, datetime, timezone
+from typing import AsyncIterator, List, Optional, Set, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from . import analysis, models, rollups, schemas, summaries
+from .AI.cache import analyze_sentiment_batch_cached
+
+BULK_BATCH_SIZE = 500
+# Longest accepted entry (one NDJSON line or array element)
+MAX_ITEM_BYTES = 1024 * 1024
+
+_SPACE = re.compile(r"\s*")
+
+# (index, parsed object or None, error or None)
+Item = Tuple[int, Optional[dict], Optional[str]]
+
+
+class BulkFormatError(ValueError):
+    """The upload can't be parsed any further"""
+
+
+# ========== PARSING ==========
+
+async def iter_items(chunks: AsyncIterator[bytes]) -> AsyncIterator[Item]:
+    """
+    Entry objects from an NDJSON or JSON array body, told apart by the first
+    character. Invalid items are reported and skipped; BulkFormatError is
+    raised when parsing can't continue (a truncated array, bytes that aren't
+    UTF-8).
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    mode = None
+    index = 0
+    array_closed = False
+    json_decoder = json.JSONDecoder()
+    # Bytes received before this chunk, and where the body stops being UTF-8
+    received = 0
+    invalid_at = None
+
+    async for chunk in _with_end(chunks):
+        final = chunk is None
+        pending = decoder.getstate()[0]
+        try:
+            buffer += decoder.decode(b"" if final else chunk, final=final)
+        except UnicodeDecodeError as e:
+            # Parse the complete items before the bad byte, then stop
+            buffer += e.object[:e.start].decode("utf-8")
+            invalid_at = received - len(pending) + e.start
+            final = False
+        received += len(chunk or b"")
+        if mode is None:
+            buffer = buffer.lstrip()
+            if not buffer:
+                continue
+            if buffer[0] == "[":
+                mode, buffer = "array", buffer[1:]
+            else:
+                mode = "ndjson"
+
+        if mode == "ndjson":
+            *lines, buffer = buffer.split("\n")
+            if final:
+                lines.append(buffer)
+                buffer = ""
+            for line in lines:
+                line = line.strip()
+                if not line:
+                    continue
+                yield _parse_object(index, line)
+                index += 1
+        else:
+            # Items are read at an offset and the buffer is cut once per chunk
+            pos = 0
+            while not array_closed:
+                pos = _skip_space(buffer, pos)
+                if buffer.startswith(",", pos):
+                    pos = _skip_space(buffer, pos + 1)
+                if buffer.startswith("]", pos):
+                    array_closed = True
+                    pos += 1
+                    break
+                if pos == len(buffer):
+                    break
+                try:
+                    value, pos_after = json_decoder.raw_decode(buffer, pos)
+                except ValueError:
+                    if final:
+                        raise BulkFormatError(f"item {index}: invalid or truncated JSON")
+                    break  # wait for more of this item
+                pos = pos_after
+                yield _check_object(index, value)
+                index += 1
+            buffer = buffer[pos:]
+            if final and not array_closed:
+                raise BulkFormatError("JSON array is not closed")
+            if array_closed and buffer.strip():
+                raise BulkFormatError("unexpected data after the JSON array")
+
+        if invalid_at is not None:
+            raise BulkFormatError(f"item {index}: invalid UTF-8 at byte {invalid_at}")
+        if len(buffer) > MAX_ITEM_BYTES:
+            raise BulkFormatError(f"item {index} is larger than {MAX_ITEM_BYTES} bytes")
+
+
+def _skip_space(text: str, pos: int) -> int:
+    return _SPACE.match(text, pos).end()
+
+
+async def _with_end(chunks: AsyncIterator[bytes]) -> AsyncIterator[Optional[bytes]]:
+    """The chunks followed by None"""
+    async for chunk in chunks:
+        if chunk:
+            yield chunk
+    yield None
+
+
+def _parse_object(index: int, text: str) -> Item:
+    try:
+        value = json.loads(text)
+    except ValueError as e:
+        return index, None, f"invalid JSON: {e.msg}"
+    return _check_object(index, value)
+
+
+def _check_object(index: int, value) -> Item:
+    if not isinstance(value, dict):
+        return index, None, "expected a JSON object"
+    return index, value, None
+
+
+def validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors()
+    )
+
+
+# ========== INSERTING ==========
+
+def _utc_naive(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def insert_batch(session: Session, user_id: int, entries: List[schemas.JournalEntryImport],
+                 results: List[dict]) -> List[int]:
+    """Insert analyzed entries with one executemany, returns their ids in order"""
+    now = datetime.now(timezone.utc)
+    rows = []
+    days: Set[Tuple[int, date]] = set()
+    for entry, result in zip(entries, results):
+        created_at = _utc_naive(entry.created_at or now)
+        rows.append({
+            "title": entry.title,
+            "content": entry.content,
+            "user_id": user_id,
+            "created_at": created_at,
+            **analysis.analysis_columns(result),
+        })
+        days.add((user_id, created_at.date()))
+
+    conn = session.connection()
+    ids = conn.execute(
+        insert(models.JournalEntry).returning(models.JournalEntry.id, sort_by_parameter_order=True),
+        rows
+    ).scalars().all()
+    # Core inserts skip the ORM hooks that maintain the rollups and summaries
+    rollups.rebuild_days(conn, days)
+    since = now.replace(tzinfo=None) - summaries.SUMMARY_WINDOW
+    if any(row["created_at"] >= since for row in rows):
+        summaries.entries_changed(session, {user_id})
+    return ids
+
+
+async def import_entries(db: AsyncSession, user_id: int,
+                         chunks: AsyncIterator[bytes]) -> AsyncIterator[List[dict]]:
+    """
+    Import an uploaded body, yielding result lines as soon as they are known
+    (an error on its own, created entries a committed batch at a time), then
+    a [{"summary": ...}] line
+    """
+    created = failed = 0
+    batch: List[Tuple[int, schemas.JournalEntryImport]] = []
+
+    async def flush() -> List[dict]:
+        nonlocal created
+        entries = [entry for _, entry in batch]
+        # TextBlob is CPU-bound, keep it off the event loop
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(
+            analysis.analysis_executor, analyze_sentiment_batch_cached, [entry.content for entry in entries]
+        )
+        ids = await db.run_sync(insert_batch, user_id, entries, results)
+        await db.commit()
+        lines = [{"index": index, "status": "created", "id": entry_id} for (index, _), entry_id in zip(batch, ids)]
+        created += len(ids)
+        batch.clear()
+        return lines
+
+    # Don't keep a read transaction (e.g. from the user lookup) open while
+    # the upload streams in
+    await db.commit()
+    error = None
+    try:
+        async for index, value, item_error in iter_items(chunks):
+            if item_error is None:
+                try:
+                    batch.append((index, schemas.JournalEntryImport.model_validate(value)))
+                except ValidationError as e:
+                    item_error = validation_message(e)
+            if item_error is not None:
+                yield [{"index": index, "status": "error", "error": item_error}]
+                failed += 1
+            if len(batch) >= BULK_BATCH_SIZE:
+                yield await flush()
+    except BulkFormatError as e:
+        # Keep what was parsed so far, report where the upload broke
+        error = str(e)
+
+    if batch:
+        yield await flush()
+    summary = {"created": created, "failed": failed}
+    if error:
+        summary["error"] = error
+    yield [{"summary": summary}]
@@ -1,19 +1,96 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+import asyncio
+import functools
 import os
+import random
+import time
 
 # Use absolute path to be sure
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DB_PATH = os.path.join(BASE_DIR, 'mindmate.db')
-SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_PATH}"
+# MINDMATE_DATABASE_URL points the app at another database (e.g. a temp file)
+SQLALCHEMY_DATABASE_URL = os.getenv("MINDMATE_DATABASE_URL", f"sqlite:///{DB_PATH}")
 
-print(f" Database path: {DB_PATH}")  # This will show us the exact path
-
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False}
+# The routes use the async engine; workers, scripts and migrations the sync one
+ASYNC_DATABASE_URL = os.getenv(
+    "MINDMATE_ASYNC_DATABASE_URL",
+    SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
 )
+
+# ========== SQLITE SETTINGS ==========
+# WAL lets readers run alongside the writer; with WAL, synchronous=NORMAL only
+# syncs at checkpoints (a crash can lose the last commits, never corrupt)
+SQLITE_JOURNAL_MODE = os.getenv("MINDMATE_SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("MINDMATE_SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("MINDMATE_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Negative means KiB, so -65536 is a 64 MiB page cache per connection
+SQLITE_CACHE_SIZE = int(os.getenv("MINDMATE_SQLITE_CACHE_SIZE", "-65536"))
+# How long a connection waits on another writer's lock before SQLITE_BUSY
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("MINDMATE_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# Connections the async engine keeps, roughly the requests per worker process
+# that are in a transaction at once; the sync engine serves the analysis
+# worker threads plus startup and scripts
+DB_POOL_SIZE = int(os.getenv("MINDMATE_DB_POOL_SIZE", "8"))
+DB_MAX_OVERFLOW = int(os.getenv("MINDMATE_DB_MAX_OVERFLOW", "8"))
+DB_POOL_TIMEOUT = float(os.getenv("MINDMATE_DB_POOL_TIMEOUT", "30"))
+SYNC_POOL_SIZE = int(os.getenv("MINDMATE_ANALYSIS_WORKERS", "2")) + 2
+
+# retry_on_busy: attempts after the first, and the first backoff in seconds
+BUSY_RETRIES = int(os.getenv("MINDMATE_DB_BUSY_RETRIES", "5"))
+BUSY_BACKOFF = float(os.getenv("MINDMATE_DB_BUSY_BACKOFF", "0.02"))
+
+
+def sqlite_pragmas() -> dict:
+    return {
+        # First: switching a new database to WAL waits on other writers too
+        "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+        "journal_mode": SQLITE_JOURNAL_MODE,
+        "synchronous": SQLITE_SYNCHRONOUS,
+        "mmap_size": SQLITE_MMAP_SIZE,
+        "cache_size": SQLITE_CACHE_SIZE,
+    }
+
+
+def create_db_engine(url: str, pool_size: int = DB_POOL_SIZE, max_overflow: int = DB_MAX_OVERFLOW,
+                     pragmas: dict = None):
+    """
+    Engine (async for sqlite+aiosqlite URLs) that applies the SQLite pragmas
+    to every new connection
+    """
+    pragmas = sqlite_pragmas() if pragmas is None else pragmas
+    options = {}
+    if make_url(url).database not in (None, "", ":memory:"):
+        # In-memory databases get a single shared connection instead
+        options = {"pool_size": pool_size, "max_overflow": max_overflow, "pool_timeout": DB_POOL_TIMEOUT}
+
+    if "+aiosqlite" in url:
+        new_engine = create_async_engine(url, **options)
+        sync_engine = new_engine.sync_engine
+    else:
+        new_engine = sync_engine = create_engine(url, connect_args={"check_same_thread": False}, **options)
+
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    return new_engine
+
+
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL, pool_size=SYNC_POOL_SIZE)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+async_engine = create_db_engine(ASYNC_DATABASE_URL)
+# expire_on_commit=False: attributes can't lazy-load after a commit in async code
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -21,4 +98,73 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# ========== BUSY RETRIES ==========
+
+@event.listens_for(Session, "after_commit")
+def _count_commits(session):
+    session.info["commits"] = session.info.get("commits", 0) + 1
+
+
+def is_busy_error(error: Exception) -> bool:
+    message = str(getattr(error, "orig", error)).lower()
+    return "database is locked" in message or "database is busy" in message
+
+
+def busy_backoff(attempt: int) -> float:
+    """Exponential backoff with jitter, so retrying writers don't collide again"""
+    return BUSY_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+def _commits(db) -> int:
+    if db is None:
+        return 0
+    session = getattr(db, "sync_session", db)
+    return session.info.get("commits", 0)
+
+
+def retry_on_busy(fn):
+    """
+    Re-run a route (or worker function) when SQLite reports the database as
+    locked, after rolling back its `db` session. busy_timeout already waits
+    on plain lock contention; this covers the cases SQLite fails straight
+    away, such as a read transaction that can't be upgraded to a write.
+    Nothing is retried once the function has committed, so a retry never
+    repeats a write.
+    """
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            db = kwargs.get("db")
+            for attempt in range(BUSY_RETRIES + 1):
+                commits = _commits(db)
+                try:
+                    return await fn(*args, **kwargs)
+                except OperationalError as e:
+                    if not is_busy_error(e) or attempt == BUSY_RETRIES or _commits(db) != commits:
+                        raise
+                    if db is not None:
+                        await db.rollback()
+                    await asyncio.sleep(busy_backoff(attempt))
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        db = kwargs.get("db")
+        for attempt in range(BUSY_RETRIES + 1):
+            commits = _commits(db)
+            try:
+                return fn(*args, **kwargs)
+            except OperationalError as e:
+                if not is_busy_error(e) or attempt == BUSY_RETRIES or _commits(db) != commits:
+                    raise
+                if db is not None:
+                    db.rollback()
+                time.sleep(busy_backoff(attempt))
+    return wrapper
@@ -1,18 +1,72 @@
+import os
+from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
 from jose import JWTError, jwt
-from .database import get_db
-from . import models
+from .database import get_async_db
+from . import models, schemas
 from .auth import SECRET_KEY, ALGORITHM, verify_token
+from .utils.cache import LRUCache
 
+# Token subject (username) -> schemas.CurrentUser. Kept short so changes made
+# by other worker processes show up quickly; this process invalidates directly.
+USER_CACHE_TTL = float(os.getenv("MINDMATE_USER_CACHE_TTL", "30"))
+USER_CACHE_SIZE = int(os.getenv("MINDMATE_USER_CACHE_SIZE", "4096"))
+
+user_cache = LRUCache(USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
 
 security = HTTPBearer()
 
-def get_current_user(
+async def load_user(db: AsyncSession, username: str) -> Optional[schemas.CurrentUser]:
+    """Look a user up by username, through the cache"""
+    user = user_cache.get(username)
+    if user is None:
+        db_user = await db.scalar(select(models.User).where(models.User.username == username))
+        if db_user is None:
+            return None
+        user = schemas.CurrentUser.model_validate(db_user)
+        user_cache.set(username, user)
+    return user
+
+def invalidate_user(username: Optional[str]):
+    if username is not None:
+        user_cache.pop(username)
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    # Password resets, deactivation, deletion, renames... Invalidated again at
+    # commit, in case another request cached the old row in the meantime.
+    history = inspect(target).attrs.username.history
+    usernames = (history.deleted or []) + [target.username]
+    for username in usernames:
+        invalidate_user(username)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("stale_usernames", set()).update(usernames)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    for username in session.info.pop("stale_usernames", ()):
+        invalidate_user(username)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_stale_users(session):
+    session.info.pop("stale_usernames", None)
+
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-):
+    db: AsyncSession = Depends(get_async_db)
+) -> schemas.CurrentUser:
+    """
+    The user a bearer token belongs to. Deactivated accounts get 400, like
+    at login, so their unexpired tokens stop working too. Deactivation made
+    by this process applies at once; with other worker processes, each may
+    serve its cached copy for up to USER_CACHE_TTL (30 s by default)
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -34,16 +88,22 @@ def get_current_user(
     except JWTError as e:
         raise credentials_exception
     
-    user = db.query(models.User).filter(models.User.username == username).first()
+    user = await load_user(db, username)
 
     if user is None:
         raise credentials_exception
     
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Account is deactivated"
+        )
+    
     return user
 
-def get_current_user_optional(
+async def get_current_user_optional(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Optional dependency - returns user if authenticated, None otherwise
@@ -63,7 +123,6 @@ def get_current_user_optional(
         if username is None or token_type != "access":
             return None
         
-        user = db.query(models.User).filter(models.User.username == username).first()
-        return user
+        return await load_user(db, username)
     except Exception:
-        return None
\ No newline at end of file
+        return None
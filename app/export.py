@@ -0,0 +1,87 @@
+"""
+Streaming export of a user's journal (GET /entries/export).
+
+Rows come from a server-side cursor BATCH_SIZE at a time and are encoded
+(NDJSON or CSV, optionally gzipped) batch by batch, so memory doesn't grow
+with the number of entries. The generator opens its own session: the
+request's session is closed before a streaming response starts sending.
+"""
+import csv
+import io
+import json
+import zlib
+from typing import AsyncIterator
+from sqlalchemy import select
+from . import models
+from .database import AsyncSessionLocal
+
+BATCH_SIZE = 1000
+
+Entry = models.JournalEntry
+EMOTION_COLUMNS = tuple(f"emotion_{name}" for name in models.EMOTION_NAMES)
+ENTRY_FIELDS = (
+    "id", "title", "content", "created_at", "analysis_status",
+    "sentiment_score", "sentiment_label", "subjectivity", "word_count",
+)
+# CSV columns; NDJSON nests key_phrases and emotions instead
+EXPORT_COLUMNS = ENTRY_FIELDS + ("key_phrases",) + EMOTION_COLUMNS
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def _ndjson_lines(rows) -> str:
+    lines = []
+    for row in rows:
+        item = {column: row[column] for column in ENTRY_FIELDS}
+        item["created_at"] = _isoformat(row["created_at"])
+        item["key_phrases"] = json.loads(row["key_phrases"]) if row["key_phrases"] else []
+        emotions = {name: row[f"emotion_{name}"] for name in models.EMOTION_NAMES}
+        item["emotions"] = {} if all(v is None for v in emotions.values()) else emotions
+        lines.append(json.dumps(item, ensure_ascii=False))
+    return "\n".join(lines) + "\n"
+
+
+def _csv_rows(rows, header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow([
+            _isoformat(row[column]) if column == "created_at" else row[column] for column in EXPORT_COLUMNS
+        ])
+    return buffer.getvalue()
+
+
+async def export_entries(user_id: int, format: str = "ndjson", compress: bool = False) -> AsyncIterator[bytes]:
+    """Encoded chunks of all of a user's entries, oldest first"""
+    compressor = zlib.compressobj(wbits=31) if compress else None  # 31: gzip container
+    query = select(*[getattr(Entry, column) for column in EXPORT_COLUMNS]).where(
+        Entry.user_id == user_id
+    ).order_by(Entry.created_at, Entry.id).execution_options(yield_per=BATCH_SIZE)
+
+    first = True
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(query)
+        async for partition in result.mappings().partitions():
+            if format == "csv":
+                text = _csv_rows(partition, header=first)
+            else:
+                text = _ndjson_lines(partition)
+            first = False
+            data = text.encode("utf-8")
+            if compressor is not None:
+                data = compressor.compress(data)
+            if data:
+                yield data
+
+    if format == "csv" and first:
+        # No entries: still send the header row
+        data = _csv_rows([], header=True).encode("utf-8")
+        yield compressor.compress(data) if compressor is not None else data
+    if compressor is not None:
+        yield compressor.flush()
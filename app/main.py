@@ -1,34 +1,69 @@
-from fastapi import FastAPI
+"""
+The MindMate API. create_app() builds the application; importing this module
+only defines routes, startup work (schema check, background workers) runs in
+the lifespan of each app:
+
+    uvicorn app.main:app
+"""
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from .database import engine
-from . import models
-from .routes import users, entries
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from .database import SQLALCHEMY_DATABASE_URL, async_engine, engine
+from . import metrics, migrations, profiling, rollups  # rollups registers its after_flush hook
+from .AI import sentiment
+from .AI.cache import analysis_cache
+from .analysis import analysis_queue
+from .routes import admin, users, entries
+from .dependencies import user_cache
+from .scheduler import SUMMARY_SCHEDULER, summary_scheduler
+from .summaries import summary_cache
 from datetime import timezone, datetime
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
-
-app = FastAPI(
-    title="MindMate",
-    description="AI-Powered Mental Wellness Journal with Advanced Emotion Analysis",
-    version="4.0.0",
-    docs_url="/docs",
-    redoc_url="/redoc"
-)
-
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000", "http://127.0.0.1:3000"],  # Frontend origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Include routers
-app.include_router(users.router)
-app.include_router(entries.router)
-
-@app.get("/")
+
+logger = logging.getLogger(__name__)
+
+# Apply pending migrations on startup. Turn it off where several workers
+# start at once and run `python -m app.migrations` before deploying instead
+AUTO_MIGRATE = os.getenv("MINDMATE_AUTO_MIGRATE", "1") == "1"
+# Load the analysis dependencies (TextBlob, NumPy) in the background on startup
+WARM_UP = os.getenv("MINDMATE_WARM_UP", "1") == "1"
+
+if metrics.METRICS_ENABLED:
+    # Once per process, however many apps create_app() builds
+    metrics.instrument_engine(engine, "sync")
+    metrics.instrument_engine(async_engine.sync_engine, "async")
+    metrics.registry.add_collector(metrics.cache_collector({
+        "users": user_cache.stats, "summaries": summary_cache.stats, "analysis": analysis_cache.stats
+    }))
+    metrics.registry.add_collector(metrics.gauge_collector(
+        "mindmate_analysis_queue_pending", "Entries waiting for deferred analysis", analysis_queue.pending_count
+    ))
+    metrics.registry.add_collector(metrics.scheduler_collector(summary_scheduler.stats))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    version = migrations.ensure_current(engine, AUTO_MIGRATE)
+    logger.info("Database %s at schema version %s", SQLALCHEMY_DATABASE_URL, version)
+    # Pick up entries that were still waiting for analysis at shutdown
+    analysis_queue.requeue_pending()
+    if SUMMARY_SCHEDULER:
+        summary_scheduler.start()
+    app.state.warm_up = asyncio.create_task(asyncio.to_thread(sentiment.warm_up)) if WARM_UP else None
+    try:
+        yield
+    finally:
+        if app.state.warm_up is not None:
+            await asyncio.wait([app.state.warm_up])
+        analysis_queue.stop()
+        await summary_scheduler.stop()
+        await async_engine.dispose()
+
+
 async def root():
     return {
         "message": "Welcome to MindMate API",
@@ -45,10 +80,74 @@ async def root():
         ]
     }
 
-@app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now(timezone.utc).isoformat()}
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "caches": {"users": user_cache.stats(), "summaries": summary_cache.stats()},
+        "summary_scheduler": summary_scheduler.stats()
+    }
+
+async def readiness_check(request: Request):
+    """
+    200 once the warm-up has finished and the database answers, 503 before
+    that. /health stays a liveness check that answers as soon as possible
+    """
+    warm_up = getattr(request.app.state, "warm_up", None)
+    checks = {"analysis": warm_up is None or (warm_up.done() and warm_up.exception() is None)}
+    try:
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        checks["database"] = True
+    except Exception:
+        logger.exception("Readiness check could not reach the database")
+        checks["database"] = False
+    ready = all(checks.values())
+    return JSONResponse({"status": "ready" if ready else "starting", "checks": checks}, status_code=200 if ready else 503)
+
+
+def create_app() -> FastAPI:
+    new_app = FastAPI(
+        title="MindMate",
+        description="AI-Powered Mental Wellness Journal with Advanced Emotion Analysis",
+        version="4.0.0",
+        docs_url="/docs",
+        redoc_url="/redoc",
+        lifespan=lifespan
+    )
+
+    if metrics.METRICS_ENABLED:
+        # Added first so it sits innermost, after CORS: the route is known there
+        new_app.add_middleware(metrics.MetricsMiddleware)
+
+    if profiling.PROFILING_ENABLED:
+        new_app.add_middleware(profiling.ProfilingMiddleware)
+
+    # Add CORS middleware
+    new_app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:3000", "http://127.0.0.1:3000"],  # Frontend origins
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "X-Next-Offset"],  # pagination of GET /entries/ and /entries/search
+    )
+
+    # Include routers
+    new_app.include_router(users.router)
+    new_app.include_router(entries.router)
+    if profiling.PROFILING_ENABLED:
+        new_app.include_router(admin.router)
+    new_app.get("/")(root)
+    new_app.get("/health")(health_check)
+    new_app.get("/ready")(readiness_check)
+    if metrics.METRICS_ENABLED:
+        new_app.get("/metrics", include_in_schema=False)(metrics.metrics_endpoint)
+    return new_app
+
+
+app = create_app()
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,314 @@
+"""
+Built-in metrics in the Prometheus text format (GET /metrics), with no client
+library or collector involved.
+
+- mindmate_request_duration_seconds{route, method}: latency per route, named
+  after the route function (create_entry, get_weekly_summary, ...), recorded
+  by MetricsMiddleware
+- mindmate_requests_total{route, method, status}
+- mindmate_analysis_stage_seconds{stage}: polarity, emotions and key_phrases
+  inside analyze_sentiment_advanced (see time_stage)
+- mindmate_db_queries_total / mindmate_db_query_duration_seconds{engine, kind}
+- mindmate_cache_{hits,misses,evictions}_total{cache} and
+  mindmate_analysis_queue_pending, read from the existing stats at scrape time
+- mindmate_errors_total{source}: 5xx responses and failed analysis jobs
+- mindmate_summary_run_seconds / mindmate_summary_batch_seconds: weekly
+  summary scheduler runs (pacing included) and batches, whose _count is the
+  number of batches; mindmate_summary_backlog, mindmate_summary_refreshes_total
+  {result} and mindmate_summary_scheduler_runner, read from its stats
+
+Metrics are per process: with several workers, scrape each one. Analyses run
+in the batch process pool aren't timed by stage. MINDMATE_METRICS_ENABLED=0
+removes the middleware, the endpoint and the database hooks, and makes
+time_stage a no-op.
+"""
+import bisect
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+from sqlalchemy import event
+from starlette.responses import Response
+
+METRICS_ENABLED = os.getenv("MINDMATE_METRICS_ENABLED", "1") == "1"
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Analysis stages and queries are mostly well under a millisecond
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+# Scheduler batches take seconds, paced runs up to the refresh window and more
+JOB_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 600.0, 1800.0, 3600.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# ========== METRIC TYPES ==========
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Bucket counts are kept per bucket and made cumulative when rendered"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = REQUEST_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += seconds
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._series.items())
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                bucket = _format_labels(self.labelnames, labels, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{bucket} {cumulative}")
+            series = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{series} {_format_value(total)}")
+            lines.append(f"{self.name}_count{series} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Metrics plus collectors: callbacks that render values owned elsewhere at scrape time"""
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors: List[Callable[[], Iterable[str]]] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[str]]):
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+request_duration = registry.register(Histogram(
+    "mindmate_request_duration_seconds", "Time to handle a request, by route", ("route", "method")
+))
+requests_total = registry.register(Counter(
+    "mindmate_requests_total", "Requests handled, by route and status code", ("route", "method", "status")
+))
+analysis_stage_duration = registry.register(Histogram(
+    "mindmate_analysis_stage_seconds", "Time spent in each stage of analyze_sentiment_advanced", ("stage",),
+    buckets=FAST_BUCKETS
+))
+db_queries = registry.register(Counter(
+    "mindmate_db_queries_total", "SQL statements executed, by engine and statement kind", ("engine", "kind")
+))
+db_query_duration = registry.register(Histogram(
+    "mindmate_db_query_duration_seconds", "Time to execute a SQL statement", ("engine", "kind"),
+    buckets=FAST_BUCKETS
+))
+errors = registry.register(Counter(
+    "mindmate_errors_total", "Server errors (5xx responses) and failed analysis jobs", ("source",)
+))
+for _source in ("request", "analysis"):
+    errors.inc(_source, amount=0)
+summary_run_duration = registry.register(Histogram(
+    "mindmate_summary_run_seconds", "Time for a weekly summary refresh run, pacing included",
+    buckets=JOB_BUCKETS
+))
+summary_batch_duration = registry.register(Histogram(
+    "mindmate_summary_batch_seconds", "Time to refresh one batch of weekly summaries", buckets=JOB_BUCKETS
+))
+
+
+# ========== INSTRUMENTATION ==========
+
+class _StageTimer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        analysis_stage_duration.observe(time.perf_counter() - self.start, self.stage)
+
+
+class _NoTimer:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NO_TIMER = _NoTimer()
+
+
+def time_stage(stage: str):
+    """Context manager that records how long an analysis stage took"""
+    return _StageTimer(stage) if METRICS_ENABLED else _NO_TIMER
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware (no BaseHTTPMiddleware, which buffers through an
+    extra task per request). The route is known once routing has run, so it
+    is read from the scope after the response has been sent
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            name = getattr(route, "name", None) or "unmatched"
+            method = scope["method"]
+            request_duration.observe(time.perf_counter() - start, name, method)
+            requests_total.inc(name, method, str(status))
+            if status >= 500:
+                errors.inc("request")
+
+
+def _statement_kind(statement: str) -> str:
+    kind = statement.lstrip()[:6].upper()
+    return kind if kind in ("SELECT", "INSERT", "UPDATE", "DELETE") else "OTHER"
+
+
+def instrument_engine(engine, name: str):
+    """Count and time every statement run on a (sync) engine"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_query(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _end_query(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_metrics_start", None)
+        kind = _statement_kind(statement)
+        db_queries.inc(name, kind)
+        if start is not None:
+            db_query_duration.observe(time.perf_counter() - start, name, kind)
+
+
+def cache_collector(caches: Dict[str, Callable[[], dict]]) -> Callable[[], List[str]]:
+    """Cache counters from each cache's stats() (name -> stats function)"""
+    def collect() -> List[str]:
+        stats = {name: get_stats() for name, get_stats in caches.items()}
+        lines = []
+        for field in ("hits", "misses", "evictions"):
+            metric = f"mindmate_cache_{field}_total"
+            lines += [f"# HELP {metric} Cache {field}, by cache", f"# TYPE {metric} counter"]
+            lines += [f'{metric}{{cache="{name}"}} {values.get(field, 0)}' for name, values in stats.items()]
+        lines += ["# HELP mindmate_cache_entries Entries currently cached", "# TYPE mindmate_cache_entries gauge"]
+        lines += [f'mindmate_cache_entries{{cache="{name}"}} {values.get("size", 0)}' for name, values in stats.items()]
+        return lines
+    return collect
+
+
+def scheduler_collector(get_stats: Callable[[], dict]) -> Callable[[], List[str]]:
+    """Backlog, refresh results and runner state from the summary scheduler's stats()"""
+    def collect() -> List[str]:
+        stats = get_stats()
+        lines = [
+            "# HELP mindmate_summary_backlog Users still to refresh in the current run",
+            "# TYPE mindmate_summary_backlog gauge",
+            f"mindmate_summary_backlog {stats['backlog']}",
+            "# HELP mindmate_summary_scheduler_runner 1 in the process that runs the scheduler",
+            "# TYPE mindmate_summary_scheduler_runner gauge",
+            f"mindmate_summary_scheduler_runner {int(stats['runner'])}",
+            "# HELP mindmate_summary_refreshes_total Weekly summary refreshes, by result",
+            "# TYPE mindmate_summary_refreshes_total counter",
+        ]
+        for result, field in (("stored", "refreshed"), ("conflict", "conflicts"), ("failed", "failures")):
+            lines.append(f'mindmate_summary_refreshes_total{{result="{result}"}} {stats[field]}')
+        return lines
+    return collect
+
+
+def gauge_collector(name: str, documentation: str, read: Callable[[], float]) -> Callable[[], List[str]]:
+    def collect() -> List[str]:
+        return [f"# HELP {name} {documentation}", f"# TYPE {name} gauge", f"{name} {_format_value(read())}"]
+    return collect
+
+
+async def metrics_endpoint():
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
@@ -0,0 +1,185 @@
+"""
+Schema migrations for the SQLite database.
+
+create_all only creates tables that don't exist yet, so changes to existing
+tables (new columns, indexes, backfills) live here. The last applied migration
+is stored in SQLite's PRAGMA user_version, and every migration is written so
+that it is a no-op on a database created from the current models.
+
+Run them before starting new code:
+
+    python -m app.migrations [upgrade|status]
+
+The app itself only checks the version on startup (one PRAGMA read) and
+upgrades when MINDMATE_AUTO_MIGRATE allows it. create_all only runs as part
+of an upgrade, so a new model needs a new version too, even a no-op one.
+
+An upgrade is one BEGIN IMMEDIATE transaction: processes that upgrade at
+once (workers starting together, a deploy hook) queue on SQLite's write lock
+and re-read the version once they hold it, so only the first one migrates.
+"""
+import argparse
+import os
+import time
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError
+from . import models, rollups, search
+from .database import is_busy_error
+
+# How long an upgrade waits for another process' upgrade to finish
+MIGRATION_LOCK_TIMEOUT = float(os.getenv("MINDMATE_MIGRATION_LOCK_TIMEOUT", "600"))
+
+
+def _has_column(conn: Connection, table: str, column: str) -> bool:
+    rows = conn.exec_driver_sql(f"PRAGMA table_info({table})").fetchall()
+    return any(row[1] == column for row in rows)
+
+
+def _add_column(conn: Connection, table: str, column: str, ddl: str):
+    if not _has_column(conn, table, column):
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+
+# ========== MIGRATIONS ==========
+
+def _add_analysis_status(conn: Connection):
+    """Entries can be saved before their analysis has run"""
+    _add_column(conn, "journal_entries", "analysis_status", "VARCHAR")
+    conn.execute(text(
+        "UPDATE journal_entries SET analysis_status = 'complete' WHERE analysis_status IS NULL"
+    ))
+
+
+def _add_user_created_at_index(conn: Connection):
+    """Per-user time range queries used to scan the whole table"""
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_journal_entries_user_id_created_at "
+        "ON journal_entries (user_id, created_at)"
+    )
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_journal_entries_pending "
+        "ON journal_entries (id) WHERE analysis_status = 'pending'"
+    )
+
+
+def _add_emotion_columns(conn: Connection):
+    """Emotion scores move from the emotion_data JSON into float columns"""
+    for name in models.EMOTION_NAMES:
+        _add_column(conn, "journal_entries", f"emotion_{name}", "FLOAT")
+    assignments = ", ".join(
+        f"emotion_{name} = json_extract(emotion_data, '$.{name}')" for name in models.EMOTION_NAMES
+    )
+    conn.exec_driver_sql(
+        f"UPDATE journal_entries SET {assignments} "
+        "WHERE emotion_data IS NOT NULL AND json_valid(emotion_data)"
+    )
+
+
+def _backfill_rollups(conn: Connection):
+    """daily_mood_rollups is created by create_all, fill it from existing entries"""
+    rollups.rebuild(conn)
+
+
+def _add_entry_search(conn: Connection):
+    """FTS5 index over journal entries, kept in sync by triggers"""
+    search.create_index(conn)
+    search.rebuild(conn)
+
+
+def _scope_entry_search(conn: Connection):
+    """The full-text index gains user_id, so searches only rank the user's entries"""
+    if not _has_column(conn, search.FTS_TABLE, "user_id"):
+        search.drop_index(conn)
+        search.create_index(conn)
+        search.rebuild(conn)
+
+
+# (version, description, function) - append only, never renumber
+MIGRATIONS = [
+    (1, "add journal_entries.analysis_status", _add_analysis_status),
+    (2, "index journal_entries (user_id, created_at) and pending entries", _add_user_created_at_index),
+    (3, "store emotion scores in journal_entries.emotion_* columns", _add_emotion_columns),
+    (4, "backfill daily_mood_rollups", _backfill_rollups),
+    (5, "full-text index journal_entries_fts with sync triggers", _add_entry_search),
+    (6, "index journal_entries.user_id in journal_entries_fts", _scope_entry_search),
+]
+
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+class SchemaOutdated(RuntimeError):
+    """The database needs migrations that this process may not apply"""
+
+
+def current_version(conn: Connection) -> int:
+    return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def _begin_immediate(conn: Connection):
+    """Take SQLite's write lock, waiting out other upgrades (busy_timeout at a time)"""
+    deadline = time.monotonic() + MIGRATION_LOCK_TIMEOUT
+    while True:
+        try:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            return
+        except OperationalError as e:
+            if not is_busy_error(e) or time.monotonic() > deadline:
+                raise
+
+
+def upgrade(engine: Engine) -> int:
+    """Create missing tables and apply pending migrations, returns the new version"""
+    # The driver would only BEGIN before DML; here every statement, DDL
+    # included, runs in the transaction started below
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        _begin_immediate(conn)
+        try:
+            version = current_version(conn)
+            if version < LATEST_VERSION:
+                models.Base.metadata.create_all(bind=conn)
+                for number, description, migrate in MIGRATIONS:
+                    if number > version:
+                        migrate(conn)
+                        conn.exec_driver_sql(f"PRAGMA user_version = {number}")
+                        version = number
+        except BaseException:
+            conn.exec_driver_sql("ROLLBACK")
+            raise
+        conn.exec_driver_sql("COMMIT")
+    return version
+
+
+def ensure_current(engine: Engine, auto_migrate: bool) -> int:
+    """
+    The database's version, after upgrading it if it's behind and
+    auto_migrate is set; a current database gets no DDL at all
+    """
+    with engine.connect() as conn:
+        version = current_version(conn)
+    if version >= LATEST_VERSION:
+        return version
+    if not auto_migrate:
+        raise SchemaOutdated(
+            f"Database schema is at version {version}, expected {LATEST_VERSION}: run python -m app.migrations"
+        )
+    return upgrade(engine)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create or upgrade the MindMate database")
+    parser.add_argument("command", nargs="?", default="upgrade", choices=["upgrade", "status"])
+    args = parser.parse_args()
+
+    from .database import SQLALCHEMY_DATABASE_URL, engine
+    if args.command == "status":
+        with engine.connect() as conn:
+            print(f"{SQLALCHEMY_DATABASE_URL}: version {current_version(conn)} of {LATEST_VERSION}")
+    else:
+        print(f"{SQLALCHEMY_DATABASE_URL}: upgraded to version {upgrade(engine)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Float, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Float, ForeignKey, Boolean, Index, text
 from sqlalchemy.orm import relationship
 from datetime import datetime, timedelta, timezone
 from .database import Base
@@ -18,6 +18,9 @@ class User(Base):
     entries = relationship("JournalEntry", back_populates="owner", cascade="all, delete-orphan")
     reset_tokens = relationship("PasswordResetToken", back_populates="user", cascade="all, delete-orphan")
 
+# The 8 emotions detected by the analyzer, each stored in an emotion_<name> column
+EMOTION_NAMES = ("joy", "sadness", "anger", "fear", "surprise", "trust", "anticipation", "disgust")
+
 class JournalEntry(Base):
     __tablename__ = "journal_entries"
 
@@ -28,13 +31,80 @@ class JournalEntry(Base):
     sentiment_label = Column(String)
     subjectivity = Column(Float, nullable=True)  # New: How subjective/objective
     word_count = Column(Integer, nullable=True)  # New: Word count
-    emotion_data = Column(Text, nullable=True)   # New: JSON string of emotions
+    emotion_data = Column(Text, nullable=True)   # New: JSON string of emotions (kept for older readers)
+    emotion_joy = Column(Float, nullable=True)
+    emotion_sadness = Column(Float, nullable=True)
+    emotion_anger = Column(Float, nullable=True)
+    emotion_fear = Column(Float, nullable=True)
+    emotion_surprise = Column(Float, nullable=True)
+    emotion_trust = Column(Float, nullable=True)
+    emotion_anticipation = Column(Float, nullable=True)
+    emotion_disgust = Column(Float, nullable=True)
     key_phrases = Column(Text, nullable=True)    # New: JSON string of key phrases
+    analysis_status = Column(String, default="complete")  # pending / complete / failed
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
 
     owner = relationship("User", back_populates="entries")
 
+    @property
+    def emotions(self) -> dict:
+        """Emotion scores from the emotion columns ({} if the entry has none)"""
+        scores = {name: getattr(self, f"emotion_{name}") for name in EMOTION_NAMES}
+        if all(score is None for score in scores.values()):
+            return {}
+        return scores
+
+    @emotions.setter
+    def emotions(self, scores: dict):
+        for name in EMOTION_NAMES:
+            setattr(self, f"emotion_{name}", scores.get(name))
+
+    __table_args__ = (
+        # Every per-user listing / summary filters on user_id and orders by created_at
+        Index("ix_journal_entries_user_id_created_at", "user_id", "created_at"),
+        # Lets the analysis queue find pending entries on startup without a scan
+        Index("ix_journal_entries_pending", "id", sqlite_where=text("analysis_status = 'pending'")),
+    )
+
+class DailyMoodRollup(Base):
+    """
+    Running totals of a user's analyzed entries per (UTC) day, kept up to date
+    by app/rollups.py so summaries and trends don't have to scan entries.
+    """
+    __tablename__ = "daily_mood_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    entry_count = Column(Integer, nullable=False, default=0)
+    sentiment_sum = Column(Float, nullable=False, default=0.0)
+    sentiment_sq_sum = Column(Float, nullable=False, default=0.0)
+    word_count = Column(Integer, nullable=False, default=0)
+    emotion_entry_count = Column(Integer, nullable=False, default=0)  # entries that have emotion scores
+    joy_sum = Column(Float, nullable=False, default=0.0)
+    sadness_sum = Column(Float, nullable=False, default=0.0)
+    anger_sum = Column(Float, nullable=False, default=0.0)
+    fear_sum = Column(Float, nullable=False, default=0.0)
+    surprise_sum = Column(Float, nullable=False, default=0.0)
+    trust_sum = Column(Float, nullable=False, default=0.0)
+    anticipation_sum = Column(Float, nullable=False, default=0.0)
+    disgust_sum = Column(Float, nullable=False, default=0.0)
+
+class WeeklySummary(Base):
+    """
+    Precomputed weekly summary per user (see app/summaries.py). Entry writes
+    bump version and clear summary; a computed summary is only stored if
+    version hasn't moved since it was read.
+    """
+    __tablename__ = "weekly_summaries"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    summary = Column(Text, nullable=True)  # JSON of schemas.WeeklySummary, NULL when stale
+    etag = Column(String, nullable=True)
+    computed_at = Column(DateTime, nullable=True)
+    valid_until = Column(DateTime, nullable=True)  # oldest entry leaves the week; NULL: until the next write
+
 class PasswordResetToken(Base):
     __tablename__ = "password_reset_tokens"
     
@@ -0,0 +1,186 @@
+"""
+On-demand request profiling, off unless MINDMATE_PROFILING=1 and
+MINDMATE_PROFILING_TOKEN are both set; otherwise neither the middleware nor
+the admin routes are installed, so it costs nothing.
+
+When enabled, a request runs under cProfile if it carries the admin token in
+the X-Profile-Token header, or if it is picked at random
+(MINDMATE_PROFILE_SAMPLE_RATE, optionally only under the path prefixes in
+MINDMATE_PROFILE_SAMPLE_PATHS), which catches slow calls on real traffic
+that can't be reproduced. Each profile is saved as a pstats file, named by
+route and request id (the X-Request-ID header, or a new one), next to a JSON
+description. The response says which one in X-Profile-Id. List them on
+GET /admin/profiles and download one with GET /admin/profiles/{id}; open it
+with pstats, snakeviz or flameprof.
+
+cProfile sees the event loop thread only: work handed to threads (aiosqlite
+queries, inline analysis) shows up as time spent awaiting it, and other
+requests interleaved on the loop meanwhile are included. One request is
+profiled at a time per process; others run normally in the meantime.
+"""
+import asyncio
+import cProfile
+import hmac
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from fastapi import Header, HTTPException, status
+
+PROFILING_TOKEN = os.getenv("MINDMATE_PROFILING_TOKEN", "")
+PROFILING_ENABLED = os.getenv("MINDMATE_PROFILING", "0") == "1" and bool(PROFILING_TOKEN)
+PROFILE_DIR = os.getenv("MINDMATE_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "mindmate-profiles"))
+# Profiles kept on disk (oldest deleted first)
+PROFILE_KEEP = int(os.getenv("MINDMATE_PROFILE_KEEP", "50"))
+PROFILE_SAMPLE_RATE = float(os.getenv("MINDMATE_PROFILE_SAMPLE_RATE", "0"))
+# Comma-separated path prefixes that sampling applies to (all paths if empty)
+PROFILE_SAMPLE_PATHS = tuple(
+    prefix.strip() for prefix in os.getenv("MINDMATE_PROFILE_SAMPLE_PATHS", "").split(",") if prefix.strip()
+)
+
+TOKEN_HEADER = "x-profile-token"
+# The admin routes carry the token too, but are never profiled
+ADMIN_PREFIX = "/admin/"
+_SAFE_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def token_matches(token: Optional[str]) -> bool:
+    return bool(PROFILING_TOKEN) and token is not None and hmac.compare_digest(token, PROFILING_TOKEN)
+
+
+def require_admin(x_profile_token: Optional[str] = Header(None)):
+    """Dependency for the admin routes"""
+    if not token_matches(x_profile_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin token required")
+
+
+def _sampled(path: str) -> bool:
+    if PROFILE_SAMPLE_RATE <= 0:
+        return False
+    if PROFILE_SAMPLE_PATHS and not path.startswith(PROFILE_SAMPLE_PATHS):
+        return False
+    return random.random() < PROFILE_SAMPLE_RATE
+
+
+# ========== STORAGE ==========
+
+def new_profile_id(route: str, request_id: str) -> str:
+    """Ids sort by time and name the route and request"""
+    return "{}-{}-{}".format(
+        datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f"),
+        _SAFE_RE.sub("_", route)[:64],
+        _SAFE_RE.sub("_", request_id)[:64],
+    )
+
+
+def save_profile(profile: cProfile.Profile, profile_id: str, info: Dict[str, Any], directory: str = PROFILE_DIR):
+    """Write the pstats file and its description"""
+    os.makedirs(directory, exist_ok=True)
+    profile.dump_stats(os.path.join(directory, profile_id + ".pstats"))
+    with open(os.path.join(directory, profile_id + ".json"), "w") as f:
+        json.dump({"id": profile_id, **info}, f)
+    _prune(directory)
+
+
+def _prune(directory: str):
+    """Keep the newest PROFILE_KEEP profiles (ids sort by time)"""
+    names = sorted(name[:-5] for name in os.listdir(directory) if name.endswith(".json"))
+    for profile_id in names[:-PROFILE_KEEP] if PROFILE_KEEP > 0 else names:
+        for suffix in (".json", ".pstats"):
+            try:
+                os.remove(os.path.join(directory, profile_id + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles(limit: int = 50, directory: str = PROFILE_DIR) -> List[Dict[str, Any]]:
+    """Descriptions of the newest profiles, newest first, from every worker process"""
+    if not os.path.isdir(directory):
+        return []
+    names = sorted((name for name in os.listdir(directory) if name.endswith(".json")), reverse=True)
+    profiles = []
+    for name in names[:limit]:
+        try:
+            with open(os.path.join(directory, name)) as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue  # pruned or still being written
+    return profiles
+
+
+def profile_path(profile_id: str, directory: str = PROFILE_DIR) -> Optional[str]:
+    if _SAFE_RE.search(profile_id):
+        return None
+    path = os.path.join(directory, profile_id + ".pstats")
+    return path if os.path.isfile(path) else None
+
+
+# ========== MIDDLEWARE ==========
+
+class ProfilingMiddleware:
+    """Plain ASGI middleware; only installed when PROFILING_ENABLED"""
+
+    def __init__(self, app, directory: str = PROFILE_DIR):
+        self.app = app
+        self.directory = directory
+        self._busy = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(ADMIN_PREFIX):
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        token = headers.get(TOKEN_HEADER.encode())
+        requested = token is not None and token_matches(token.decode("latin-1"))
+        if not (requested or _sampled(scope["path"])) or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            request_id = headers.get(b"x-request-id", b"").decode("latin-1") or uuid.uuid4().hex[:16]
+            created_at = datetime.now(timezone.utc)
+            profile_id = None
+            response_status = 500
+
+            def route_name():
+                # Routing stores the matched route in the (shared) scope
+                return getattr(scope.get("route"), "name", None) or "unmatched"
+
+            async def send_wrapper(message):
+                nonlocal profile_id, response_status
+                if message["type"] == "http.response.start":
+                    response_status = message["status"]
+                    profile_id = new_profile_id(route_name(), request_id)
+                    message = {**message, "headers": [
+                        *message.get("headers", []),
+                        (b"x-request-id", request_id.encode("latin-1")),
+                        (b"x-profile-id", profile_id.encode("latin-1")),
+                    ]}
+                await send(message)
+
+            profile = cProfile.Profile()
+            start = time.perf_counter()
+            profile.enable()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                profile.disable()
+                duration = time.perf_counter() - start
+                await asyncio.to_thread(save_profile, profile, profile_id or new_profile_id(route_name(), request_id), {
+                    "route": route_name(),
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "request_id": request_id,
+                    "status": response_status,
+                    "trigger": "header" if requested else "sample",
+                    "duration_ms": round(duration * 1e3, 3),
+                    "created_at": created_at.isoformat(),
+                }, self.directory)
+        finally:
+            self._busy.release()
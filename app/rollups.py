@@ -0,0 +1,214 @@
+"""
+Daily mood rollups: running totals of each user's analyzed entries per day.
+
+An after_flush hook keeps daily_mood_rollups in step with every ORM write to
+journal_entries (create, update, delete, deferred analysis) by applying the
+difference each entry makes to its day. Code that writes entries with Core
+statements instead of the ORM has to call rebuild_days() for the days it
+touched. To backfill or repair the table:
+
+    python -m app.rollups rebuild [--user-id ID]
+"""
+import argparse
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import and_, case, delete, event, func, insert, inspect, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from . import models
+
+logger = logging.getLogger(__name__)
+
+Entry = models.JournalEntry
+Rollup = models.DailyMoodRollup
+
+EMOTION_SUMS = tuple(f"{name}_sum" for name in models.EMOTION_NAMES)
+TOTALS = ("entry_count", "sentiment_sum", "sentiment_sq_sum", "word_count", "emotion_entry_count") + EMOTION_SUMS
+
+# Entry attributes that feed into a rollup
+TRACKED = ("user_id", "created_at", "sentiment_score", "word_count") + tuple(
+    f"emotion_{name}" for name in models.EMOTION_NAMES
+)
+
+_UNKNOWN = object()
+
+
+def entry_totals(values: dict) -> Optional[dict]:
+    """What one entry adds to its day (None for entries that aren't analyzed)"""
+    score = values.get("sentiment_score")
+    if score is None or values.get("created_at") is None or values.get("user_id") is None:
+        return None
+    emotions = [values.get(f"emotion_{name}") for name in models.EMOTION_NAMES]
+    totals = {
+        "entry_count": 1,
+        "sentiment_sum": score,
+        "sentiment_sq_sum": score * score,
+        "word_count": values.get("word_count") or 0,
+        "emotion_entry_count": 0 if all(e is None for e in emotions) else 1,
+    }
+    for column, score in zip(EMOTION_SUMS, emotions):
+        totals[column] = score or 0.0
+    return totals
+
+
+def add_entry_totals(deltas: Dict[Tuple[int, date], dict], values: dict, sign: int = 1):
+    """Accumulate one entry's totals into per-(user_id, day) deltas"""
+    totals = entry_totals(values)
+    if totals is None:
+        return
+    key = (values["user_id"], values["created_at"].date())
+    day = deltas.setdefault(key, dict.fromkeys(TOTALS, 0))
+    for column, value in totals.items():
+        day[column] += sign * value
+
+
+def apply_deltas(conn: Connection, deltas: Dict[Tuple[int, date], dict]):
+    """Upsert the deltas and drop days that no longer have entries"""
+    for (user_id, day), totals in deltas.items():
+        stmt = sqlite_insert(Rollup).values(user_id=user_id, day=day, **totals)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Rollup.user_id, Rollup.day],
+            set_={column: getattr(Rollup, column) + stmt.excluded[column] for column in TOTALS}
+        )
+        conn.execute(stmt)
+    if deltas:
+        conn.execute(delete(Rollup).where(
+            Rollup.entry_count <= 0,
+            or_(*[and_(Rollup.user_id == user_id, Rollup.day == day) for user_id, day in deltas])
+        ))
+
+
+# ========== REBUILD ==========
+
+def totals_columns() -> list:
+    """Aggregates of journal_entries rows, one per TOTALS column (in order)"""
+    emotion_columns = [getattr(Entry, f"emotion_{name}") for name in models.EMOTION_NAMES]
+    has_emotions = or_(*[column.isnot(None) for column in emotion_columns])
+    return [
+        func.count(),
+        func.sum(Entry.sentiment_score),
+        func.sum(Entry.sentiment_score * Entry.sentiment_score),
+        func.coalesce(func.sum(Entry.word_count), 0),
+        func.sum(case((has_emotions, 1), else_=0)),
+        *[func.coalesce(func.sum(column), 0.0) for column in emotion_columns]
+    ]
+
+
+def rollup_select():
+    """Aggregate analyzed entries into rollup rows, grouped by user and day"""
+    day = func.date(Entry.created_at)
+    return select(Entry.user_id, day, *totals_columns()).where(
+        Entry.sentiment_score.isnot(None),
+        Entry.created_at.isnot(None),
+        Entry.user_id.isnot(None)
+    ).group_by(Entry.user_id, day)
+
+
+def rebuild_days(conn: Connection, days: Iterable[Tuple[int, date]]):
+    """Recompute the given (user_id, day) rollups from journal_entries"""
+    for user_id, day in set(days):
+        start = datetime.combine(day, time.min)
+        conn.execute(delete(Rollup).where(Rollup.user_id == user_id, Rollup.day == day))
+        conn.execute(insert(Rollup).from_select(
+            ["user_id", "day", *TOTALS],
+            rollup_select().where(
+                Entry.user_id == user_id,
+                Entry.created_at >= start,
+                Entry.created_at < start + timedelta(days=1)
+            )
+        ))
+
+
+def rebuild(conn: Connection, user_id: Optional[int] = None) -> int:
+    """Recompute rollups from scratch (for one user or everyone), returns the row count"""
+    query = rollup_select()
+    clear = delete(Rollup)
+    if user_id is not None:
+        query = query.where(Entry.user_id == user_id)
+        clear = clear.where(Rollup.user_id == user_id)
+    conn.execute(clear)
+    conn.execute(insert(Rollup).from_select(["user_id", "day", *TOTALS], query))
+    count = select(func.count()).select_from(Rollup)
+    if user_id is not None:
+        count = count.where(Rollup.user_id == user_id)
+    return conn.execute(count).scalar()
+
+
+# ========== ORM HOOK ==========
+
+def _previous_values(entry: Entry):
+    """Values an entry had before this flush, or _UNKNOWN if they weren't loaded"""
+    state = inspect(entry)
+    values = {}
+    for name in TRACKED:
+        history = state.attrs[name].history
+        if history.deleted:
+            values[name] = history.deleted[0]
+        elif history.unchanged:
+            values[name] = history.unchanged[0]
+        elif history.added:
+            values[name] = None  # attribute was unset before
+        else:
+            return _UNKNOWN
+    return values
+
+
+def _current_values(entry: Entry) -> dict:
+    return {name: getattr(entry, name) for name in TRACKED}
+
+
+@event.listens_for(Session, "after_flush")
+def _update_rollups(session: Session, flush_context):
+    deltas = {}
+    recompute = set()
+
+    for entry in session.new:
+        if isinstance(entry, Entry):
+            add_entry_totals(deltas, _current_values(entry))
+
+    for entry in session.dirty:
+        if not isinstance(entry, Entry):
+            continue
+        state = inspect(entry)
+        if not any(state.attrs[name].history.has_changes() for name in TRACKED):
+            continue
+        previous = _previous_values(entry)
+        current = _current_values(entry)
+        if previous is _UNKNOWN:
+            if current["created_at"] is not None:
+                recompute.add((current["user_id"], current["created_at"].date()))
+            continue
+        add_entry_totals(deltas, previous, -1)
+        add_entry_totals(deltas, current)
+
+    for entry in session.deleted:
+        if not isinstance(entry, Entry):
+            continue
+        previous = _previous_values(entry)
+        if previous is _UNKNOWN:
+            logger.warning("Rollups for entry %s may be stale, run `python -m app.rollups rebuild`", entry.id)
+            continue
+        add_entry_totals(deltas, previous, -1)
+
+    if deltas or recompute:
+        conn = session.connection()
+        apply_deltas(conn, deltas)
+        rebuild_days(conn, recompute)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the daily mood rollup table")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--user-id", type=int, default=None, help="only rebuild this user's rollups")
+    args = parser.parse_args()
+
+    from .database import engine
+    with engine.begin() as conn:
+        rows = rebuild(conn, args.user_id)
+    print(f"Rebuilt {rows} daily rollup rows")
+
+
+if __name__ == "__main__":
+    main()
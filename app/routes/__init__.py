@@ -1,5 +1,6 @@
 # Make routes directory a Python package
 from .users import router as users_router
 from .entries import router as entries_router
+from .admin import router as admin_router
 
-__all__ = ["users_router", "entries_router"]
\ No newline at end of file
+__all__ = ["users_router", "entries_router", "admin_router"]
\ No newline at end of file
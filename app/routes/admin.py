@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse, PlainTextResponse
+from typing import List, Literal
+import asyncio
+import io
+import pstats
+from .. import profiling, schemas
+
+# Only included when profiling is enabled (see app.profiling)
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(profiling.require_admin)])
+
+MAX_PROFILES = 200
+
+# ========== PROFILES ==========
+@router.get("/profiles", response_model=List[schemas.RequestProfile])
+async def list_profiles(limit: int = Query(50, ge=1, le=MAX_PROFILES)):
+    """Recent request profiles, newest first"""
+    return await asyncio.to_thread(profiling.list_profiles, limit)
+
+
+def _profile_path(profile_id: str) -> str:
+    path = profiling.profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return path
+
+
+@router.get("/profiles/{profile_id}", response_class=FileResponse)
+async def download_profile(profile_id: str):
+    """The raw pstats file (python -m pstats, snakeviz, flameprof)"""
+    return FileResponse(
+        _profile_path(profile_id), media_type="application/octet-stream", filename=f"{profile_id}.pstats"
+    )
+
+
+@router.get("/profiles/{profile_id}/summary", response_class=PlainTextResponse)
+async def profile_summary(
+    profile_id: str,
+    sort: Literal["cumulative", "tottime", "calls"] = "cumulative",
+    limit: int = Query(40, ge=1, le=500)
+):
+    """The top functions of a profile as pstats prints them"""
+    path = _profile_path(profile_id)
+
+    def render():
+        out = io.StringIO()
+        pstats.Stats(path, stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    return PlainTextResponse(await asyncio.to_thread(render))
@@ -1,65 +1,226 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from starlette.requests import ClientDisconnect
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import json
-from datetime import datetime, timedelta, timezone
-from ..database import get_db
+from datetime import date, datetime, timedelta, timezone
+from ..database import get_async_db, retry_on_busy
 from .. import models, schemas
-from ..AI import sentiment, summarizer
+from .. import analysis, analytics, bulk, export, search, summaries, trends
 from ..dependencies import get_current_user
+from ..utils.etag import etag_matches, make_etag
+from ..utils.pagination import decode_cursor, encode_cursor
 
 router = APIRouter(prefix="/entries", tags=["entries"])
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_SEARCH_RESULTS = 100
+# Deep offsets re-rank every earlier match, narrow the query instead
+MAX_SEARCH_OFFSET = 1000
+
 # ========== CREATE ==========
 @router.post("/", response_model=schemas.JournalEntryResponse)
-def create_entry(
+@retry_on_busy
+async def create_entry(
     entry: schemas.JournalEntryCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    defer_analysis: Optional[bool] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.CurrentUser = Depends(get_current_user)
 ):
-    # Enhanced sentiment analysis
-    sentiment_result = sentiment.analyze_sentiment_advanced(entry.content)
-    
-    # Create entry with enhanced data
     db_entry = models.JournalEntry(
         title=entry.title,
         content=entry.content,
-        sentiment_score=sentiment_result["sentiment_score"],
-        sentiment_label=sentiment_result["sentiment_label"],
-        subjectivity=sentiment_result.get("subjectivity"),
-        word_count=sentiment_result.get("word_count"),
-        emotion_data=json.dumps(sentiment_result.get("emotions", {})),
-        key_phrases=json.dumps(sentiment_result.get("key_phrases", [])),
         user_id=current_user.id
     )
+    
+    # Enhanced sentiment analysis, now or in the background
+    deferred = analysis.should_defer(defer_analysis)
+    if deferred:
+        db_entry.analysis_status = analysis.PENDING
+    else:
+        await analysis.analyze_entry_async(db_entry)
+    
     db.add(db_entry)
-    db.commit()
-    db.refresh(db_entry)
+    await db.commit()
+    await db.refresh(db_entry)
+    
+    if deferred and not analysis.analysis_queue.submit(db_entry.id):
+        # Queue is full - analyze inline rather than piling up more work
+        await analysis.analyze_entry_async(db_entry)
+        await db.commit()
+        await db.refresh(db_entry)
     return db_entry
 
+# ========== BULK IMPORT ==========
+class ImportResponse(StreamingResponse):
+    """
+    Streams while the request body is still arriving. The import is the
+    only reader of receive(): StreamingResponse would also listen for a
+    disconnect there (servers before ASGI spec 2.4) and swallow body chunks,
+    so a disconnect surfaces from request.stream() or send() instead
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
+        if self.background is not None:
+            await self.background()
+
+@router.post("/bulk", response_class=ImportResponse)
+async def bulk_import(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.CurrentUser = Depends(get_current_user)
+):
+    """
+    Import entries from NDJSON or a JSON array of {"title", "content",
+    "created_at" (optional)} objects, streamed in the request body.
+    Answers with NDJSON while the upload is imported: one result line per
+    item, then a {"summary": ...} line. Clients sending large uploads should
+    read the response as it arrives (curl does), or the import waits for them.
+    """
+    async def results():
+        async for lines in bulk.import_entries(db, current_user.id, request.stream()):
+            yield "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+
+    return ImportResponse(results(), media_type="application/x-ndjson")
+
 # ========== READ ALL ==========
-@router.get("/", response_model=List[schemas.JournalEntryResponse])
-def get_entries(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+# Columns sent in the lightweight listing (view=summary)
+SUMMARY_COLUMNS = (
+    models.JournalEntry.id,
+    models.JournalEntry.title,
+    models.JournalEntry.sentiment_score,
+    models.JournalEntry.sentiment_label,
+    models.JournalEntry.analysis_status,
+    models.JournalEntry.created_at,
+    models.JournalEntry.user_id,
+)
+
+@router.get(
+    "/",
+    response_model=List[schemas.JournalEntryListItem],
+    response_model_exclude_unset=True
+)
+async def get_entries(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    view: Literal["full", "summary"] = "full",
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.CurrentUser = Depends(get_current_user)
 ):
+    """
+    List entries, newest first, `limit` (default 50) at a time.
+    The X-Next-Cursor response header holds the `cursor` for the next page
+    (absent on the last page). `view=summary` leaves out the content, `since`
+    only returns entries created since then (naive times are taken as UTC).
+    """
+    if view == "summary":
+        query = select(*SUMMARY_COLUMNS)
+    else:
+        query = select(models.JournalEntry)
+    
     # Only return current user's entries
-    entries = db.query(models.JournalEntry).filter(
-        models.JournalEntry.user_id == current_user.id
-    ).order_by(models.JournalEntry.created_at.desc()).all()
+    query = query.where(models.JournalEntry.user_id == current_user.id)
+    if since is not None:
+        if since.tzinfo is not None:
+            # created_at is stored as naive UTC
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        query = query.where(models.JournalEntry.created_at >= since)
+    if cursor is not None:
+        try:
+            cursor_created_at, cursor_id = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        query = query.where(
+            tuple_(models.JournalEntry.created_at, models.JournalEntry.id) < (cursor_created_at, cursor_id)
+        )
+    
+    # One extra row tells us whether there is a next page
+    query = query.order_by(
+        models.JournalEntry.created_at.desc(), models.JournalEntry.id.desc()
+    ).limit(limit + 1)
+    result = await db.execute(query)
+    entries = result.all() if view == "summary" else result.scalars().all()
+    if len(entries) > limit:
+        entries = entries[:limit]
+        last = entries[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.id)
+    
+    if view == "summary":
+        return [row._asdict() for row in entries]
     return entries
 
+# ========== SEARCH ==========
+@router.get("/search", response_model=List[schemas.JournalEntrySearchResult])
+async def search_entries(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    sentiment_label: Optional[Literal["very positive", "positive", "neutral", "negative", "very negative"]] = None,
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_RESULTS),
+    offset: int = Query(0, ge=0, le=MAX_SEARCH_OFFSET),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.CurrentUser = Depends(get_current_user)
+):
+    """
+    Full-text search of titles, content and key phrases, best match first.
+    Every word in `q` must match; "quoted phrases" match as a whole and
+    word* matches a prefix. The X-Next-Offset response header holds the
+    `offset` of the next page (absent on the last page).
+    """
+    try:
+        results = await db.run_sync(
+            search.search_entries, current_user.id, q, since, until, sentiment_label, limit + 1, offset
+        )
+    except search.InvalidQuery as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if len(results) > limit:
+        results = results[:limit]
+        response.headers["X-Next-Offset"] = str(offset + limit)
+    return results
+
+# ========== EXPORT ==========
+@router.get("/export", response_class=StreamingResponse)
+async def export_entries(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    gzip: bool = False,
+    current_user: schemas.CurrentUser = Depends(get_current_user)
+):
+    """
+    Download every entry, oldest first, as NDJSON (which POST /entries/bulk
+    accepts back) or CSV, gzipped with gzip=true
+    """
+    filename = f"mindmate-journal.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        export.export_entries(current_user.id, format, compress=gzip),
+        media_type="application/gzip" if gzip else export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 # ========== READ SINGLE ==========
-@router.get("/{entry_id}", response_model=schemas.JournalEntryResponse)
-def get_entry(
+@router.get("/{entry_id:int}", response_model=schemas.JournalEntryResponse)
+async def get_entry(
     entry_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.CurrentUser = Depends(get_current_user)
 ):
-    entry = db.query(models.JournalEntry).filter(
+    entry = await db.scalar(select(models.JournalEntry).where(
         models.JournalEntry.id == entry_id,
         models.JournalEntry.user_id == current_user.id
-    ).first()
+    ))
     
     if not entry:
         raise HTTPException(
@@ -69,17 +230,19 @@ def get_entry(
     return entry
 
 # ========== UPDATE ==========
-@router.put("/{entry_id}", response_model=schemas.JournalEntryResponse)
-def update_entry(
+@router.put("/{entry_id:int}", response_model=schemas.JournalEntryResponse)
+@retry_on_busy
+async def update_entry(
     entry_id: int,
     entry_update: schemas.JournalEntryUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    defer_analysis: Optional[bool] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.CurrentUser = Depends(get_current_user)
 ):
-    entry = db.query(models.JournalEntry).filter(
+    entry = await db.scalar(select(models.JournalEntry).where(
         models.JournalEntry.id == entry_id,
         models.JournalEntry.user_id == current_user.id
-    ).first()
+    ))
     
     if not entry:
         raise HTTPException(
@@ -88,34 +251,68 @@ def update_entry(
         )
     
     # Update fields if provided
+    deferred = False
     if entry_update.title is not None:
         entry.title = entry_update.title
-    if entry_update.content is not None:
+    if entry_update.content is not None and entry_update.content != entry.content:
         entry.content = entry_update.content
         # Re-analyze sentiment if content changed
-        sentiment_result = sentiment.analyze_sentiment_advanced(entry.content)
-        entry.sentiment_score = sentiment_result["sentiment_score"]
-        entry.sentiment_label = sentiment_result["sentiment_label"]
-        entry.subjectivity = sentiment_result.get("subjectivity")
-        entry.word_count = sentiment_result.get("word_count")
-        entry.emotion_data = json.dumps(sentiment_result.get("emotions", {}))
-        entry.key_phrases = json.dumps(sentiment_result.get("key_phrases", []))
-    
-    db.commit()
-    db.refresh(entry)
+        deferred = analysis.should_defer(defer_analysis)
+        if deferred:
+            entry.analysis_status = analysis.PENDING
+        else:
+            await analysis.analyze_entry_async(entry)
+    
+    await db.commit()
+    await db.refresh(entry)
+    
+    if deferred and not analysis.analysis_queue.submit(entry.id):
+        await analysis.analyze_entry_async(entry)
+        await db.commit()
+        await db.refresh(entry)
     return entry
 
+@router.get("/{entry_id:int}/analysis", response_model=schemas.JournalEntryAnalysis)
+async def get_entry_analysis(
+    entry_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.CurrentUser = Depends(get_current_user)
+):
+    """Poll the analysis of an entry (analysis_status is "pending" until it's done)"""
+    entry = await db.scalar(select(models.JournalEntry).where(
+        models.JournalEntry.id == entry_id,
+        models.JournalEntry.user_id == current_user.id
+    ))
+    
+    if not entry:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Entry not found"
+        )
+    
+    return {
+        "id": entry.id,
+        "analysis_status": entry.analysis_status,
+        "sentiment_score": entry.sentiment_score,
+        "sentiment_label": entry.sentiment_label,
+        "subjectivity": entry.subjectivity,
+        "word_count": entry.word_count,
+        "emotion_data": entry.emotions or None,
+        "key_phrases": json.loads(entry.key_phrases) if entry.key_phrases else None
+    }
+
 # ========== DELETE ==========
-@router.delete("/{entry_id}")
-def delete_entry(
+@router.delete("/{entry_id:int}")
+@retry_on_busy
+async def delete_entry(
     entry_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.CurrentUser = Depends(get_current_user)
 ):
-    entry = db.query(models.JournalEntry).filter(
+    entry = await db.scalar(select(models.JournalEntry).where(
         models.JournalEntry.id == entry_id,
         models.JournalEntry.user_id == current_user.id
-    ).first()
+    ))
     
     if not entry:
         raise HTTPException(
@@ -123,92 +320,74 @@ def delete_entry(
             detail="Entry not found"
         )
     
-    db.delete(entry)
-    db.commit()
+    await db.delete(entry)
+    await db.commit()
     return {"message": "Entry deleted successfully"}
 
 # ========== WEEK 4 AI FEATURES ==========
 
-@router.get("/weekly-summary", response_model=schemas.WeeklySummary)
-def get_weekly_summary(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+@router.get("/weekly-summary", response_model=schemas.WeeklySummary,
+            responses={304: {"description": "Summary unchanged since the ETag in If-None-Match"}})
+async def get_weekly_summary(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.CurrentUser = Depends(get_current_user)
 ):
-    """Get AI-generated weekly summary"""
-    # Get entries from last week
-    one_week_ago = datetime.now(timezone.utc) - timedelta(days=7)
-    
-    entries = db.query(models.JournalEntry).filter(
-        models.JournalEntry.user_id == current_user.id,
-        models.JournalEntry.created_at >= one_week_ago
-    ).order_by(models.JournalEntry.created_at).all()
-    
-    # Convert to dict format for summarizer
-    entries_data = []
-    for entry in entries:
-        entry_dict = {
-            "id": entry.id,
-            "title": entry.title,
-            "content": entry.content,
-            "sentiment_score": entry.sentiment_score,
-            "sentiment_label": entry.sentiment_label,
-            "subjectivity": entry.subjectivity,
-            "word_count": entry.word_count,
-            "emotion_data": entry.emotion_data,
-            "created_at": entry.created_at.isoformat() if entry.created_at else None
-        }
-        entries_data.append(entry_dict)
-    
-    # Generate summary
-    summary = summarizer.generate_weekly_summary(entries_data)
-    
+    """Get AI-generated weekly summary (cached until the week's entries change)"""
+    summary, etag = await db.run_sync(summaries.get_summary, current_user.id)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
     return summary
 
 @router.get("/emotion-trends", response_model=schemas.EmotionTrends)
-def get_emotion_trends(
+async def get_emotion_trends(
     days: int = 30,  # Default to 30 days
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.CurrentUser = Depends(get_current_user)
 ):
-    """Get emotion trends over time"""
+    """Get emotion trends over time (aggregated in the database)"""
     start_date = datetime.now(timezone.utc) - timedelta(days=days)
-    
-    entries = db.query(models.JournalEntry).filter(
-        models.JournalEntry.user_id == current_user.id,
-        models.JournalEntry.created_at >= start_date
-    ).order_by(models.JournalEntry.created_at).all()
-    
-    # Prepare data for trend analysis
-    entries_data = []
-    for entry in entries:
-        emotions = {}
-        if entry.emotion_data:
-            try:
-                emotions = json.loads(entry.emotion_data)
-            except:
-                pass
-        
-        entry_dict = {
-            "sentiment_score": entry.sentiment_score,
-            "sentiment_label": entry.sentiment_label,
-            "emotions": emotions,
-            "created_at": entry.created_at
-        }
-        entries_data.append(entry_dict)
-    
-    # Analyze trends
-    trends = sentiment.analyze_emotion_trends(entries_data)
+    trends = await db.run_sync(analytics.emotion_trends, current_user.id, start_date)
     
     return {
         "period_days": days,
-        "total_entries": len(entries),
-        "trend_analysis": trends,
-        "entries": [
-            {
-                "date": e.created_at.isoformat() if e.created_at else None,
-                "sentiment": e.sentiment_score,
-                "label": e.sentiment_label
-            }
-            for e in entries[-10:]  # Last 10 entries for chart
-        ]
-    }
\ No newline at end of file
+        "total_entries": trends["total_entries"],
+        "trend_analysis": trends["trend_analysis"],
+        "entries": trends["entries"]  # Last 10 entries for chart
+    }
+
+@router.get("/trends", response_model=schemas.Trends,
+            responses={304: {"description": "Trends unchanged since the ETag in If-None-Match"}})
+async def get_trends(
+    request: Request,
+    response: Response,
+    bucket: Literal["day", "week", "month"] = "day",
+    tz: str = "UTC",
+    window: int = Query(30, ge=1, le=trends.MAX_BUCKETS, description="number of buckets"),
+    moving_average: int = Query(7, ge=1, le=trends.MAX_MOVING_AVERAGE, description="buckets per moving average"),
+    end: Optional[date] = Query(None, description="a local date in the last bucket (default: today)"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.CurrentUser = Depends(get_current_user)
+):
+    """Sentiment and emotion averages per day, week or month in the given timezone"""
+    try:
+        zone = ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown timezone: {tz}")
+
+    try:
+        result = await db.run_sync(
+            trends.trends, current_user.id, bucket, zone, end or datetime.now(zone).date(), window, moving_average
+        )
+    except trends.DateOutOfRange as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    body = schemas.Trends.model_validate(result).model_dump(mode="json")
+    cache_control = f"private, max-age={trends.TRENDS_CLOSED_MAX_AGE}" if result["closed"] else "private, no-cache"
+    headers = {"ETag": make_etag(body), "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return body
@@ -1,29 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
-from sqlalchemy.orm import Session
-from datetime import timedelta, datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, status, BackgroundTasks
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from datetime import timedelta, datetime, timezone
 import secrets
-from ..database import get_db
+from ..database import get_async_db, retry_on_busy
 from .. import models, schemas
-from .. import auth
+from .. import analytics, auth
 from ..dependencies import get_current_user
 from ..utils.security import generate_reset_token
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+MAX_PROFILE_ENTRIES = 100
+
 @router.post("/register", response_model=schemas.UserResponse)
-def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+@retry_on_busy
+async def register_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
     # Check if user exists
-    db_user = db.query(models.User).filter(
+    db_user = await db.scalar(select(models.User).where(
         (models.User.email == user.email) | (models.User.username == user.username)
-    ).first()
+    ))
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email or username already registered"
         )
     
-    # Create new user
-    hashed_password = auth.get_password_hash(user.password)
+    # Create new user (ending the read transaction first, so the pooled
+    # connection isn't held while the password hashes)
+    await db.rollback()
+    hashed_password = await auth.get_password_hash_async(user.password)
     db_user = models.User(
         email=user.email,
         username=user.username,
@@ -31,19 +38,29 @@ def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
         is_verified=False 
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 @router.post("/login", response_model=schemas.Token)
-def login_user(user: schemas.UserLogin, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(models.User.username == user.username).first()
-    if not db_user or not auth.verify_password(user.password, db_user.hashed_password):
+@retry_on_busy
+async def login_user(user: schemas.UserLogin, db: AsyncSession = Depends(get_async_db)):
+    db_user = await db.scalar(select(models.User).where(models.User.username == user.username))
+    # Ends the read transaction so no pooled connection is held during the
+    # hash (nothing is expired, expire_on_commit is off)
+    await db.commit()
+    valid, new_hash = await auth.verify_and_update_password_async(user.password, db_user.hashed_password) if db_user else (False, None)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
         )
     
+    # Hash cost settings changed since this password was stored
+    if new_hash:
+        db_user.hashed_password = new_hash
+        await db.commit()
+    
     if not db_user.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -61,7 +78,7 @@ def login_user(user: schemas.UserLogin, db: Session = Depends(get_db)):
     }
 
 @router.post("/refresh", response_model=schemas.Token)
-def refresh_token(token_data: schemas.TokenRefresh, db: Session = Depends(get_db)):
+async def refresh_token(token_data: schemas.TokenRefresh, db: AsyncSession = Depends(get_async_db)):
     payload = auth.verify_token(token_data.refresh_token, is_refresh=True)
     if payload is None or payload.get("type") != "refresh":
         raise HTTPException(
@@ -87,11 +104,12 @@ def refresh_token(token_data: schemas.TokenRefresh, db: Session = Depends(get_db
     }
 
 @router.post("/password-reset-request")
-def password_reset_request(
+@retry_on_busy
+async def password_reset_request(
     request: schemas.PasswordResetRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(models.User).filter(models.User.email == request.email).first()
+    user = await db.scalar(select(models.User).where(models.User.email == request.email))
     if user:
 
         # For now, we'll just create the token and return it
@@ -103,7 +121,7 @@ def password_reset_request(
             user_id=user.id
         )
         db.add(db_token)
-        db.commit()
+        await db.commit()
         
         # In production: send_email(user.email, reset_token)
         print(f"Password reset token for {user.email}: {reset_token}")
@@ -112,32 +130,67 @@ def password_reset_request(
     return {"message": "If the email exists, a reset link has been sent"}
 
 @router.post("/password-reset")
-def password_reset(reset_data: schemas.PasswordReset, db: Session = Depends(get_db)):
+@retry_on_busy
+async def password_reset(reset_data: schemas.PasswordReset, db: AsyncSession = Depends(get_async_db)):
     
-    reset_token = db.query(models.PasswordResetToken).filter(
+    reset_token = await db.scalar(select(models.PasswordResetToken).options(
+        joinedload(models.PasswordResetToken.user)
+    ).where(
         models.PasswordResetToken.token == reset_data.token,
         models.PasswordResetToken.used == False,
         models.PasswordResetToken.expires_at > datetime.utcnow()
-    ).first()
+    ))
     
+    invalid_token = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid or expired reset token"
+    )
     if not reset_token:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid or expired reset token"
-        )
+        raise invalid_token
     
-    # Update user password
-    reset_token.user.hashed_password = auth.get_password_hash(reset_data.new_password)
-    reset_token.used = True
-    db.commit()
+    # Hash outside the read transaction, then claim the token: of two resets
+    # racing with the same token, only one still finds it unused
+    await db.commit()
+    hashed_password = await auth.get_password_hash_async(reset_data.new_password)
+    claimed = await db.execute(update(models.PasswordResetToken).where(
+        models.PasswordResetToken.id == reset_token.id,
+        models.PasswordResetToken.used == False,
+        models.PasswordResetToken.expires_at > datetime.utcnow()
+    ).values(used=True))
+    if claimed.rowcount != 1:
+        await db.rollback()
+        raise invalid_token
+    reset_token.user.hashed_password = hashed_password
+    await db.commit()
     
     return {"message": "Password reset successfully"}
 
-@router.get("/me", response_model=schemas.UserWithEntries)
-def get_current_user_info(current_user: models.User = Depends(get_current_user)):
-    return current_user
+@router.get("/me", response_model=schemas.UserProfile, response_model_exclude_unset=True)
+async def get_current_user_info(
+    include_entries: bool = False,
+    entries_limit: int = Query(20, ge=1, le=MAX_PROFILE_ENTRIES),
+    current_user: schemas.CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Profile with entry_count, last_entry_at and current_streak. The newest
+    `entries_limit` entries are embedded with include_entries=true; use
+    GET /entries/ to page through the rest.
+    """
+    today = datetime.now(timezone.utc).date()
+    activity = await db.run_sync(analytics.user_activity, current_user.id, today)
+    profile = {**current_user.model_dump(), **activity}
+    if include_entries:
+        profile["entries"] = (await db.scalars(
+            select(models.JournalEntry).where(
+                models.JournalEntry.user_id == current_user.id
+            ).order_by(
+                models.JournalEntry.created_at.desc(), models.JournalEntry.id.desc()
+            ).limit(entries_limit)
+        )).all()
+    return profile
 
 @router.post("/logout")
-def logout(current_user: models.User = Depends(get_current_user)):
+async def logout(current_user: schemas.CurrentUser = Depends(get_current_user)):
 
     return {"message": "Logged out successfully"}
\ No newline at end of file
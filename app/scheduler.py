@@ -0,0 +1,236 @@
+"""
+In-process scheduler that precomputes weekly summaries into weekly_summaries.
+
+Every SUMMARY_REFRESH_INTERVAL seconds it collects the active users (analyzed
+entries in the last SUMMARY_ACTIVE_DAYS days) whose stored summary is
+missing, stale or expired, and refreshes them SUMMARY_BATCH_SIZE at a time,
+with at most SUMMARY_CONCURRENCY users in flight. Batches are spread over
+SUMMARY_REFRESH_WINDOW seconds so a run doesn't compete with requests in one
+burst. It runs as an asyncio task on the app's event loop.
+
+Every worker process starts it, but a run only happens in the process holding
+a file lock (flock on MINDMATE_SUMMARY_SCHEDULER_LOCK, by default next to the
+SQLite database). The others try again each interval, so when the runner
+exits another worker takes over. Without flock (Windows) or a database file,
+every worker runs it: set MINDMATE_SUMMARY_SCHEDULER=0 on all but one.
+
+    python -m app.scheduler run-once    # refresh everything now, no pacing
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from sqlalchemy.engine import make_url
+from .database import SQLALCHEMY_DATABASE_URL, AsyncSessionLocal, retry_on_busy
+from . import metrics, summaries
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_SCHEDULER = os.getenv("MINDMATE_SUMMARY_SCHEDULER", "1") == "1"
+SUMMARY_REFRESH_INTERVAL = float(os.getenv("MINDMATE_SUMMARY_REFRESH_INTERVAL", "3600"))
+SUMMARY_REFRESH_WINDOW = float(os.getenv("MINDMATE_SUMMARY_REFRESH_WINDOW", "600"))
+# Delay before the first run, so startup isn't slowed down
+SUMMARY_SCHEDULER_DELAY = float(os.getenv("MINDMATE_SUMMARY_SCHEDULER_DELAY", "60"))
+SUMMARY_BATCH_SIZE = int(os.getenv("MINDMATE_SUMMARY_BATCH_SIZE", "100"))
+SUMMARY_CONCURRENCY = int(os.getenv("MINDMATE_SUMMARY_CONCURRENCY", "2"))
+SUMMARY_ACTIVE_DAYS = int(os.getenv("MINDMATE_SUMMARY_ACTIVE_DAYS", "30"))
+
+
+def _default_lock_path() -> Optional[str]:
+    database = make_url(SQLALCHEMY_DATABASE_URL).database
+    if database in (None, "", ":memory:"):
+        return None
+    return f"{database}.scheduler.lock"
+
+
+SUMMARY_SCHEDULER_LOCK = os.getenv("MINDMATE_SUMMARY_SCHEDULER_LOCK") or _default_lock_path()
+
+
+class RunnerLock:
+    """
+    Non-blocking flock held by at most one process at a time. The OS drops it
+    when the holder exits. Always granted without flock or a lock path
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._file = None
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None or self.path is None or fcntl is None
+
+    def acquire(self) -> bool:
+        if self.held:
+            return True
+        lock_file = open(self.path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        return True
+
+    def release(self):
+        lock_file, self._file = self._file, None
+        if lock_file is not None:
+            lock_file.close()
+
+
+class SummaryScheduler:
+    """Periodic refresh of precomputed summaries, with counters for /health"""
+
+    def __init__(self, interval: float = SUMMARY_REFRESH_INTERVAL, window: float = SUMMARY_REFRESH_WINDOW,
+                 batch_size: int = SUMMARY_BATCH_SIZE, concurrency: int = SUMMARY_CONCURRENCY,
+                 active_days: int = SUMMARY_ACTIVE_DAYS, session_factory=AsyncSessionLocal,
+                 lock_path: Optional[str] = SUMMARY_SCHEDULER_LOCK):
+        self.interval = interval
+        self.window = window
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.active_days = active_days
+        self.session_factory = session_factory
+        self.lock = RunnerLock(lock_path)
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.refreshed = 0
+        self.conflicts = 0  # an entry write got in first, retried next run
+        self.failures = 0
+        self.backlog = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_run_seconds = 0.0
+        self.last_batch_seconds = 0.0
+        self.max_batch_seconds = 0.0
+
+    def start(self, delay: float = SUMMARY_SCHEDULER_DELAY):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run_forever(delay))
+
+    async def stop(self):
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self.lock.release()
+
+    async def _run_forever(self, delay: float):
+        await asyncio.sleep(delay)
+        while True:
+            # Another worker runs it while it holds the lock
+            if self.lock.acquire():
+                try:
+                    await self.run_once()
+                except Exception:
+                    logger.exception("Weekly summary refresh failed")
+            await asyncio.sleep(self.interval)
+
+    async def pending_users(self, now: datetime) -> List[int]:
+        async with self.session_factory() as db:
+            return await db.run_sync(
+                summaries.pending_users, now, now - timedelta(days=self.active_days)
+            )
+
+    async def run_once(self, pace: bool = True) -> int:
+        """Refresh every pending user, returns how many summaries were stored"""
+        started = time.perf_counter()
+        now = datetime.now(timezone.utc)
+        self.last_run_at = now
+        user_ids = await self.pending_users(now)
+        batches = [user_ids[i:i + self.batch_size] for i in range(0, len(user_ids), self.batch_size)]
+        self.backlog = len(user_ids)
+        # Time slot per batch so the run fills the window
+        slot = self.window / len(batches) if pace and batches else 0.0
+
+        stored = 0
+        semaphore = asyncio.Semaphore(self.concurrency)
+        for batch in batches:
+            batch_started = time.perf_counter()
+            results = await asyncio.gather(*[self._refresh(semaphore, user_id) for user_id in batch])
+            stored += sum(results)
+            self.backlog -= len(batch)
+            elapsed = time.perf_counter() - batch_started
+            metrics.summary_batch_duration.observe(elapsed)
+            self.last_batch_seconds = elapsed
+            self.max_batch_seconds = max(self.max_batch_seconds, elapsed)
+            if self.backlog and slot > elapsed:
+                await asyncio.sleep(slot - elapsed)
+
+        self.runs += 1
+        self.last_run_seconds = time.perf_counter() - started
+        metrics.summary_run_duration.observe(self.last_run_seconds)
+        logger.info("Refreshed %d of %d weekly summaries in %.1fs", stored, len(user_ids), self.last_run_seconds)
+        return stored
+
+    async def _refresh(self, semaphore: asyncio.Semaphore, user_id: int) -> bool:
+        async with semaphore:
+            try:
+                async with self.session_factory() as db:
+                    stored = await self._store(user_id=user_id, db=db)
+            except Exception:
+                logger.exception("Weekly summary refresh failed for user %s", user_id)
+                self.failures += 1
+                return False
+        if stored:
+            self.refreshed += 1
+        else:
+            self.conflicts += 1
+        return stored
+
+    @retry_on_busy
+    async def _store(self, user_id: int, db) -> bool:
+        stored = await db.run_sync(summaries.refresh_summary, user_id, datetime.now(timezone.utc))
+        await db.commit()
+        return stored
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            # This process is the one that runs it (see RunnerLock)
+            "runner": self._task is not None and self.lock.held,
+            "runs": self.runs,
+            "refreshed": self.refreshed,
+            "conflicts": self.conflicts,
+            "failures": self.failures,
+            "backlog": self.backlog,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_run_seconds": round(self.last_run_seconds, 3),
+            "last_batch_seconds": round(self.last_batch_seconds, 3),
+            "max_batch_seconds": round(self.max_batch_seconds, 3),
+        }
+
+
+summary_scheduler = SummaryScheduler()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute weekly summaries")
+    parser.add_argument("command", choices=["run-once"])
+    parser.parse_args()
+    from . import migrations
+    from .database import async_engine, engine
+
+    migrations.upgrade(engine)
+
+    async def run():
+        try:
+            return await summary_scheduler.run_once(pace=False)
+        finally:
+            await async_engine.dispose()
+
+    print(f"Stored {asyncio.run(run())} weekly summaries")
+
+
+if __name__ == "__main__":
+    main()
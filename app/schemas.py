@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, constr
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional, List, Dict, Any
 
 # Password constraints: at least 8 characters
@@ -20,6 +20,19 @@ class UserResponse(UserBase):
     class Config:
         from_attributes = True
 
+class CurrentUser(BaseModel):
+    """Authenticated user as returned by get_current_user (not tied to a DB session)"""
+    id: int
+    email: str
+    username: str
+    is_active: Optional[bool] = True
+    is_verified: Optional[bool] = False
+    created_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+        frozen = True
+
 class UserLogin(BaseModel):
     username: str
     password: str
@@ -52,16 +65,45 @@ class JournalEntryBase(BaseModel):
 class JournalEntryCreate(JournalEntryBase):
     pass
 
+class JournalEntryImport(JournalEntryBase):
+    """Item of POST /entries/bulk - created_at keeps the date from the other app"""
+    created_at: Optional[datetime] = None
+
 class JournalEntryResponse(JournalEntryBase):
     id: int
     sentiment_score: Optional[float] = None
     sentiment_label: Optional[str] = None
+    analysis_status: Optional[str] = None
+    created_at: datetime
+    user_id: int
+    
+    class Config:
+        from_attributes = True
+
+class JournalEntryListItem(BaseModel):
+    """Entry in GET /entries/ - content is left out of the summary view"""
+    id: int
+    title: str
+    content: Optional[str] = None
+    sentiment_score: Optional[float] = None
+    sentiment_label: Optional[str] = None
+    analysis_status: Optional[str] = None
     created_at: datetime
     user_id: int
     
     class Config:
         from_attributes = True
 
+class JournalEntrySearchResult(BaseModel):
+    """Entry in GET /entries/search, best match first"""
+    id: int
+    title: str
+    created_at: datetime
+    sentiment_score: Optional[float] = None
+    sentiment_label: Optional[str] = None
+    snippet: str  # HTML: escaped text, matched terms wrapped in <mark></mark>
+    rank: float   # bm25, lower is a better match
+
 # === Enhanced Journal Entry Schemas (Week 4) ===
 class EmotionData(BaseModel):
     joy: float = 0
@@ -86,14 +128,31 @@ class JournalEntryUpdate(BaseModel):
     title: Optional[str] = None
     content: Optional[str] = None
 
+class JournalEntryAnalysis(BaseModel):
+    id: int
+    analysis_status: Optional[str] = None
+    sentiment_score: Optional[float] = None
+    sentiment_label: Optional[str] = None
+    subjectivity: Optional[float] = None
+    word_count: Optional[int] = None
+    emotion_data: Optional[EmotionData] = None
+    key_phrases: Optional[List[str]] = None
+
 # === User with Entries ===
 class UserWithEntries(UserResponse):
     entries: List[JournalEntryResponse] = []
 
+class UserProfile(UserResponse):
+    """GET /users/me - aggregates instead of every entry"""
+    entry_count: int = 0
+    last_entry_at: Optional[datetime] = None
+    current_streak: int = 0  # consecutive days with entries, up to today or yesterday (UTC)
+    entries: Optional[List[JournalEntryResponse]] = None  # newest first, only with include_entries
+
 # === AI Feature Schemas (Week 4) ===
 class WeeklySummary(BaseModel):
     summary: str
-    statistics: Dict[str, Any]
+    statistics: Dict[str, Any] = {}  # empty when there are no entries
     insights: List[str]
     recommendations: List[str]
 
@@ -101,4 +160,34 @@ class EmotionTrends(BaseModel):
     period_days: int
     total_entries: int
     trend_analysis: Dict[str, Any]
-    entries: List[Dict[str, Any]]
\ No newline at end of file
+    entries: List[Dict[str, Any]]
+
+class TrendBucket(BaseModel):
+    start: date  # local date, inclusive
+    end: date    # local date, exclusive
+    closed: bool  # the bucket has ended
+    entry_count: int
+    average_sentiment: Optional[float] = None  # None for buckets without entries
+    moving_average: Optional[float] = None
+    emotions: Dict[str, float] = {}  # average scores, empty when no entry has any
+    emotions_moving_average: Dict[str, float] = {}
+
+class Trends(BaseModel):
+    bucket: str
+    timezone: str
+    window: int
+    moving_average: int
+    closed: bool  # every bucket has ended
+    buckets: List[TrendBucket]
+
+# === Admin Schemas ===
+class RequestProfile(BaseModel):
+    id: str
+    route: str  # route function name, "unmatched" for 404s
+    method: str
+    path: str
+    request_id: str
+    status: int
+    trigger: str  # "header" or "sample"
+    duration_ms: float
+    created_at: datetime
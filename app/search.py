@@ -0,0 +1,156 @@
+"""
+Full-text search over journal entries (GET /entries/search).
+
+journal_entries_fts is an FTS5 index over title, content and key_phrases
+that stores no text of its own (content=journal_entries). It also indexes
+user_id, and every search matches the owner's id in that column, so FTS5
+only ranks (and builds snippets for) the searching user's entries however
+large the rest of the corpus is. Triggers on journal_entries keep it in step
+with every insert, update and delete, whether it comes from the ORM or a
+Core statement, so no application code has to remember it. The index is
+created by a migration; to rebuild it:
+
+    python -m app.search rebuild
+"""
+import argparse
+import html
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import DateTime, bindparam, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+FTS_TABLE = "journal_entries_fts"
+# Searched columns and their bm25 weights; user_id, last so snippets prefer
+# the text columns, only ever matches the owner and weighs nothing
+TEXT_COLUMNS = ("title", "content", "key_phrases")
+RANK_WEIGHTS = (5.0, 1.0, 2.0, 0.0)
+# Around the matched terms in snippets. FTS5 inserts private-use characters
+# that are swapped for the tags once the entry text is HTML-escaped
+SNIPPET_START, SNIPPET_END, SNIPPET_ELLIPSIS = "<mark>", "</mark>", "…"
+_RAW_START, _RAW_END = "\ue000", "\ue001"
+SNIPPET_TOKENS = 16
+
+TRIGGERS = ("journal_entries_fts_insert", "journal_entries_fts_delete", "journal_entries_fts_update")
+CREATE_STATEMENTS = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "title, content, key_phrases, user_id, content='journal_entries', content_rowid='id', "
+    "tokenize='porter unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS journal_entries_fts_insert AFTER INSERT ON journal_entries BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, content, key_phrases, user_id) "
+    "VALUES (new.id, new.title, new.content, new.key_phrases, new.user_id); END",
+    f"CREATE TRIGGER IF NOT EXISTS journal_entries_fts_delete AFTER DELETE ON journal_entries BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content, key_phrases, user_id) "
+    "VALUES ('delete', old.id, old.title, old.content, old.key_phrases, old.user_id); END",
+    # Analysis updates that don't touch the indexed columns skip the trigger
+    f"CREATE TRIGGER IF NOT EXISTS journal_entries_fts_update "
+    "AFTER UPDATE OF title, content, key_phrases, user_id ON journal_entries BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content, key_phrases, user_id) "
+    "VALUES ('delete', old.id, old.title, old.content, old.key_phrases, old.user_id); "
+    f"INSERT INTO {FTS_TABLE}(rowid, title, content, key_phrases, user_id) "
+    "VALUES (new.id, new.title, new.content, new.key_phrases, new.user_id); END",
+)
+
+# "a phrase", a word, or a prefix*
+_TERM_RE = re.compile(r'"([^"]*)"|(\S+)')
+_WORD_RE = re.compile(r"\w+")
+
+
+class InvalidQuery(ValueError):
+    """The search text has nothing to search for"""
+
+
+def create_index(conn: Connection):
+    for statement in CREATE_STATEMENTS:
+        conn.exec_driver_sql(statement)
+
+
+def drop_index(conn: Connection):
+    for trigger in TRIGGERS:
+        conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.exec_driver_sql(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def rebuild(conn: Connection):
+    """Re-index every entry from journal_entries"""
+    conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def match_expression(query: str, user_id: int) -> str:
+    """
+    An FTS5 MATCH expression for user input over the user's entries: every
+    word or "quoted phrase" must appear in the text columns (word* matches a
+    prefix). Operators and punctuation are searched for literally, never
+    interpreted, so any input is safe.
+    """
+    terms = []
+    for phrase, word in _TERM_RE.findall(query):
+        words = _WORD_RE.findall(phrase if phrase else word)
+        if not words:
+            continue
+        term = '"' + " ".join(words) + '"'
+        if not phrase and word.endswith("*"):
+            term += "*"
+        terms.append(term)
+    if not terms:
+        raise InvalidQuery("The search query has no words")
+    return f'user_id : "{int(user_id)}" AND {{{" ".join(TEXT_COLUMNS)}}} : ({" AND ".join(terms)})'
+
+
+def render_snippet(raw: str) -> str:
+    """HTML-escape the entry text of a snippet, then put the <mark> tags in"""
+    return html.escape(raw).replace(_RAW_START, SNIPPET_START).replace(_RAW_END, SNIPPET_END)
+
+
+def search_entries(db: Session, user_id: int, query: str, since: Optional[datetime] = None,
+                   until: Optional[datetime] = None, sentiment_label: Optional[str] = None,
+                   limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+    """
+    A page of the user's matching entries, best match (lowest bm25) first.
+    Snippets are HTML: escaped entry text with the matches in <mark> tags
+    """
+    filters = ["e.user_id = :user_id"]
+    params = {
+        "match": match_expression(query, user_id), "user_id": user_id, "limit": limit, "offset": offset,
+        "start": _RAW_START, "end": _RAW_END, "ellipsis": SNIPPET_ELLIPSIS, "tokens": SNIPPET_TOKENS,
+    }
+    if since is not None:
+        filters.append("e.created_at >= :since")
+        params["since"] = since
+    if until is not None:
+        filters.append("e.created_at < :until")
+        params["until"] = until
+    if sentiment_label is not None:
+        filters.append("e.sentiment_label = :label")
+        params["label"] = sentiment_label
+
+    weights = ", ".join(str(weight) for weight in RANK_WEIGHTS)
+    rows = db.execute(text(
+        f"SELECT e.id, e.title, e.created_at, e.sentiment_score, e.sentiment_label, "
+        f"snippet({FTS_TABLE}, -1, :start, :end, :ellipsis, :tokens) AS snippet, "
+        f"bm25({FTS_TABLE}, {weights}) AS rank "
+        f"FROM {FTS_TABLE} JOIN journal_entries AS e ON e.id = {FTS_TABLE}.rowid "
+        f"WHERE {FTS_TABLE} MATCH :match AND {' AND '.join(filters)} "
+        "ORDER BY rank, e.id LIMIT :limit OFFSET :offset"
+    ).bindparams(
+        # Formatted (and read back) the way the ORM stores created_at
+        *[bindparam(name, type_=DateTime()) for name in ("since", "until") if name in params]
+    ).columns(created_at=DateTime()), params).mappings().all()
+    return [{**row, "snippet": render_snippet(row["snippet"])} for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the journal full-text index")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    from .database import engine
+    with engine.begin() as conn:
+        create_index(conn)
+        rebuild(conn)
+    print("Rebuilt the full-text index")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Weekly summaries (GET /entries/weekly-summary).
+
+A summary is built from the daily rollups (running totals, see rollups.py),
+never from the entry list. Summaries are precomputed into weekly_summaries
+by the scheduler in app/scheduler.py and also kept in a per-process cache,
+each with an ETag so unchanged summaries can be answered with 304 Not
+Modified. Lookups go cache -> table -> computed on the spot.
+
+Creating, updating or deleting one of a user's entries in the window drops
+the cached summary and bumps the user's weekly_summaries.version in the same
+transaction. The scheduler only stores a summary if the version hasn't moved
+since it started reading, so a write that lands mid-computation can't be
+overwritten by an older summary. Summaries also expire when the oldest entry
+in them drops out of the rolling week. Other worker processes don't see this
+process' cache invalidations, so cached entries expire after
+SUMMARY_CACHE_TTL seconds.
+"""
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import event, inspect, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from . import analytics, models
+from .AI import summarizer
+from .utils.cache import LRUCache
+from .utils.etag import make_etag
+
+SUMMARY_WINDOW = timedelta(days=7)
+SUMMARY_CACHE_TTL = float(os.getenv("MINDMATE_SUMMARY_CACHE_TTL", "300"))
+SUMMARY_CACHE_SIZE = int(os.getenv("MINDMATE_SUMMARY_CACHE_SIZE", "4096"))
+
+Stored = models.WeeklySummary
+
+# user_id -> (summary, etag)
+summary_cache = LRUCache(SUMMARY_CACHE_SIZE, ttl=SUMMARY_CACHE_TTL)
+
+# Bumped on every invalidation, so a summary computed while a write was
+# committing isn't cached after that write invalidated it
+_generations: Dict[int, int] = {}
+_generations_lock = threading.Lock()
+
+
+def _generation(user_id: int) -> int:
+    with _generations_lock:
+        return _generations.get(user_id, 0)
+
+
+def invalidate(user_id: Optional[int]):
+    """Drop a user's summary from this process' cache"""
+    if user_id is None:
+        return
+    with _generations_lock:
+        _generations[user_id] = _generations.get(user_id, 0) + 1
+    summary_cache.pop(user_id)
+
+
+def _naive_utc(value: datetime) -> datetime:
+    # created_at and the weekly_summaries timestamps are stored as naive UTC
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _cache(user_id: int, generation: int, cached: Tuple[Dict[str, Any], str], valid_for: Optional[float]):
+    if valid_for is not None and valid_for <= 0:
+        return
+    ttl = SUMMARY_CACHE_TTL if valid_for is None else min(valid_for, SUMMARY_CACHE_TTL)
+    with _generations_lock:
+        if _generations.get(user_id, 0) == generation:
+            summary_cache.set(user_id, cached, ttl=ttl)
+
+
+# ========== BUILDING ==========
+
+def build_summary(db: Session, user_id: int, now: datetime) -> Tuple[Dict[str, Any], Optional[datetime]]:
+    """
+    The summary of the week before now, plus when it stops being valid
+    without writes (None: at the next write)
+    """
+    totals = analytics.period_totals(db, user_id, now - SUMMARY_WINDOW)
+    entry_count = totals["entry_count"]
+    start, end = totals["first_created_at"], totals["last_created_at"]
+
+    summary = summarizer.summarize_week(
+        entry_count,
+        totals["sentiment_sum"] / entry_count if entry_count else 0,
+        analytics.emotion_totals(totals),
+        start.isoformat() if start else None,
+        end.isoformat() if end else None
+    )
+    return summary, start + SUMMARY_WINDOW if start is not None else None
+
+
+def load_stored(db: Session, user_id: int, now: datetime) -> Optional[Tuple[Dict[str, Any], str, Optional[datetime]]]:
+    """(summary, etag, valid_until) from weekly_summaries, None if missing, stale or expired"""
+    row = db.execute(
+        select(Stored.summary, Stored.etag, Stored.valid_until).where(Stored.user_id == user_id)
+    ).first()
+    if row is None or row.summary is None:
+        return None
+    if row.valid_until is not None and row.valid_until <= _naive_utc(now):
+        return None
+    return json.loads(row.summary), row.etag, row.valid_until
+
+
+def get_summary(db: Session, user_id: int) -> Tuple[Dict[str, Any], str]:
+    """(summary, etag) for the last week: cached, precomputed or built now"""
+    cached = summary_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    generation = _generation(user_id)
+    now = datetime.now(timezone.utc)
+    stored = load_stored(db, user_id, now)
+    if stored is not None:
+        summary, etag, valid_until = stored
+    else:
+        summary, valid_until = build_summary(db, user_id, now)
+        etag = make_etag(summary)
+    valid_for = (valid_until - _naive_utc(now)).total_seconds() if valid_until is not None else None
+    _cache(user_id, generation, (summary, etag), valid_for)
+    return summary, etag
+
+
+# ========== PRECOMPUTING ==========
+
+def pending_users(db: Session, now: datetime, active_since: datetime) -> List[int]:
+    """
+    Active users (analyzed entries since active_since) without a valid
+    precomputed summary, by id
+    """
+    Rollup = models.DailyMoodRollup
+    # Per user an index search on (user_id, day), rather than a scan of every rollup
+    active = select(Rollup.user_id).where(
+        Rollup.user_id == models.User.id, Rollup.day >= active_since.date()
+    ).exists()
+    query = select(models.User.id).outerjoin(
+        Stored, Stored.user_id == models.User.id
+    ).where(
+        models.User.is_active.is_(True),
+        active,
+        or_(Stored.user_id.is_(None), Stored.summary.is_(None), Stored.valid_until <= _naive_utc(now))
+    ).order_by(models.User.id)
+    return list(db.execute(query).scalars())
+
+
+def refresh_summary(db: Session, user_id: int, now: datetime) -> bool:
+    """
+    Compute and store a user's summary, False if an entry write got in
+    first (the next run picks the user up again). The caller commits.
+    """
+    version = db.execute(select(Stored.version).where(Stored.user_id == user_id)).scalar() or 0
+    summary, valid_until = build_summary(db, user_id, now)
+    values = {
+        "summary": json.dumps(summary),
+        "etag": make_etag(summary),
+        "computed_at": _naive_utc(now),
+        "valid_until": valid_until,
+    }
+    stmt = sqlite_insert(Stored).values(user_id=user_id, version=version, **values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Stored.user_id],
+        set_={column: stmt.excluded[column] for column in values},
+        where=Stored.version == version
+    )
+    return db.execute(stmt).rowcount > 0
+
+
+# ========== INVALIDATION ==========
+
+def mark_stale(conn: Connection, user_ids: Iterable[int]):
+    """Bump the users' weekly_summaries.version and clear their stored summaries"""
+    for user_id in user_ids:
+        stmt = sqlite_insert(Stored).values(user_id=user_id, version=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Stored.user_id],
+            set_={"version": Stored.version + 1, "summary": None, "etag": None, "valid_until": None}
+        )
+        conn.execute(stmt)
+
+
+def entries_changed(session: Session, user_ids: Iterable[int]):
+    """
+    Record that the users' entries in the window changed in this session's
+    transaction; needed for Core writes, the ORM hook below covers the rest
+    """
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    mark_stale(session.connection(), user_ids)
+    for user_id in user_ids:
+        invalidate(user_id)
+    # Again after the commit: a reader may have cached the old totals meanwhile
+    session.info.setdefault("stale_summaries", set()).update(user_ids)
+
+
+def _in_window(entry: models.JournalEntry, since: datetime) -> bool:
+    """Whether the entry is (or was, before this flush) in a summary window"""
+    history = inspect(entry).attrs.created_at.history
+    values = [value for value in (*history.added, *history.unchanged, *history.deleted) if value is not None]
+    if not values:
+        return True  # not loaded, assume it is
+    return any(value.replace(tzinfo=None) >= since for value in values)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_stale_summaries(session: Session, flush_context):
+    since = _naive_utc(datetime.now(timezone.utc)) - SUMMARY_WINDOW
+    entries_changed(session, {
+        entry.user_id for entry in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(entry, models.JournalEntry) and _in_window(entry, since)
+    })
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_summaries(session: Session):
+    for user_id in session.info.pop("stale_summaries", ()):
+        invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_stale_summaries(session: Session):
+    session.info.pop("stale_summaries", None)
@@ -0,0 +1,216 @@
+"""
+Time-bucketed mood trends (GET /entries/trends).
+
+Buckets are calendar days, ISO weeks (Monday first) or months in the
+caller's timezone. Their local boundaries are converted to UTC, so DST
+changes move the boundaries rather than spilling entries into the wrong
+bucket, and all buckets are aggregated in one query: the whole UTC days of
+each bucket from the daily rollups, the partial days at its edges (outside
+UTC, local midnight falls mid-day) with a range search on (user_id,
+created_at). Moving averages are then computed in a single pass over the
+buckets.
+
+Buckets that have ended only change when old entries are edited, deleted or
+imported, so responses whose buckets are all closed may be cached for
+TRENDS_CLOSED_MAX_AGE seconds; the rest must be revalidated (ETag).
+"""
+import os
+from collections import deque
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+from sqlalchemy import DateTime, Date, Integer, and_, column, func, select, union_all, values
+from sqlalchemy.orm import Session
+from . import models, rollups
+
+BUCKETS = ("day", "week", "month")
+MAX_BUCKETS = 366
+MAX_MOVING_AVERAGE = 31
+TRENDS_CLOSED_MAX_AGE = int(os.getenv("MINDMATE_TRENDS_CLOSED_MAX_AGE", "86400"))
+
+Entry = models.JournalEntry
+Rollup = models.DailyMoodRollup
+
+
+class DateOutOfRange(ValueError):
+    """The buckets (moving average included) reach past the representable dates"""
+
+
+# ========== BUCKETS ==========
+
+def bucket_start(day: date, bucket: str) -> date:
+    """First local date of the bucket that contains day"""
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(start: date, bucket: str) -> date:
+    if bucket == "week":
+        return start + timedelta(days=7)
+    if bucket == "month":
+        return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start + timedelta(days=1)
+
+
+def previous_bucket(start: date, bucket: str) -> date:
+    if bucket == "week":
+        return start - timedelta(days=7)
+    if bucket == "month":
+        return (start - timedelta(days=1)).replace(day=1)
+    return start - timedelta(days=1)
+
+
+def bucket_bounds(bucket: str, last_day: date, count: int) -> List[Tuple[date, date]]:
+    """(start, end) local dates of `count` buckets ending with the one containing last_day, oldest first"""
+    starts = [bucket_start(last_day, bucket)]
+    while len(starts) < count:
+        starts.append(previous_bucket(starts[-1], bucket))
+    starts.reverse()
+    return [(start, next_bucket(start, bucket)) for start in starts]
+
+
+def local_midnight_utc(day: date, tz: ZoneInfo) -> datetime:
+    """The start of a local day as naive UTC (how created_at is stored)"""
+    return datetime.combine(day, time.min, tzinfo=tz).astimezone(timezone.utc).replace(tzinfo=None)
+
+
+# ========== AGGREGATION ==========
+
+def _split(start: datetime, end: datetime) -> Tuple[Optional[Tuple[date, date]], List[Tuple[datetime, datetime]]]:
+    """
+    A [start, end) UTC range as whole UTC days (a [first, last) date range,
+    None if there are none) plus the partial days at its edges
+    """
+    first_day = start.date() if start.time() == time.min else start.date() + timedelta(days=1)
+    last_day = end.date()
+    if first_day >= last_day:
+        return None, [(start, end)]
+    edges = []
+    if start.time() != time.min:
+        edges.append((start, datetime.combine(first_day, time.min)))
+    if end.time() != time.min:
+        edges.append((datetime.combine(last_day, time.min), end))
+    return (first_day, last_day), edges
+
+
+def bucket_totals(db: Session, user_id: int, bounds: List[Tuple[datetime, datetime]]) -> List[Dict[str, Any]]:
+    """
+    Rollup totals (see rollups.TOTALS) of each [start, end) UTC range, in one
+    query: whole UTC days are summed from the daily rollups, only the
+    partial days at the edges (local midnight isn't a UTC midnight) are
+    aggregated from journal_entries
+    """
+    day_ranges, entry_ranges = [], []
+    for i, (start, end) in enumerate(bounds):
+        days, edges = _split(start, end)
+        if days is not None:
+            day_ranges.append((i, *days))
+        entry_ranges.extend((i, *edge) for edge in edges)
+
+    queries = []
+    if day_ranges:
+        ranges = values(
+            column("idx", Integer), column("start", Date), column("end", Date), name="bucket_days"
+        ).data(day_ranges).cte()
+        queries.append(select(
+            ranges.c.idx, *[func.sum(getattr(Rollup, name)) for name in rollups.TOTALS]
+        ).select_from(ranges).join(Rollup, and_(
+            Rollup.user_id == user_id, Rollup.day >= ranges.c.start, Rollup.day < ranges.c.end
+        )).group_by(ranges.c.idx))
+    if entry_ranges:
+        ranges = values(
+            column("idx", Integer), column("start", DateTime), column("end", DateTime), name="bucket_edges"
+        ).data(entry_ranges).cte()
+        queries.append(select(ranges.c.idx, *rollups.totals_columns()).select_from(ranges).join(Entry, and_(
+            Entry.user_id == user_id,
+            Entry.created_at >= ranges.c.start,
+            Entry.created_at < ranges.c.end,
+            Entry.sentiment_score.isnot(None)
+        )).group_by(ranges.c.idx))
+
+    totals = [dict.fromkeys(rollups.TOTALS, 0) for _ in bounds]
+    for idx, *sums in db.execute(union_all(*queries) if len(queries) > 1 else queries[0]):
+        for name, value in zip(rollups.TOTALS, sums):
+            totals[idx][name] += value or 0
+    return totals
+
+
+def _averages(sentiment_sum: float, entry_count: int, emotion_sums: List[float], emotion_count: int):
+    sentiment = round(sentiment_sum / entry_count, 3) if entry_count else None
+    emotions = {
+        name: round(value / emotion_count, 3) for name, value in zip(models.EMOTION_NAMES, emotion_sums)
+    } if emotion_count else {}
+    return sentiment, emotions
+
+
+def trend_series(totals: List[Dict[str, Any]], moving_average: int) -> List[Dict[str, Any]]:
+    """
+    Per-bucket averages plus moving averages over the last `moving_average`
+    buckets (weighted by entries), in one pass with running sums
+    """
+    window = deque()
+    running_count = running_sum = running_emotion_count = 0
+    running_emotions = [0.0] * len(models.EMOTION_NAMES)
+    series = []
+    for bucket in totals:
+        emotion_sums = [bucket[name] for name in rollups.EMOTION_SUMS]
+        window.append(bucket)
+        running_count += bucket["entry_count"]
+        running_sum += bucket["sentiment_sum"]
+        running_emotion_count += bucket["emotion_entry_count"]
+        running_emotions = [a + b for a, b in zip(running_emotions, emotion_sums)]
+        if len(window) > moving_average:
+            old = window.popleft()
+            running_count -= old["entry_count"]
+            running_sum -= old["sentiment_sum"]
+            running_emotion_count -= old["emotion_entry_count"]
+            running_emotions = [a - old[name] for a, name in zip(running_emotions, rollups.EMOTION_SUMS)]
+
+        sentiment, emotions = _averages(
+            bucket["sentiment_sum"], bucket["entry_count"], emotion_sums, bucket["emotion_entry_count"]
+        )
+        sentiment_ma, emotions_ma = _averages(running_sum, running_count, running_emotions, running_emotion_count)
+        series.append({
+            "entry_count": bucket["entry_count"],
+            "average_sentiment": sentiment,
+            "moving_average": sentiment_ma,
+            "emotions": emotions,
+            "emotions_moving_average": emotions_ma,
+        })
+    return series
+
+
+def trends(db: Session, user_id: int, bucket: str, tz: ZoneInfo, last_day: date,
+           window: int, moving_average: int) -> Dict[str, Any]:
+    """
+    `window` buckets ending with the one containing last_day; the
+    moving_average - 1 buckets before them only feed the moving averages.
+    DateOutOfRange when they run off either end of the calendar
+    """
+    warmup = moving_average - 1
+    try:
+        bounds = bucket_bounds(bucket, last_day, window + warmup)
+        utc_bounds = [(local_midnight_utc(start, tz), local_midnight_utc(end, tz)) for start, end in bounds]
+    except (OverflowError, ValueError):
+        raise DateOutOfRange(
+            f"{window + warmup} {bucket} buckets (window and moving average) "
+            f"ending at {last_day.isoformat()} run past the supported dates"
+        )
+    totals = bucket_totals(db, user_id, utc_bounds)
+    series = trend_series(totals, moving_average)[warmup:]
+    today = datetime.now(tz).date()
+    buckets = [
+        {"start": start, "end": end, "closed": end <= today, **point}
+        for (start, end), point in zip(bounds[warmup:], series)
+    ]
+    return {
+        "bucket": bucket,
+        "timezone": tz.key,
+        "window": window,
+        "moving_average": moving_average,
+        "closed": all(item["closed"] for item in buckets),
+        "buckets": buckets,
+    }
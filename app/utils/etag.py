@@ -0,0 +1,17 @@
+import hashlib
+import json
+from typing import Any, Optional
+
+
+def make_etag(body: Any) -> str:
+    """Strong ETag for a JSON-serializable response body"""
+    encoded = json.dumps(body, sort_keys=True, default=str).encode("utf-8")
+    return '"' + hashlib.sha256(encoded).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header lists etag (weak comparison)"""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in [tag[2:] if tag.startswith("W/") else tag for tag in candidates]
@@ -0,0 +1,152 @@
+"""
+Password hashing off the request workers.
+
+argon2 is deliberately slow, and sync routes run it on the same threadpool
+that serves every other endpoint, so a burst of logins used to starve the
+journal routes. Hashes now run on a small dedicated pool (argon2_cffi
+releases the GIL, so threads are enough). At most HASH_QUEUE_SIZE calls may be
+running or waiting; past that, or after HASH_TIMEOUT seconds, HashingBusy is
+raised and the route answers 503 instead of tying up another worker.
+
+The argon2 cost settings can be tuned without a restart by pointing
+MINDMATE_HASH_CONFIG at a JSON file such as
+
+    {"time_cost": 3, "memory_cost": 65536, "parallelism": 4}
+
+It is re-read whenever its mtime changes. Existing hashes keep verifying and
+are upgraded to the new settings the next time their user logs in.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
+
+HASH_WORKERS = int(os.getenv("MINDMATE_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_SIZE = int(os.getenv("MINDMATE_HASH_QUEUE_SIZE", "16"))
+HASH_TIMEOUT = float(os.getenv("MINDMATE_HASH_TIMEOUT", "5"))
+HASH_CONFIG = os.getenv("MINDMATE_HASH_CONFIG")
+
+# Keys accepted in the config file
+ARGON2_SETTINGS = ("time_cost", "memory_cost", "parallelism")
+
+
+class HashingBusy(Exception):
+    """The hashing pool is full or the hash took longer than the timeout"""
+
+
+def build_context(settings: Optional[dict] = None) -> CryptContext:
+    options = {f"argon2__{key}": value for key, value in (settings or {}).items() if key in ARGON2_SETTINGS}
+    return CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto", **options)
+
+
+class HashingPool:
+    def __init__(self, workers: int = HASH_WORKERS, queue_size: int = HASH_QUEUE_SIZE,
+                 timeout: float = HASH_TIMEOUT, config_path: Optional[str] = HASH_CONFIG):
+        self.workers = workers
+        self.timeout = timeout
+        self.config_path = config_path
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hashing")
+        self._slots = threading.BoundedSemaphore(max(queue_size, workers))
+        self._lock = threading.Lock()
+        self._context = build_context()
+        self._config_mtime = None
+        self.rejected = 0
+        self.timeouts = 0
+
+    # ========== CONFIG ==========
+
+    def context(self) -> CryptContext:
+        """The CryptContext for the current config file (reloaded when it changes)"""
+        if self.config_path:
+            try:
+                mtime = os.stat(self.config_path).st_mtime
+            except OSError:
+                mtime = None
+            if mtime != self._config_mtime:
+                self._reload(mtime)
+        return self._context
+
+    def _reload(self, mtime):
+        with self._lock:
+            if mtime == self._config_mtime:
+                return
+            self._config_mtime = mtime
+            settings = {}
+            if mtime is not None:
+                try:
+                    with open(self.config_path) as f:
+                        settings = json.load(f)
+                    context = build_context(settings)
+                except (OSError, ValueError, TypeError) as e:
+                    # Keep hashing with the previous settings
+                    logger.error("Ignoring hash config %s: %s", self.config_path, e)
+                    return
+            else:
+                context = build_context()
+            self._context = context
+            logger.info("Password hashing settings: %s", settings or "defaults")
+
+    # ========== POOL ==========
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HashingBusy("too many password hashes in progress")
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot stays taken until the hash finishes, even after a timeout
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            self.timeouts += 1
+            future.cancel()
+            raise HashingBusy("password hashing timed out")
+
+    async def run_async(self, fn, *args):
+        """run() for async code: waits on the event loop instead of a thread"""
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HashingBusy("too many password hashes in progress")
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise HashingBusy("password hashing timed out")
+
+    def hash(self, password: str) -> str:
+        return self.run(self.context().hash, password)
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return self.run(self.context().verify, password, hashed)
+
+    def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """(valid, new_hash) - new_hash is set when hashed uses outdated settings"""
+        return self.run(self.context().verify_and_update, password, hashed)
+
+    async def hash_async(self, password: str) -> str:
+        return await self.run_async(self.context().hash, password)
+
+    async def verify_and_update_async(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        return await self.run_async(self.context().verify_and_update, password, hashed)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+hashing_pool = HashingPool()
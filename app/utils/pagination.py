@@ -0,0 +1,20 @@
+import base64
+from datetime import datetime
+from typing import Tuple
+
+
+def encode_cursor(created_at: datetime, entry_id: int) -> str:
+    """Opaque keyset cursor for the (created_at, id) ordering"""
+    raw = f"{created_at.isoformat()}|{entry_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor, raises ValueError for malformed cursors"""
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        created_at, entry_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(entry_id)
+    except (ValueError, UnicodeError) as e:
+        raise ValueError("Invalid cursor") from e
@@ -0,0 +1,117 @@
+"""
+Throughput of the async routes against the previous sync stack under
+concurrent load. The sync side is a copy of the old route bodies (sync def,
+SessionLocal) mounted on its own app; both apps are driven through ASGI with
+the same mix of GET /entries/?limit=20 and GET /entries/{id} requests.
+
+Keep --concurrency below anyio's 40 threads for the sync side: past that,
+threads blocked waiting for a pooled connection can starve the requests that
+hold one and the sync stack stalls until the pool timeout.
+
+    python -m benchmarks.bench_async_stack [--requests N] [--concurrency N]
+"""
+import argparse
+from benchmarks.common import create_schema, seed_entries, use_temp_database
+
+use_temp_database()
+
+import asyncio
+import time
+from typing import List
+import httpx
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.orm import Session
+from app import auth, models, schemas
+from app.database import engine, get_db
+from app.dependencies import security, user_cache
+from app.main import app
+
+create_schema()
+
+
+def sync_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+):
+    # Same user cache as the async dependency, so only the data path differs
+    username = auth.verify_token(credentials.credentials)["sub"]
+    user = user_cache.get(username)
+    if user is None:
+        db_user = db.query(models.User).filter(models.User.username == username).first()
+        if db_user is None:
+            raise HTTPException(status_code=401)
+        user = schemas.CurrentUser.model_validate(db_user)
+        user_cache.set(username, user)
+    return user
+
+
+sync_app = FastAPI()
+
+
+@sync_app.get("/entries/", response_model=List[schemas.JournalEntryResponse])
+def sync_get_entries(limit: int = 20, db: Session = Depends(get_db), current_user=Depends(sync_current_user)):
+    return db.query(models.JournalEntry).filter(
+        models.JournalEntry.user_id == current_user.id
+    ).order_by(models.JournalEntry.created_at.desc(), models.JournalEntry.id.desc()).limit(limit).all()
+
+
+@sync_app.get("/entries/{entry_id:int}", response_model=schemas.JournalEntryResponse)
+def sync_get_entry(entry_id: int, db: Session = Depends(get_db), current_user=Depends(sync_current_user)):
+    entry = db.query(models.JournalEntry).filter(
+        models.JournalEntry.id == entry_id,
+        models.JournalEntry.user_id == current_user.id
+    ).first()
+    if entry is None:
+        raise HTTPException(status_code=404)
+    return entry
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def load(target, headers, paths, requests, concurrency):
+    transport = httpx.ASGITransport(app=target)
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+        async def one(i):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(paths[i % len(paths)])
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200, response.text
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+    return requests / elapsed, percentile(latencies, 50) * 1e3, percentile(latencies, 99) * 1e3
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/users/register", json={
+            "email": "bench@example.com", "username": "bench", "password": "password1"
+        })
+        token = (await client.post("/users/login", json={"username": "bench", "password": "password1"})).json()
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+    seed_entries(engine, 1, 1000, days=30)
+    paths = ["/entries/?limit=20"] + [f"/entries/{entry_id}" for entry_id in range(1, 1000, 37)]
+
+    print(f"{'stack':>6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for label, target in (("sync", sync_app), ("async", app)):
+        await load(target, headers, paths, 100, args.concurrency)  # warm up
+        rate, p50, p99 = await load(target, headers, paths, args.requests, args.concurrency)
+        print(f"{label:>6} {rate:>8.0f} {p50:>8.1f} {p99:>8.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
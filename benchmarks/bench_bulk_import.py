@@ -0,0 +1,81 @@
+"""
+POST /entries/bulk against one POST /entries/ per entry: entries per second,
+plus the process' peak RSS after streaming uploads of growing size through
+ASGI, which should stay flat.
+
+    python -m benchmarks.bench_bulk_import [--sizes 5000,20000]
+"""
+import argparse
+from benchmarks.common import create_schema, use_temp_database
+
+use_temp_database()
+
+import asyncio
+import json
+import random
+import resource
+import time
+import httpx
+from app.main import app
+
+create_schema()
+
+WORDS = ("happy calm tired anxious grateful angry hopeful sad excited worried "
+         "work family friends walk rain sleep coffee dinner project weekend").split()
+
+
+def entry(rng, i):
+    return {
+        "title": f"Imported {i}",
+        "content": " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 60))),
+        "created_at": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}T08:00:00Z",
+    }
+
+
+async def ndjson_body(count, seed=0):
+    rng = random.Random(seed)
+    for start in range(0, count, 200):
+        lines = (json.dumps(entry(rng, i)) for i in range(start, min(start + 200, count)))
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="5000,20000")
+    parser.add_argument("--single", type=int, default=500, help="entries posted one by one")
+    args = parser.parse_args()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        await client.post("/users/register", json={
+            "email": "bench@example.com", "username": "bench", "password": "password1"
+        })
+        token = (await client.post("/users/login", json={"username": "bench", "password": "password1"})).json()
+        client.headers["Authorization"] = f"Bearer {token['access_token']}"
+
+        rng = random.Random(1)
+        start = time.perf_counter()
+        for i in range(args.single):
+            assert (await client.post("/entries/", json=entry(rng, i))).status_code == 200
+        single_rate = args.single / (time.perf_counter() - start)
+        print(f"one by one: {single_rate:.0f} entries/s ({args.single} entries)")
+
+        print(f"{'entries':>8} {'entries/s':>10} {'peak RSS MB':>12} {'response KB':>12}")
+        for count in map(int, args.sizes.split(",")):
+            start = time.perf_counter()
+            response = await client.post(
+                "/entries/bulk", content=ndjson_body(count, seed=count),
+                headers={"Content-Type": "application/x-ndjson"}
+            )
+            elapsed = time.perf_counter() - start
+            summary = json.loads(response.text.splitlines()[-1])["summary"]
+            assert summary == {"created": count, "failed": 0}, summary
+            print(f"{count:>8} {count / elapsed:>10.0f} {peak_rss_mb():>12.1f} {len(response.content) / 1024:>12.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+"""
+app.AI.cohort.cohort_trends against looping analyze_emotion_trends over the
+users (grouping the entries and building its per-entry dicts included),
+on synthetic columnar data, and checks that both agree per user.
+
+    python -m benchmarks.bench_cohort [--entries 1000000] [--users 5000]
+"""
+import argparse
+import time
+import numpy as np
+from app.AI.cohort import cohort_trends, rolling_sentiment
+from app.AI.sentiment import EMOTIONS, analyze_emotion_trends
+
+
+def columns(entries, users, days=90, seed=0):
+    rng = np.random.default_rng(seed)
+    user_ids = rng.integers(1, users + 1, entries)
+    timestamps = np.datetime64("2024-01-01") + rng.integers(0, days * 86400, entries).astype("timedelta64[s]")
+    sentiment = np.round(rng.uniform(-1, 1, entries), 3)
+    emotions = rng.choice((0.0, 0.0, 0.2, 0.4, 0.6, 1.0), (entries, len(EMOTIONS)))
+    emotions[rng.random(entries) < 0.2] = np.nan  # entries without emotion scores
+    return user_ids, timestamps, sentiment, emotions
+
+
+def loop_trends(user_ids, timestamps, sentiment, emotions):
+    """One analyze_emotion_trends call per user, entries in time order"""
+    per_user = {}
+    for i in np.lexsort((timestamps, user_ids)).tolist():
+        row = emotions[i]
+        per_user.setdefault(int(user_ids[i]), []).append({
+            "sentiment_score": float(sentiment[i]),
+            "emotions": {} if np.isnan(row).all() else dict(zip(EMOTIONS, row.tolist())),
+            "created_at": timestamps[i],
+        })
+    return {user_id: analyze_emotion_trends(entries) for user_id, entries in per_user.items()}
+
+
+def mismatches(looped, vectorized, user_ids, emotions):
+    """Users whose results differ beyond float noise (rounding, exact emotion ties)"""
+    totals = {}
+    count = 0
+    for i, user_id in enumerate(vectorized["user_id"].tolist()):
+        expected = looped[user_id]
+        dominant = vectorized["dominant_emotion"][i]
+        if expected["dominant_emotion"] != dominant:
+            if not totals:
+                order = np.argsort(user_ids, kind="stable")
+                bounds = np.searchsorted(user_ids[order], vectorized["user_id"], side="left")
+                sums = np.add.reduceat(np.nan_to_num(emotions[order]), bounds, axis=0)
+                totals = {u: dict(zip(EMOTIONS, row)) for u, row in zip(vectorized["user_id"].tolist(), sums)}
+            tied = dominant in totals[user_id] and np.isclose(
+                totals[user_id][dominant], totals[user_id][expected["dominant_emotion"]]
+            )
+            if not tied:
+                count += 1
+                continue
+        if (expected["trend"] != vectorized["trend"][i]
+                or abs(expected["average_sentiment"] - vectorized["average_sentiment"][i]) > 1e-3):
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=5_000)
+    args = parser.parse_args()
+
+    data = columns(args.entries, args.users)
+    print(f"{args.entries} entries, {args.users} users")
+
+    start = time.perf_counter()
+    vectorized = cohort_trends(*data)
+    vectorized_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rolling_sentiment(*data[:3], window=7)
+    rolling_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    looped = loop_trends(*data)
+    loop_seconds = time.perf_counter() - start
+
+    print(f"{'loop over users':>22} {loop_seconds:>8.2f} s")
+    print(f"{'cohort_trends':>22} {vectorized_seconds:>8.2f} s  ({loop_seconds / vectorized_seconds:.0f}x)")
+    print(f"{'rolling_sentiment(7)':>22} {rolling_seconds:>8.2f} s")
+    print(f"users that differ: {mismatches(looped, vectorized, data[0], data[3])} of {len(looped)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Concurrent writers against one SQLite file, like `uvicorn --workers N`:
+each process runs its own copy of the app and posts entries through ASGI
+(with some list reads mixed in), and the parent reports the entries per
+second sustained across all of them and how many requests failed.
+
+Runs the default settings from app.database (WAL, synchronous=NORMAL,
+retry_on_busy) against the old ones (rollback journal, synchronous=FULL,
+no busy_timeout beyond the driver's, no retries).
+
+    python -m benchmarks.bench_concurrent_writes [--processes N] [--entries N] [--concurrency N]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+
+CONFIGS = {
+    "old": {
+        "MINDMATE_SQLITE_JOURNAL_MODE": "DELETE",
+        "MINDMATE_SQLITE_SYNCHRONOUS": "FULL",
+        "MINDMATE_SQLITE_MMAP_SIZE": "0",
+        "MINDMATE_SQLITE_CACHE_SIZE": "-2000",
+        "MINDMATE_SQLITE_BUSY_TIMEOUT_MS": "5000",
+        "MINDMATE_DB_BUSY_RETRIES": "0",
+    },
+    "tuned": {},
+}
+
+
+async def write_entries(worker, entries, concurrency):
+    import httpx
+    from app.main import app
+
+    # Errors become 500s (counted as failures) instead of raising here
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/users/register", json={
+            "email": f"writer{worker}@example.com", "username": f"writer{worker}", "password": "password1"
+        })
+        token = (await client.post("/users/login", json={"username": f"writer{worker}", "password": "password1"})).json()
+        client.headers["Authorization"] = f"Bearer {token['access_token']}"
+
+        semaphore = asyncio.Semaphore(concurrency)
+        failures = 0
+
+        async def one(i):
+            nonlocal failures
+            async with semaphore:
+                response = await client.post("/entries/", json={
+                    "title": f"Entry {i}", "content": f"Writer {worker} had a calm, happy day number {i % 50}."
+                })
+                if response.status_code != 200:
+                    failures += 1
+                if i % 4 == 0:
+                    await client.get("/entries/", params={"limit": 20, "view": "summary"})
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(entries)))
+        return time.perf_counter() - start, failures
+
+
+def worker_main(worker, entries, concurrency, env, barrier, results):
+    os.environ.update(env)
+    from app import main  # noqa: F401 - imported before the clock starts
+    barrier.wait()
+    try:
+        results.put((worker,) + asyncio.run(write_entries(worker, entries, concurrency)))
+    except Exception as e:
+        results.put((worker, None, repr(e)))
+
+
+def run(config, processes, entries, concurrency):
+    path = os.path.join(tempfile.mkdtemp(prefix="mindmate-bench-"), "writes.db")
+    env = {"MINDMATE_DATABASE_URL": f"sqlite:///{path}", **CONFIGS[config]}
+
+    # Create the schema once so the workers don't race on migrations
+    ctx = multiprocessing.get_context("spawn")
+    setup = ctx.Process(target=_migrate, args=(env,))
+    setup.start()
+    setup.join()
+
+    barrier = ctx.Barrier(processes)
+    results = ctx.Queue()
+    workers = [
+        ctx.Process(target=worker_main, args=(i, entries, concurrency, env, barrier, results))
+        for i in range(processes)
+    ]
+    start = time.perf_counter()
+    for process in workers:
+        process.start()
+    outcomes = [results.get() for _ in workers]
+    for process in workers:
+        process.join()
+    finished = [outcome for outcome in outcomes if outcome[1] is not None]
+    crashed = [outcome for outcome in outcomes if outcome[1] is None]
+    elapsed = max(outcome[1] for outcome in finished) if finished else time.perf_counter() - start
+    failures = sum(outcome[2] for outcome in finished)
+    written = processes * entries - failures - len(crashed) * entries
+    return written / elapsed, failures, crashed
+
+
+def _migrate(env):
+    os.environ.update(env)
+    from benchmarks.common import create_schema
+    create_schema()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--entries", type=int, default=300, help="entries per process")
+    parser.add_argument("--concurrency", type=int, default=16, help="in-flight requests per process")
+    args = parser.parse_args()
+
+    print(f"{'config':>6} {'entries/s':>10} {'failed':>7}")
+    for config in CONFIGS:
+        rate, failures, crashed = run(config, args.processes, args.entries, args.concurrency)
+        print(f"{config:>6} {rate:>10.0f} {failures:>7}")
+        for worker, _, error in crashed:
+            print(f"       worker {worker} crashed: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Compare the SQL aggregation behind GET /entries/emotion-trends with the
+previous path (load every ORM row, build dicts, analyze_emotion_trends).
+
+    python -m benchmarks.bench_emotion_trends
+"""
+from benchmarks.common import seed_entries, timed, use_temp_database
+
+use_temp_database()
+
+from datetime import datetime, timedelta, timezone
+from app import analytics, migrations, models
+from app.AI import sentiment
+from app.database import SessionLocal, engine
+
+
+def python_emotion_trends(db, user_id, start_date):
+    """The route body before the SQL aggregation path"""
+    entries = db.query(models.JournalEntry).filter(
+        models.JournalEntry.user_id == user_id,
+        models.JournalEntry.created_at >= start_date,
+        models.JournalEntry.sentiment_score.isnot(None)
+    ).order_by(models.JournalEntry.created_at, models.JournalEntry.id).all()
+    entries_data = [
+        {
+            "sentiment_score": e.sentiment_score,
+            "sentiment_label": e.sentiment_label,
+            "emotions": e.emotions,
+            "created_at": e.created_at
+        }
+        for e in entries
+    ]
+    return {
+        "total_entries": len(entries),
+        "trend_analysis": sentiment.analyze_emotion_trends(entries_data),
+        "entries": [
+            {"date": e.created_at.isoformat(), "sentiment": e.sentiment_score, "label": e.sentiment_label}
+            for e in entries[-10:]
+        ]
+    }
+
+
+def main():
+    migrations.upgrade(engine)
+    start_date = datetime.now(timezone.utc) - timedelta(days=30)
+    print(f"{'entries':>8} {'python ms':>10} {'sql ms':>8} {'speedup':>8}")
+    for user_id, count in ((1, 10_000), (2, 100_000)):
+        seed_entries(engine, user_id, count, days=30, seed=user_id)
+        db = SessionLocal()
+        try:
+            python_time, expected = timed(lambda: python_emotion_trends(db, user_id, start_date), repeat=3)
+            sql_time, actual = timed(lambda: analytics.emotion_trends(db, user_id, start_date), repeat=3)
+        finally:
+            db.close()
+        assert actual == expected, (actual, expected)
+        print(f"{count:>8} {python_time * 1e3:>10.1f} {sql_time * 1e3:>8.1f} {python_time / sql_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
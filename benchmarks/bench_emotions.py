@@ -0,0 +1,53 @@
+"""
+Benchmark detect_emotions against the original per-keyword substring scan.
+
+Run from the repository root:
+    python -m benchmarks.bench_emotions
+"""
+import random
+import timeit
+
+from app.AI.sentiment import EMOTION_KEYWORDS, detect_emotions
+
+VOCABULARY = (
+    "today i went to work and made some coffee with my friends the meeting was "
+    "long but okay i felt tired then happy later we look forward to the weekend "
+    "it was great to see everyone again although i was worried about money and "
+    "a little nervous about the exam maybe i expect too much of myself"
+).split()
+PUNCTUATION = ["", "", "", "", ",", ".", "!", "?"]
+
+
+def legacy_detect_emotions(text):
+    """The implementation detect_emotions replaced: one scan per keyword"""
+    text_lower = text.lower()
+    emotions = {}
+    for emotion, keywords in EMOTION_KEYWORDS.items():
+        count = sum(1 for keyword in keywords if keyword in text_lower)
+        emotions[emotion] = min(count / 5, 1.0)
+    return emotions
+
+
+def make_entry(word_count, seed):
+    rng = random.Random(seed)
+    words = [rng.choice(VOCABULARY) + rng.choice(PUNCTUATION) for _ in range(word_count)]
+    return " ".join(words).capitalize()
+
+
+def main():
+    print(f"{'words':>8} {'legacy ms':>10} {'matcher ms':>11} {'whole-word ms':>14} {'speedup':>8}")
+    for word_count in (100, 1000, 10000, 50000):
+        text = make_entry(word_count, seed=word_count)
+        # The default mode must keep the old substring semantics exactly
+        assert detect_emotions(text, whole_words=False) == legacy_detect_emotions(text)
+
+        number = max(5, 200000 // word_count)
+        legacy = timeit.timeit(lambda: legacy_detect_emotions(text), number=number) / number
+        # First call fills the piece cache, just like a warmed-up worker
+        matcher = timeit.timeit(lambda: detect_emotions(text, whole_words=False), number=number) / number
+        whole = timeit.timeit(lambda: detect_emotions(text, whole_words=True), number=number) / number
+        print(f"{word_count:>8} {legacy * 1e3:>10.3f} {matcher * 1e3:>11.3f} {whole * 1e3:>14.3f} {legacy / matcher:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+GET /entries/export for a user with many entries: time to first byte, total
+time and size per format, peak RSS, and the latency of GET /entries/{id}
+requests made while the export is streaming.
+
+Peak RSS includes SQLite's page cache and mmap (MINDMATE_SQLITE_CACHE_SIZE,
+MINDMATE_SQLITE_MMAP_SIZE), which fill up to their limits as the export
+reads the table; set both low to see the export's own memory use.
+
+    python -m benchmarks.bench_export [--entries 50000]
+"""
+import argparse
+from benchmarks.common import create_schema, seed_entries, use_temp_database
+
+use_temp_database()
+
+import asyncio
+import resource
+import time
+from urllib.parse import urlencode
+import httpx
+from app.database import engine
+from app.main import app
+
+create_schema()
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def export(headers, params):
+    """Calls the ASGI app directly: httpx's ASGITransport buffers whole responses"""
+    start = time.perf_counter()
+    first_byte = None
+    size = 0
+    disconnect = asyncio.Event()
+
+    async def receive():
+        if not receive.sent:
+            receive.sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+    receive.sent = False
+
+    async def send(message):
+        nonlocal first_byte, size
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200, message
+        elif message["type"] == "http.response.body" and message.get("body"):
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+            size += len(message["body"])
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": "/entries/export", "raw_path": b"/entries/export",
+        "root_path": "", "query_string": urlencode(params).encode(), "server": ("bench", 80),
+        "client": ("bench", 1), "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+    }
+    await app(scope, receive, send)
+    disconnect.set()
+    return first_byte, time.perf_counter() - start, size
+
+
+async def reads_during(client, task):
+    latencies = []
+    while not task.done():
+        start = time.perf_counter()
+        assert (await client.get("/entries/1")).status_code == 200
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.01)
+    return latencies
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=50_000)
+    args = parser.parse_args()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        await client.post("/users/register", json={
+            "email": "bench@example.com", "username": "bench", "password": "password1"
+        })
+        token = (await client.post("/users/login", json={"username": "bench", "password": "password1"})).json()
+        client.headers["Authorization"] = f"Bearer {token['access_token']}"
+        seed_entries(engine, 1, args.entries, days=365)
+        print(f"{args.entries} entries, peak RSS after seeding {peak_rss_mb():.0f} MB")
+
+        print(f"{'format':>10} {'ttfb ms':>8} {'total s':>8} {'MB':>7} {'read p50 ms':>12} {'read max ms':>12} {'peak RSS MB':>12}")
+        for label, params in (("ndjson", {}), ("csv", {"format": "csv"}), ("ndjson.gz", {"gzip": "true"})):
+            task = asyncio.create_task(export(client.headers, params))
+            latencies = sorted(await reads_during(client, task))
+            first_byte, total, size = await task
+            p50 = latencies[len(latencies) // 2] * 1e3 if latencies else 0.0
+            worst = latencies[-1] * 1e3 if latencies else 0.0
+            print(f"{label:>10} {first_byte * 1e3:>8.1f} {total:>8.2f} {size / 2**20:>7.1f} "
+                  f"{p50:>12.1f} {worst:>12.1f} {peak_rss_mb():>12.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
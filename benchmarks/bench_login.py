@@ -0,0 +1,101 @@
+"""
+Login storm: fires concurrent POST /users/login requests through the ASGI app
+while one client keeps reading a journal entry, and reports login throughput,
+login p50/p99, 503s and the journal endpoint's p99 during the storm.
+
+Runs once with hashing inline on the request threadpool (the old behavior,
+approximated by a hashing pool as large as that threadpool) and once with
+the bounded hashing pool from app.utils.hashing. Cost settings come from
+MINDMATE_HASH_CONFIG like in the app (passlib's argon2 defaults otherwise).
+
+    python -m benchmarks.bench_login [--logins N] [--concurrency N]
+"""
+import argparse
+from benchmarks.common import create_schema, use_temp_database
+
+use_temp_database()
+
+import asyncio
+import time
+import httpx
+from app import auth
+from app.main import app
+from app.utils import hashing
+
+create_schema()
+
+USERS = 20
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+async def storm(client, headers, path, logins, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    login_times, read_times, statuses = [], [], []
+    done = asyncio.Event()
+
+    async def login(i):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/users/login", json={"username": f"user{i % USERS}", "password": "password1"})
+            login_times.append(time.perf_counter() - start)
+            statuses.append(response.status_code)
+
+    async def reader():
+        while not done.is_set():
+            start = time.perf_counter()
+            await client.get(path, headers=headers)
+            read_times.append(time.perf_counter() - start)
+            await asyncio.sleep(0.01)
+
+    reading = asyncio.create_task(reader())
+    start = time.perf_counter()
+    await asyncio.gather(*(login(i) for i in range(logins)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await reading
+
+    ok = [t for t, status in zip(login_times, statuses) if status == 200]
+    return {
+        "logins/s": len(ok) / elapsed,
+        "p50 ms": percentile(ok, 50) * 1e3,
+        "p99 ms": percentile(ok, 99) * 1e3,
+        "503s": statuses.count(503),
+        "read p99 ms": percentile(read_times, 99) * 1e3,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(USERS):
+            await client.post("/users/register", json={
+                "email": f"user{i}@example.com", "username": f"user{i}", "password": "password1"
+            })
+        token = (await client.post("/users/login", json={"username": "user0", "password": "password1"})).json()
+        headers = {"Authorization": f"Bearer {token['access_token']}"}
+        entry = (await client.post("/entries/", headers=headers, json={"title": "Bench", "content": "Calm day."})).json()
+        path = f"/entries/{entry['id']}/analysis"
+
+        bounded = hashing.hashing_pool
+        # anyio's default threadpool has 40 threads
+        inline = hashing.HashingPool(workers=40, queue_size=10_000, timeout=600)
+        columns = ("logins/s", "p50 ms", "p99 ms", "503s", "read p99 ms")
+        print(f"{'hashing':>8} " + " ".join(f"{c:>11}" for c in columns))
+        for label, pool in (("inline", inline), ("pool", bounded)):
+            auth.hashing_pool = pool
+            result = await storm(client, headers, path, args.logins, args.concurrency)
+            print(f"{label:>8} " + " ".join(f"{result[c]:>11.1f}" for c in columns))
+        inline.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,92 @@
+"""
+Overhead of the built-in metrics: the same workload in fresh processes with
+MINDMATE_METRICS_ENABLED=1 and =0, alternating, best of --rounds each.
+
+Workload: GET /entries/ (a page of a 1000-entry journal), GET /users/me,
+POST /entries/ (analysis inline, content never repeated so the analysis
+cache misses), and analyze_sentiment_advanced called directly (the stage
+timers alone). Also reports how long a GET /metrics scrape takes.
+
+    python -m benchmarks.bench_metrics [--requests 300] [--rounds 3]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from benchmarks.common import use_temp_database
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, sys, time
+from benchmarks.common import seed_entries
+from fastapi.testclient import TestClient
+from app.AI.sentiment import analyze_sentiment_advanced
+from app.database import engine
+from app.main import app
+
+requests = int(sys.argv[1])
+results = {}
+with TestClient(app) as client:
+    client.post("/users/register", json={"email": "bench@example.com", "username": "bench", "password": "password1"})
+    token = client.post("/users/login", json={"username": "bench", "password": "password1"}).json()
+    client.headers["Authorization"] = "Bearer " + token["access_token"]
+    user_id = client.get("/users/me").json()["id"]
+    if not client.get("/entries/", params={"limit": 1}).json():
+        seed_entries(engine, user_id, 1000)
+    run = time.time_ns()
+
+    def timed(name, call):
+        call(-1)  # warm
+        start = time.perf_counter()
+        for i in range(requests):
+            call(i)
+        results[name] = (time.perf_counter() - start) / requests * 1e6
+
+    timed("GET /entries/", lambda i: client.get("/entries/", params={"limit": 20}))
+    timed("GET /users/me", lambda i: client.get("/users/me"))
+    timed("POST /entries/", lambda i: client.post("/entries/", json={
+        "title": "Bench", "content": f"Run {run} entry {i}: a calm walk, then some worry about work."
+    }))
+    timed("analyze (direct)", lambda i: analyze_sentiment_advanced(
+        f"Run {run} text {i}. I felt happy and grateful after the long walk, a little anxious about work."
+    ))
+    if client.get("/metrics").status_code == 200:
+        timed("GET /metrics", lambda i: client.get("/metrics"))
+print(json.dumps(results))
+"""
+
+
+def run_child(env, requests):
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, str(requests)], cwd=ROOT, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    use_temp_database()
+    base = {**os.environ, "MINDMATE_SUMMARY_SCHEDULER": "0"}
+    best = {"on": {}, "off": {}}
+    for _ in range(args.rounds):
+        for config, flag in (("on", "1"), ("off", "0")):
+            for name, us in run_child({**base, "MINDMATE_METRICS_ENABLED": flag}, args.requests).items():
+                best[config][name] = min(us, best[config].get(name, float("inf")))
+
+    print(f"{'':>18} {'off us':>9} {'on us':>9} {'overhead':>9}")
+    for name, on in best["on"].items():
+        off = best["off"].get(name)
+        if off is None:
+            print(f"{name:>18} {'':>9} {on:>9.0f}")
+        else:
+            print(f"{name:>18} {off:>9.0f} {on:>9.0f} {(on - off) / off:>+9.1%}")
+
+
+if __name__ == "__main__":
+    main()
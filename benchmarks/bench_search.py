@@ -0,0 +1,122 @@
+"""
+GET /entries/search (FTS5, bm25 ranking) against a LIKE scan of the user's
+entries, at 100k entries: latency per query for a rare term, a common term,
+a phrase and a prefix (and no match at all), plus the index's size on disk.
+The same queries then run for a second user with a small journal in the
+same corpus, whose searches shouldn't pay for the big one.
+
+    python -m benchmarks.bench_search [--entries 100000] [--small-entries 10] [--repeat 20]
+"""
+import argparse
+from benchmarks.common import use_temp_database
+
+use_temp_database()
+
+import random
+import time
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from app import models
+from app.database import engine
+from app.main import app
+
+# Real words first (most frequent first), then filler words; drawn with
+# Zipf-like weights so common words are in most entries and others are rare
+WORDS = ("the and was today work feel coffee walk family friends tired happy calm anxious rain sleep "
+         "dinner project weekend meeting deadline garden music movie grateful").split()
+WORDS += [f"word{i}" for i in range(5000)]
+WEIGHTS = [1 / rank for rank in range(1, len(WORDS) + 1)]
+RARE = "marathon"
+
+
+def seed(count, user_id=1, seed=0):
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    for start in range(0, count, 5000):
+        rows = []
+        for i in range(start, min(start + 5000, count)):
+            words = rng.choices(WORDS, WEIGHTS, k=rng.randint(20, 120))
+            if i % 1000 == 0:
+                words.insert(rng.randrange(len(words)), RARE)
+            rows.append({
+                "title": f"Entry {i}", "content": " ".join(words), "user_id": user_id,
+                "sentiment_score": 0.0, "sentiment_label": "neutral", "analysis_status": "complete",
+                "created_at": now - timedelta(minutes=i),
+            })
+        with engine.begin() as conn:
+            conn.execute(models.JournalEntry.__table__.insert(), rows)
+
+
+def like_search(words, user_id=1, limit=20):
+    """The client-side filter done in SQL instead: every word as a substring"""
+    filters = " AND ".join(f"(title LIKE :w{i} OR content LIKE :w{i})" for i in range(len(words)))
+    params = {f"w{i}": f"%{word}%" for i, word in enumerate(words)}
+    with engine.connect() as conn:
+        return conn.execute(text(
+            f"SELECT id, title FROM journal_entries WHERE user_id = :user_id AND {filters} "
+            "ORDER BY created_at DESC LIMIT :limit"
+        ), {**params, "user_id": user_id, "limit": limit}).all()
+
+
+def timed_ms(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1e3
+
+
+def login(client, username):
+    client.post("/users/register", json={
+        "email": f"{username}@example.com", "username": username, "password": "password1"
+    })
+    token = client.post("/users/login", json={"username": username, "password": "password1"}).json()
+    return {"Authorization": f"Bearer {token['access_token']}"}
+
+
+QUERIES = (
+    ("no match", "zebra", ["zebra"]),
+    ("rare term", RARE, [RARE]),
+    ("common term", "coffee", ["coffee"]),
+    ("uncommon term", "grateful", ["grateful"]),
+    ("two terms", "rain garden", ["rain", "garden"]),
+    ("phrase", '"coffee walk"', ["coffee walk"]),
+    ("prefix", "deadl*", ["deadl"]),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--small-entries", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with TestClient(app) as client:
+        users = {1: login(client, "bench"), 2: login(client, "small")}
+
+        start = time.perf_counter()
+        seed(args.entries)
+        seed(args.small_entries, user_id=2, seed=1)
+        print(f"{args.entries} + {args.small_entries} entries inserted (index kept by triggers) "
+              f"in {time.perf_counter() - start:.1f}s")
+        with engine.connect() as conn:
+            size = conn.exec_driver_sql(
+                "SELECT sum(pgsize) FROM dbstat WHERE name LIKE 'journal_entries_fts%'"
+            ).scalar()
+        print(f"full-text index: {size / 2**20:.1f} MB")
+
+        for user_id, label in ((1, f"{args.entries} entries"), (2, f"{args.small_entries} entries, same corpus")):
+            print(f"user with {label}")
+            print(f"{'query':>20} {'search ms':>10} {'LIKE ms':>8}")
+            for name, q, words in QUERIES:
+                def search():
+                    assert client.get("/entries/search", params={"q": q}, headers=users[user_id]).status_code == 200
+                like_ms = timed_ms(lambda: like_search(words, user_id), args.repeat)
+                print(f"{name:>20} {timed_ms(search, args.repeat):>10.1f} {like_ms:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
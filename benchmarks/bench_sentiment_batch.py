@@ -0,0 +1,55 @@
+"""
+Benchmark analyze_sentiment_batch against a loop over
+analyze_sentiment_advanced, as a backlog re-score would run it.
+
+The batch analyzes each unique text once and, for large batches, fans out
+over a process pool; `duplicates` is the share of texts that repeat an
+earlier one (imports and copied entries).
+
+Run from the repository root:
+    python -m benchmarks.bench_sentiment_batch [--texts 4000] [--workers 4]
+"""
+import argparse
+import os
+import random
+import time
+
+from app.AI.sentiment import analyze_sentiment_advanced, analyze_sentiment_batch, warm_up
+from benchmarks.generator import JournalGenerator
+
+
+def make_texts(count, duplicates, seed=0):
+    rng = random.Random(seed)
+    texts = JournalGenerator(seed).texts(count)
+    for i in range(1, count):
+        if rng.random() < duplicates:
+            texts[i] = texts[rng.randrange(i)]
+    return texts
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--texts", type=int, default=4000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    warm_up()
+    print(f"{'duplicates':>10} {'loop s':>8} {'batch s':>8} {f'batch x{args.workers} s':>12} {'speedup':>8}")
+    for duplicates in (0.0, 0.1, 0.5):
+        texts = make_texts(args.texts, duplicates)
+        expected, loop = timed(lambda: [analyze_sentiment_advanced(text) for text in texts])
+        serial_results, serial = timed(lambda: analyze_sentiment_batch(texts))
+        pooled_results, pooled = timed(lambda: analyze_sentiment_batch(texts, workers=args.workers))
+        # The batch must not change a single result
+        assert serial_results == expected and pooled_results == expected
+        print(f"{duplicates:>10.0%} {loop:>8.2f} {serial:>8.2f} {pooled:>12.2f} {loop / min(serial, pooled):>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Cold start of a worker process: time to import app.main, to answer the
+first request (lifespan startup included) and to report ready on /ready,
+each in a fresh interpreter against an already migrated database.
+
+Medians of --runs processes. With --max-import-ms / --max-first-request-ms
+the script exits non-zero when a median is over the limit, so it can guard
+against startup regressions.
+
+    python -m benchmarks.bench_startup [--runs 10] [--max-import-ms N] [--max-first-request-ms N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from benchmarks.common import use_temp_database
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Timed from the first line of the child, so interpreter start-up isn't counted
+CHILD = """
+import json, time
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app) as client:
+    assert client.get("/health").status_code == 200
+    first = time.perf_counter()
+    while client.get("/ready").status_code == 503:
+        time.sleep(0.002)
+    ready = time.perf_counter()
+print(json.dumps({"import": imported - start, "first_request": first - start, "ready": ready - start}))
+"""
+
+
+def run_child(env):
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=ROOT, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max-import-ms", type=float)
+    parser.add_argument("--max-first-request-ms", type=float)
+    args = parser.parse_args()
+
+    use_temp_database()
+    env = {**os.environ, "MINDMATE_SUMMARY_SCHEDULER": "0"}
+    run_child(env)  # creates and migrates the database
+
+    runs = [run_child(env) for _ in range(args.runs)]
+    medians = {name: statistics.median(run[name] for run in runs) * 1e3 for name in runs[0]}
+    print(f"{'median of':>14} {args.runs} processes")
+    for name, ms in medians.items():
+        print(f"{name:>14} {ms:>8.1f} ms")
+
+    failed = [
+        f"{name} {medians[name]:.1f} ms > {limit} ms"
+        for name, limit in (("import", args.max_import_ms), ("first_request", args.max_first_request_ms))
+        if limit is not None and medians[name] > limit
+    ]
+    if failed:
+        sys.exit("startup regression: " + ", ".join(failed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+"Monday morning" for GET /entries/weekly-summary: every user opens their
+dashboard once with cold caches, first with summaries built on request and
+then after the scheduler has precomputed them. Also reports how long the
+scheduler run took and its per-batch durations.
+
+    python -m benchmarks.bench_summary_scheduler [--users 200] [--entries 50]
+"""
+import argparse
+from benchmarks.common import create_schema, seed_entries, use_temp_database
+
+use_temp_database()
+
+import asyncio
+import time
+import httpx
+from sqlalchemy import delete
+from app import models
+from app.auth import create_access_token
+from app.database import engine
+from app.dependencies import user_cache
+from app.main import app
+from app.scheduler import SummaryScheduler
+from app.summaries import summary_cache
+
+create_schema()
+
+
+def create_users(count):
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [
+            {"username": f"user{i}", "email": f"user{i}@example.com", "hashed_password": "x", "is_active": True}
+            for i in range(1, count + 1)
+        ])
+
+
+async def dashboard_storm(client, users, concurrency):
+    """Every user fetches their summary once, returns (seconds, p99 latency)"""
+    summary_cache.clear()
+    user_cache.clear()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def fetch(i):
+        async with semaphore:
+            headers = {"Authorization": f"Bearer {create_access_token({'sub': f'user{i}'})}"}
+            start = time.perf_counter()
+            response = await client.get("/entries/weekly-summary", headers=headers)
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.text
+
+    start = time.perf_counter()
+    await asyncio.gather(*[fetch(i) for i in range(1, users + 1)])
+    latencies.sort()
+    return time.perf_counter() - start, latencies[int(len(latencies) * 0.99)]
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--entries", type=int, default=50, help="entries per user")
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    create_users(args.users)
+    for user_id in range(1, args.users + 1):
+        seed_entries(engine, user_id, args.entries, days=14, seed=user_id)
+    with engine.begin() as conn:
+        conn.execute(delete(models.WeeklySummary))
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        print(f"{args.users} users x {args.entries} entries, {args.concurrency} concurrent requests")
+        print(f"{'summaries':>12} {'req/s':>8} {'p99 ms':>8}")
+        elapsed, p99 = await dashboard_storm(client, args.users, args.concurrency)
+        print(f"{'on request':>12} {args.users / elapsed:>8.0f} {p99 * 1e3:>8.1f}")
+
+        scheduler = SummaryScheduler(batch_size=50)
+        stored = await scheduler.run_once(pace=False)
+        stats = scheduler.stats()
+        elapsed, p99 = await dashboard_storm(client, args.users, args.concurrency)
+        print(f"{'precomputed':>12} {args.users / elapsed:>8.0f} {p99 * 1e3:>8.1f}")
+        print(f"scheduler: {stored} summaries in {stats['last_run_seconds']:.2f}s "
+              f"(slowest batch of 50: {stats['max_batch_seconds']:.2f}s, conflicts {stats['conflicts']})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
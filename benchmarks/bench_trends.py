@@ -0,0 +1,65 @@
+"""
+GET /entries/trends against what clients do today (GET /entries/emotion-trends
+with days=7, 30 and 90), for a user with many entries: latency per call for
+the rollup path (tz=UTC) and the per-bucket range path (other timezones),
+and for revalidating a closed range with If-None-Match.
+
+    python -m benchmarks.bench_trends [--entries 100000] [--requests 50]
+"""
+import argparse
+from benchmarks.common import seed_entries, use_temp_database
+
+use_temp_database()
+
+import time
+from fastapi.testclient import TestClient
+from app.database import engine
+from app.main import app
+
+
+def latency_ms(client, calls, requests):
+    """Mean time of one round of `calls` (list of (params, headers)), in ms"""
+    start = time.perf_counter()
+    for _ in range(requests):
+        for params, headers in calls:
+            response = client.get(params.pop("_path", "/entries/trends"), params=params, headers=headers)
+            assert response.status_code in (200, 304), response.text
+    return (time.perf_counter() - start) / requests * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    with TestClient(app) as client:
+        client.post("/users/register", json={
+            "email": "bench@example.com", "username": "bench", "password": "password1"
+        })
+        token = client.post("/users/login", json={"username": "bench", "password": "password1"}).json()
+        client.headers["Authorization"] = f"Bearer {token['access_token']}"
+        seed_entries(engine, 1, args.entries, days=365)
+
+        closed = {"bucket": "week", "window": 12, "end": "2020-01-01"}
+        etag = client.get("/entries/trends", params=closed).headers["etag"]
+        cases = (
+            ("emotion-trends x3", lambda: [({"_path": "/entries/emotion-trends", "days": days}, {})
+                                          for days in (7, 30, 90)]),
+            ("day x90, UTC", lambda: [({"window": 90}, {})]),
+            ("day x90, New York", lambda: [({"window": 90, "tz": "America/New_York"}, {})]),
+            ("week x52, UTC", lambda: [({"bucket": "week", "window": 52}, {})]),
+            ("month x12, Tokyo", lambda: [({"bucket": "month", "window": 12, "tz": "Asia/Tokyo"}, {})]),
+            ("closed range, 304", lambda: [(dict(closed), {"If-None-Match": etag})]),
+        )
+        print(f"{args.entries} entries over 365 days")
+        print(f"{'request':>20} {'ms':>8}")
+        for label, calls in cases:
+            total = 0.0
+            for _ in range(args.requests):
+                total += latency_ms(client, calls(), 1)
+            print(f"{label:>20} {total / args.requests:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
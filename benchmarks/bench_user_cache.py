@@ -0,0 +1,66 @@
+"""
+Load test for the authenticated-user cache: fires authenticated requests at
+GET /entries/{id}/analysis and counts the SELECTs on users, with the cache on
+and with it disabled (maxsize 0).
+
+    python -m benchmarks.bench_user_cache [--requests N]
+"""
+import argparse
+from benchmarks.common import use_temp_database
+
+use_temp_database()
+
+import time
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.database import async_engine
+from app.dependencies import user_cache
+from app.main import app
+
+user_selects = 0
+
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def count_user_selects(conn, cursor, statement, parameters, context, executemany):
+    global user_selects
+    if statement.lstrip().upper().startswith("SELECT") and "FROM users" in statement:
+        user_selects += 1
+
+
+def run(client, path, requests):
+    global user_selects
+    user_cache.clear()
+    user_cache.hits = user_cache.misses = 0
+    user_selects = 0
+    start = time.perf_counter()
+    for _ in range(requests):
+        assert client.get(path).status_code == 200
+    elapsed = time.perf_counter() - start
+    return requests / elapsed, user_selects, user_cache.stats()["hit_rate"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    with TestClient(app) as client:
+        client.post("/users/register", json={
+            "email": "bench@example.com", "username": "bench", "password": "password1"
+        })
+        token = client.post("/users/login", json={"username": "bench", "password": "password1"}).json()
+        client.headers["Authorization"] = f"Bearer {token['access_token']}"
+        entry = client.post("/entries/", json={"title": "Bench", "content": "A calm and happy day."}).json()
+        path = f"/entries/{entry['id']}/analysis"
+
+        maxsize = user_cache.maxsize
+        print(f"{'cache':>6} {'req/s':>8} {'user SELECTs':>13} {'hit rate':>9}")
+        for label, size in (("off", 0), ("on", maxsize)):
+            user_cache.maxsize = size
+            rate, selects, hit_rate = run(client, path, args.requests)
+            print(f"{label:>6} {rate:>8.0f} {selects:>13} {hit_rate:>9.3f}")
+        user_cache.maxsize = maxsize
+
+
+if __name__ == "__main__":
+    main()
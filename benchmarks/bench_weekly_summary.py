@@ -0,0 +1,80 @@
+"""
+Dashboard polling of GET /entries/weekly-summary: requests per second and
+SQL statements per request with the summary cache off (maxsize 0), on, and
+on with If-None-Match (304s), plus a mix where every tenth request follows
+a new entry.
+
+    python -m benchmarks.bench_weekly_summary [--entries 5000] [--requests 1000]
+"""
+import argparse
+from benchmarks.common import seed_entries, use_temp_database
+
+use_temp_database()
+
+import time
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.database import async_engine, engine
+from app.main import app
+from app.summaries import summary_cache
+
+statements = 0
+
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def count_statements(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements += 1
+
+
+def run(client, requests, conditional=False, write_every=0):
+    global statements
+    summary_cache.clear()
+    etag = None
+    elapsed = 0.0
+    reads = 0
+    for i in range(requests):
+        if write_every and i % write_every == 0:
+            assert client.post("/entries/", json={"title": "Poll", "content": "A good day."}).status_code == 200
+        headers = {"If-None-Match": etag} if conditional and etag else {}
+        before = statements
+        start = time.perf_counter()
+        response = client.get("/entries/weekly-summary", headers=headers)
+        elapsed += time.perf_counter() - start
+        reads += statements - before
+        assert response.status_code in (200, 304), response.text
+        etag = response.headers["etag"]
+    return requests / elapsed, reads / requests
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+
+    with TestClient(app) as client:
+        client.post("/users/register", json={
+            "email": "bench@example.com", "username": "bench", "password": "password1"
+        })
+        token = client.post("/users/login", json={"username": "bench", "password": "password1"}).json()
+        client.headers["Authorization"] = f"Bearer {token['access_token']}"
+        seed_entries(engine, 1, args.entries, days=30)
+
+        maxsize = summary_cache.maxsize
+        print(f"{args.entries} entries over 30 days")
+        print(f"{'mode':>18} {'req/s':>8} {'SQL/request':>12}")
+        for label, size, kwargs in (
+            ("cache off", 0, {}),
+            ("cache on", maxsize, {}),
+            ("cache on + 304", maxsize, {"conditional": True}),
+            ("1 write / 10", maxsize, {"conditional": True, "write_every": 10}),
+        ):
+            summary_cache.maxsize = size
+            rate, per_request = run(client, args.requests, **kwargs)
+            print(f"{label:>18} {rate:>8.0f} {per_request:>12.1f}")
+        summary_cache.maxsize = maxsize
+
+
+if __name__ == "__main__":
+    main()
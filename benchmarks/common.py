@@ -0,0 +1,90 @@
+"""
+Shared helpers for the benchmark scripts.
+
+use_temp_database() must run before anything from `app` is imported, since
+app.database creates its engine at import time.
+"""
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+EMOTION_NAMES = ("joy", "sadness", "anger", "fear", "surprise", "trust", "anticipation", "disgust")
+LABELS = ((0.3, "very positive"), (0.1, "positive"), (-0.1, "neutral"), (-0.3, "negative"))
+
+
+def use_temp_database(name: str = "bench.db") -> str:
+    """Point the app at a fresh SQLite file, returns its path"""
+    path = os.path.join(tempfile.mkdtemp(prefix="mindmate-bench-"), name)
+    os.environ["MINDMATE_DATABASE_URL"] = f"sqlite:///{path}"
+    return path
+
+
+def create_schema():
+    """
+    Create and migrate the database. The app only does it in its lifespan,
+    which httpx's ASGITransport doesn't run (TestClient used as a context
+    manager does)
+    """
+    from app.database import engine
+    from app.migrations import upgrade
+    upgrade(engine)
+
+
+def label_for(score: float) -> str:
+    for threshold, label in LABELS:
+        if score > threshold:
+            return label
+    return "very negative"
+
+
+def seed_entries(engine, user_id: int, count: int, days: int = 30, seed: int = 0, chunk: int = 5000):
+    """Insert `count` analyzed entries spread over the last `days` days"""
+    from app import models
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    rows = []
+    for i in range(count):
+        score = round(rng.uniform(-1, 1), 3)
+        row = {
+            "title": f"Entry {i}",
+            "content": "Lorem ipsum " * rng.randint(5, 80),
+            "sentiment_score": score,
+            "sentiment_label": label_for(score),
+            "subjectivity": round(rng.random(), 3),
+            "word_count": rng.randint(10, 160),
+            "analysis_status": "complete",
+            "created_at": now - timedelta(seconds=rng.uniform(0, days * 86400)),
+            "user_id": user_id,
+        }
+        for name in EMOTION_NAMES:
+            row[f"emotion_{name}"] = rng.choice((0.0, 0.0, 0.2, 0.4, 0.6, 1.0))
+        rows.append(row)
+        if len(rows) == chunk:
+            _insert(engine, models, rows)
+            rows = []
+    if rows:
+        _insert(engine, models, rows)
+
+    # Core inserts skip the ORM hook that maintains the daily rollups
+    from app import rollups
+    with engine.begin() as conn:
+        rollups.rebuild(conn, user_id)
+
+
+def _insert(engine, models, rows):
+    with engine.begin() as conn:
+        conn.execute(models.JournalEntry.__table__.insert(), rows)
+
+
+def timed(fn, repeat: int = 5):
+    """Best wall time of `repeat` runs (seconds) and the last result"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
@@ -0,0 +1,127 @@
+"""
+Deterministic synthetic journals for the benchmark suite: the same seed gives
+the same users, texts and timestamps (relative to `now`) on every machine.
+
+Entry lengths follow a log-normal distribution (median about 90 words, a
+long tail of multi-page entries, like real journals), sentences mix everyday
+topics with the analyzer's emotion vocabulary (app.AI.sentiment
+EMOTION_KEYWORDS) and TextBlob-scored adjectives, so every analysis stage
+has real work to do.
+"""
+import math
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+TOPICS = (
+    "work", "the project", "my sister", "my parents", "the kids", "the team", "dinner", "the weekend",
+    "the meeting", "my manager", "the gym", "a long walk", "the garden", "the train", "my friend",
+    "the deadline", "the doctor", "coffee", "the rain", "the holiday", "my partner", "the neighbours",
+)
+ADJECTIVES = (
+    "good", "bad", "calm", "tired", "busy", "quiet", "difficult", "easy", "beautiful", "boring",
+    "stressful", "peaceful", "strange", "perfect", "terrible", "nice", "hard", "fun", "slow", "long",
+)
+VERBS = ("talked about", "thought about", "worked on", "went to", "cooked", "argued about", "cleaned",
+         "planned", "finished", "started", "missed", "waited for", "laughed about", "remembered")
+TEMPLATES = (
+    "Today I {verb} {topic} and felt {emotion}.",
+    "{Topic} was {adjective}, I am {emotion} about it.",
+    "I {verb} {topic} this morning.",
+    "The day felt {adjective} and a bit {adjective2}.",
+    "Honestly I {feel} {emotion} when I {verb} {topic}.",
+    "Later I {verb} {topic}, which was {adjective}.",
+    "I look forward to {topic} tomorrow.",
+    "Not sure why, but {topic} made me {emotion}.",
+)
+FEEL = ("feel", "felt", "was", "get", "am")
+# Median words per entry, and the spread of log(words)
+MEDIAN_WORDS = 90
+WORDS_SIGMA = 0.7
+MAX_WORDS = 2000
+
+
+def _emotion_words() -> List[str]:
+    from app.AI.sentiment import EMOTION_KEYWORDS
+    return sorted({word for words in EMOTION_KEYWORDS.values() for word in words})
+
+
+class JournalGenerator:
+    def __init__(self, seed: int = 0):
+        self.rng = random.Random(seed)
+        self.emotions = _emotion_words()
+
+    def sentence(self) -> str:
+        rng = self.rng
+        topic = rng.choice(TOPICS)
+        return rng.choice(TEMPLATES).format(
+            verb=rng.choice(VERBS), topic=topic, Topic=topic[0].upper() + topic[1:],
+            emotion=rng.choice(self.emotions), adjective=rng.choice(ADJECTIVES),
+            adjective2=rng.choice(ADJECTIVES), feel=rng.choice(FEEL),
+        )
+
+    def word_count(self) -> int:
+        words = self.rng.lognormvariate(math.log(MEDIAN_WORDS), WORDS_SIGMA)
+        return max(5, min(MAX_WORDS, int(words)))
+
+    def text(self, words: Optional[int] = None) -> str:
+        target = self.word_count() if words is None else words
+        sentences, count = [], 0
+        while count < target:
+            sentence = self.sentence()
+            sentences.append(sentence)
+            count += sentence.count(" ") + 1
+        return " ".join(sentences)
+
+    def title(self) -> str:
+        return f"{self.rng.choice(ADJECTIVES).capitalize()} day, {self.rng.choice(TOPICS)}"
+
+    def texts(self, count: int) -> List[str]:
+        return [self.text() for _ in range(count)]
+
+    def entries(self, count: int, days: int = 90, now: Optional[datetime] = None) -> Iterator[Dict]:
+        """Entries (title, content, created_at) spread over the last `days` days"""
+        now = now or datetime.utcnow()
+        for _ in range(count):
+            yield {
+                "title": self.title(),
+                "content": self.text(),
+                "created_at": now - timedelta(seconds=self.rng.uniform(0, days * 86400)),
+            }
+
+    def users(self, count: int, prefix: str = "bench") -> List[Dict[str, str]]:
+        return [
+            {"email": f"{prefix}{i}@example.com", "username": f"{prefix}{i}", "password": "password1"}
+            for i in range(count)
+        ]
+
+
+def seed_journal(engine, user_id: int, count: int, days: int = 90, seed: int = 0, chunk: int = 1000) -> int:
+    """
+    Insert `count` analyzed entries for a user (the real analyzer runs on
+    every text, so sentiment, emotions and key phrases are consistent with
+    the content), then rebuild the user's daily rollups. Returns the count
+    """
+    from app import models, rollups
+    from app.AI.sentiment import analyze_sentiment_advanced
+    from app.analysis import analysis_columns
+
+    generator = JournalGenerator(seed)
+    rows = []
+    for entry in generator.entries(count, days):
+        rows.append({**entry, **analysis_columns(analyze_sentiment_advanced(entry["content"])), "user_id": user_id})
+        if len(rows) == chunk:
+            _insert(engine, models, rows)
+            rows = []
+    if rows:
+        _insert(engine, models, rows)
+
+    # Core inserts skip the ORM hook that maintains the daily rollups
+    with engine.begin() as conn:
+        rollups.rebuild(conn, user_id)
+    return count
+
+
+def _insert(engine, models, rows):
+    with engine.begin() as conn:
+        conn.execute(models.JournalEntry.__table__.insert(), rows)
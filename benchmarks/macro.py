@@ -0,0 +1,227 @@
+"""
+Macro-benchmarks: every route of the app, through ASGI (TestClient, so the
+lifespan runs), against a temp SQLite database holding a generated journal.
+The routes are called in turns, --rounds times --iterations calls each, and
+a route's time is its best round's median: a burst of load on the machine
+spoils a round, not the result. Anything a call needs that would skew the
+timing (a fresh entry to delete, say) is prepared untimed, and writes go to
+a second user so the journal the reads see stays the same size. Fails if a
+route in the OpenAPI schema has no sample below.
+
+Run as part of the suite (python -m benchmarks.suite), or alone:
+
+    python -m benchmarks.macro [--quick]
+
+The database must be chosen before app is imported: call
+benchmarks.common.use_temp_database() first.
+"""
+import argparse
+import contextlib
+import gc
+import io
+import itertools
+import json
+import os
+import statistics
+import time
+from typing import Callable, Dict, List, Optional
+
+# Background work would run into the timings; the admin routes stay out
+os.environ["MINDMATE_SUMMARY_SCHEDULER"] = "0"
+os.environ["MINDMATE_PROFILING"] = "0"
+
+PASSWORD = "password1"
+
+
+class Sample:
+    """
+    One route's benchmark: prepare(ctx, i) returns the request's keyword
+    arguments (path params already filled in), untimed; i numbers the calls
+    of a run
+    """
+
+    def __init__(self, method: str, path: str, prepare: Optional[Callable] = None,
+                 status: int = 200, iterations: float = 1.0, optional: bool = False):
+        self.method = method
+        self.path = path
+        self.prepare = prepare or (lambda ctx, i: {})
+        self.status = status
+        # Relative to --iterations, for routes that hash passwords or move a lot of data
+        self.iterations = iterations
+        # Skipped when the app doesn't mount it (404), e.g. /metrics when disabled
+        self.optional = optional
+
+    @property
+    def name(self) -> str:
+        return f"macro.{self.method} {self.path}"
+
+
+def _new_entry(ctx, i):
+    entry = ctx.client.post(
+        "/entries/", json={"title": "Temp", "content": ctx.generator.text()}, headers=ctx.scratch
+    ).json()
+    return {"entry_id": entry["id"], "headers": ctx.scratch}
+
+
+SAMPLES = [
+    Sample("GET", "/"),
+    Sample("GET", "/health"),
+    Sample("GET", "/ready"),
+    Sample("GET", "/metrics", optional=True),
+    Sample("POST", "/users/register", lambda ctx, i: {"json": {
+        "email": f"new{ctx.run}-{i}@example.com", "username": f"new{ctx.run}-{i}", "password": PASSWORD
+    }}, iterations=0.2),
+    Sample("POST", "/users/login", lambda ctx, i: {"json": {
+        "username": ctx.username, "password": PASSWORD
+    }}, iterations=0.2),
+    Sample("POST", "/users/refresh", lambda ctx, i: {"json": {"refresh_token": ctx.refresh_token}}),
+    Sample("POST", "/users/password-reset-request", lambda ctx, i: {"json": {"email": ctx.email}}),
+    Sample("POST", "/users/password-reset", lambda ctx, i: {"json": {
+        "token": "not-a-token", "new_password": "password2"
+    }}, status=400),
+    Sample("GET", "/users/me"),
+    Sample("POST", "/users/logout"),
+    Sample("POST", "/entries/", lambda ctx, i: {
+        "json": {"title": "New", "content": ctx.generator.text()}, "headers": ctx.scratch
+    }),
+    Sample("POST", "/entries/bulk", lambda ctx, i: {"headers": ctx.scratch, "content": "".join(
+        json.dumps({"title": entry["title"], "content": entry["content"],
+                    "created_at": entry["created_at"].isoformat() + "Z"}) + "\n"
+        for entry in ctx.generator.entries(50)
+    )}, iterations=0.3),
+    Sample("GET", "/entries/", lambda ctx, i: {"params": {"limit": 20}}),
+    Sample("GET", "/entries/search", lambda ctx, i: {"params": {"q": ctx.generator.rng.choice(ctx.search_terms)}}),
+    Sample("GET", "/entries/export", iterations=0.3),
+    Sample("GET", "/entries/{entry_id}", lambda ctx, i: {"entry_id": ctx.entry_id}),
+    Sample("PUT", "/entries/{entry_id}", lambda ctx, i: {
+        "entry_id": ctx.scratch_entry_id, "json": {"content": ctx.generator.text()}, "headers": ctx.scratch
+    }),
+    Sample("DELETE", "/entries/{entry_id}", _new_entry),
+    Sample("GET", "/entries/{entry_id}/analysis", lambda ctx, i: {"entry_id": ctx.entry_id}),
+    Sample("GET", "/entries/weekly-summary"),
+    Sample("GET", "/entries/emotion-trends", lambda ctx, i: {"params": {"days": 30}}),
+    Sample("GET", "/entries/trends", lambda ctx, i: {"params": {"bucket": "week", "window": 12}}),
+]
+
+
+class Context:
+    def __init__(self, client, generator, user, tokens, entry_id, scratch, scratch_entry_id):
+        self.client = client
+        self.generator = generator
+        self.username = user["username"]
+        self.email = user["email"]
+        self.refresh_token = tokens["refresh_token"]
+        self.entry_id = entry_id
+        # Authorization headers of the user that writes go to, and its entry
+        self.scratch = scratch
+        self.scratch_entry_id = scratch_entry_id
+        self.search_terms = ["walk", "work", "happy", "sister deadline", '"long walk"', "anx*"]
+        self.run = time.time_ns()
+        self.calls = itertools.count()
+
+
+def _login(client, user) -> dict:
+    client.post("/users/register", json=user)
+    return client.post("/users/login", json={"username": user["username"], "password": PASSWORD}).json()
+
+
+def route_keys(app) -> set:
+    """(METHOD, path) of every route in the OpenAPI schema"""
+    return {(method.upper(), path) for path, operations in app.openapi()["paths"].items() for method in operations}
+
+
+def run(quick: bool = False, rounds: Optional[int] = None, iterations: Optional[int] = None,
+        entries: Optional[int] = None, seed: int = 0) -> Dict[str, Dict[str, float]]:
+    from fastapi.testclient import TestClient
+    from app.database import engine
+    from app.main import app
+    from benchmarks.generator import JournalGenerator, seed_journal
+
+    missing = route_keys(app) - {(sample.method, sample.path) for sample in SAMPLES}
+    if missing:
+        raise SystemExit("no macro-benchmark for: " + ", ".join(f"{m} {p}" for m, p in sorted(missing)))
+
+    rounds = rounds or (2 if quick else 5)
+    iterations = iterations or (3 if quick else 10)
+    generator = JournalGenerator(seed)
+    user, scratch_user = generator.users(2)
+    with TestClient(app) as client:
+        tokens = _login(client, user)
+        client.headers["Authorization"] = f"Bearer {tokens['access_token']}"
+        user_id = client.get("/users/me").json()["id"]
+        seed_journal(engine, user_id, entries or (300 if quick else 2000), days=90, seed=seed)
+        entry_id = client.get("/entries/", params={"limit": 1}).json()[0]["id"]
+
+        scratch = {"Authorization": f"Bearer {_login(client, scratch_user)['access_token']}"}
+        scratch_entry_id = client.post(
+            "/entries/", json={"title": "Scratch", "content": generator.text()}, headers=scratch
+        ).json()["id"]
+        while client.get("/ready").status_code != 200:
+            time.sleep(0.01)
+
+        ctx = Context(client, generator, user, tokens, entry_id, scratch, scratch_entry_id)
+        samples = [sample for sample in SAMPLES if _warm_up(ctx, sample)]
+        timings = {sample.name: [] for sample in samples}
+        for _ in range(rounds):
+            for sample in samples:
+                timings[sample.name].append(_time_sample(ctx, sample, max(1, round(iterations * sample.iterations))))
+
+    results = {}
+    for name, per_round in timings.items():
+        calls = sorted(us for round_calls in per_round for us in round_calls)
+        results[name] = {
+            "best_us": min(statistics.median(round_calls) for round_calls in per_round),
+            "p95_us": calls[min(len(calls) - 1, int(len(calls) * 0.95))],
+            "calls": len(calls),
+        }
+    return results
+
+
+def _call(ctx, sample: Sample):
+    """One call, returns (response, seconds)"""
+    kwargs = sample.prepare(ctx, next(ctx.calls))
+    path = sample.path.format(**{key: kwargs.pop(key) for key in ("entry_id",) if key in kwargs})
+    # Reset tokens are printed in development; keep them out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        response = ctx.client.request(sample.method, path, **kwargs)
+        elapsed = time.perf_counter() - start
+    if response.status_code != sample.status:
+        raise SystemExit(f"{sample.method} {path}: HTTP {response.status_code} {response.text[:200]}")
+    return response, elapsed
+
+
+def _warm_up(ctx, sample: Sample) -> bool:
+    """Call the route once, False for an optional route the app doesn't mount"""
+    if sample.optional and ctx.client.request(sample.method, sample.path).status_code == 404:
+        return False
+    _call(ctx, sample)
+    return True
+
+
+def _time_sample(ctx, sample: Sample, iterations: int) -> List[float]:
+    """Microseconds per call; the garbage collector waits until the round is over, as in timeit"""
+    gc.collect()
+    gc.disable()
+    try:
+        return [_call(ctx, sample)[1] * 1e6 for _ in range(iterations)]
+    finally:
+        gc.enable()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--rounds", type=int)
+    parser.add_argument("--iterations", type=int, help="calls per route and round")
+    parser.add_argument("--entries", type=int)
+    args = parser.parse_args()
+
+    from benchmarks.common import use_temp_database
+    use_temp_database()
+    for name, stats in run(args.quick, args.rounds, args.iterations, args.entries).items():
+        print(f"{name:>40} {stats['best_us'] / 1e3:>9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
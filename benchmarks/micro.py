@@ -0,0 +1,84 @@
+"""
+Micro-benchmarks for the analysis functions, on a generated corpus: each
+function runs over the corpus in rounds of at least MIN_ROUND_SECONDS (as in
+timeit's autorange, with the garbage collector paused) and the result is the
+best round's time per call, plus the p95 across rounds.
+
+Run as part of the suite (python -m benchmarks.suite), or alone:
+
+    python -m benchmarks.micro [--quick]
+"""
+import argparse
+import gc
+import math
+import time
+from typing import Callable, Dict, List
+from benchmarks.generator import JournalGenerator
+
+# A round shorter than this is at the mercy of a single burst of load
+MIN_ROUND_SECONDS = 0.05
+
+
+def _pass_seconds(fn: Callable, inputs: List, passes: int) -> float:
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(passes):
+            for value in inputs:
+                fn(value)
+        return time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def _per_call_us(fn: Callable, inputs: List, rounds: int) -> Dict[str, float]:
+    # The first pass also warms imports and lazy caches
+    passes = max(1, math.ceil(MIN_ROUND_SECONDS / _pass_seconds(fn, inputs, 1)))
+    samples = sorted(
+        _pass_seconds(fn, inputs, passes) / (passes * len(inputs)) * 1e6 for _ in range(rounds)
+    )
+    return {
+        "best_us": samples[0],
+        "p95_us": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "calls": len(inputs) * passes * rounds,
+    }
+
+
+def run(quick: bool = False, seed: int = 0) -> Dict[str, Dict[str, float]]:
+    from app.AI.sentiment import (
+        analyze_emotion_trends, analyze_sentiment_advanced, detect_emotions, extract_key_phrases
+    )
+    from app.AI.summarizer import generate_weekly_summary
+
+    generator = JournalGenerator(seed)
+    texts = generator.texts(100 if quick else 500)
+    rounds = 3 if quick else 7
+
+    # Analyzed entries, as the summary and trend functions receive them
+    analyzed = [
+        {**analyze_sentiment_advanced(entry["content"]), "created_at": entry["created_at"].isoformat()}
+        for entry in generator.entries(len(texts), days=7)
+    ]
+    weeks = [analyzed[i:i + 20] for i in range(0, len(analyzed), 20)]
+    months = [sorted(analyzed[i:i + 100], key=lambda e: e["created_at"]) for i in range(0, len(analyzed), 100)]
+
+    return {
+        "micro.analyze_sentiment_advanced": _per_call_us(analyze_sentiment_advanced, texts, rounds),
+        "micro.detect_emotions": _per_call_us(detect_emotions, texts, rounds),
+        "micro.extract_key_phrases": _per_call_us(extract_key_phrases, texts, rounds),
+        "micro.generate_weekly_summary[20]": _per_call_us(generate_weekly_summary, weeks, rounds),
+        "micro.analyze_emotion_trends[100]": _per_call_us(analyze_emotion_trends, months, rounds),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--quick", action="store_true")
+    args = parser.parse_args()
+    for name, stats in run(args.quick).items():
+        print(f"{name:>40} {stats['best_us']:>10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+The benchmark suite: micro-benchmarks of the analysis functions and
+macro-benchmarks of every route (see benchmarks.micro and benchmarks.macro),
+on deterministic generated data (benchmarks.generator).
+
+Results are written as JSON to benchmarks/results/ and compared with a
+baseline; a benchmark whose best time is more than --threshold slower than
+the baseline's (and by more than --min-delta-us) is a regression, and the run
+exits with status 1. Timings depend on the machine, so the baseline is not
+checked in: record it on the machine that compares against it. A baseline
+from another machine or --quick setting isn't compared at all (status 2).
+
+    python -m benchmarks.suite --save-baseline     # on the main branch
+    python -m benchmarks.suite                     # on your branch
+
+String hashing moves the analysis timings by up to a third from one process
+to the next (set and cache layouts), so the suite re-runs itself with a
+fixed PYTHONHASHSEED.
+
+Other options: --quick (fewer iterations and a smaller journal),
+--only micro|macro, --baseline PATH, --output PATH.
+"""
+import os
+import sys
+
+HASH_SEED = "0"
+
+if __name__ == "__main__" and os.environ.get("PYTHONHASHSEED") != HASH_SEED:
+    os.execve(sys.executable, [sys.executable, "-m", "benchmarks.suite", *sys.argv[1:]],
+              {**os.environ, "PYTHONHASHSEED": HASH_SEED})
+
+import argparse
+from benchmarks.common import use_temp_database
+
+use_temp_database()
+
+import json
+import platform
+import sqlite3
+import subprocess
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from benchmarks import macro, micro
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+RESULTS_DIR = os.path.join(HERE, "results")
+FORMAT_VERSION = 1
+# Environment fields that must match the baseline's for timings to compare
+COMPARABLE_FIELDS = ("machine", "quick")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment(quick: bool) -> Dict[str, object]:
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "machine": platform.node(),
+        "hash_seed": os.environ.get("PYTHONHASHSEED"),
+        "quick": quick,
+    }
+
+
+def incompatibilities(baseline_env: Dict[str, object], env: Dict[str, object]) -> List[str]:
+    return [
+        f"{field} {baseline_env.get(field)!r} (now {env[field]!r})"
+        for field in COMPARABLE_FIELDS if baseline_env.get(field) != env[field]
+    ]
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float,
+            min_delta_us: float) -> List[Tuple[str, Optional[float], float, Optional[float], bool]]:
+    """(name, baseline time, time, change, regressed) per benchmark"""
+    rows = []
+    for name, stats in results.items():
+        us = stats["best_us"]
+        old = baseline.get(name, {}).get("best_us")
+        if old is None:
+            rows.append((name, None, us, None, False))
+            continue
+        change = (us - old) / old if old else 0.0
+        rows.append((name, old, us, change, change > threshold and us - old > min_delta_us))
+    return rows
+
+
+def _format_us(us: Optional[float]) -> str:
+    if us is None:
+        return "-"
+    return f"{us / 1e3:.2f} ms" if us >= 1000 else f"{us:.1f} us"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and compare with a baseline")
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--only", choices=["micro", "macro"])
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<time>.json)")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, as a fraction")
+    parser.add_argument("--min-delta-us", type=float, default=5.0, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    results = {}
+    if args.only in (None, "micro"):
+        results.update(micro.run(args.quick))
+    if args.only in (None, "macro"):
+        results.update(macro.run(args.quick))
+    env = environment(args.quick)
+    report = {"format": FORMAT_VERSION, "environment": env, "results": results}
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ") + ".json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results: {output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline: {args.baseline}")
+        return
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        mismatches = incompatibilities(stored["environment"], env)
+        if mismatches:
+            print(f"Not comparing with {args.baseline}, it was recorded with {', '.join(mismatches)}. "
+                  "Record a baseline here with --save-baseline", file=sys.stderr)
+            sys.exit(2)
+        baseline = stored["results"]
+    else:
+        print(f"No baseline at {args.baseline}, nothing to compare with (see --save-baseline)")
+
+    rows = compare(results, baseline, args.threshold, args.min_delta_us)
+    print(f"{'benchmark':<42} {'baseline':>10} {'now':>10} {'change':>8}")
+    for name, old, us, change, regressed in rows:
+        change_text = "new" if change is None else f"{change:+.1%}"
+        print(f"{name:<42} {_format_us(old):>10} {_format_us(us):>10} {change_text:>8}"
+              + ("  REGRESSION" if regressed else ""))
+    regressions = [row[0] for row in rows if row[4]]
+    if regressions:
+        sys.exit(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# check_profile_queries.py
+"""
+Regression check for GET /users/me: the number of SQL statements and the size
+of the response must not depend on how many entries the user has (also with
+include_entries, which is capped by entries_limit). Exits with status 1 if
+they do.
+
+    python check_profile_queries.py
+"""
+import json
+import os
+import sys
+import tempfile
+
+tmp_dir = tempfile.mkdtemp()
+os.environ["MINDMATE_DATABASE_URL"] = f"sqlite:///{os.path.join(tmp_dir, 'profile.db')}"
+
+from datetime import datetime, timedelta, timezone
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.database import async_engine, engine
+from app.main import app
+
+ENTRY_COUNTS = (0, 10, 1000)
+# Digits of entry_count and a null vs. set last_entry_at may differ
+SIZE_TOLERANCE = 32
+
+statements = []
+
+
+@event.listens_for(engine, "before_cursor_execute")
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def capture(conn, cursor, statement, parameters, context, executemany):
+    statements.append(statement)
+
+
+def measure(client, params):
+    client.get("/users/me", params=params)  # warm the user cache
+    statements.clear()
+    response = client.get("/users/me", params=params)
+    assert response.status_code == 200, response.text
+    return len(statements), len(response.content)
+
+
+def main():
+    results = {}
+    with TestClient(app) as client:
+        for count in ENTRY_COUNTS:
+            username = f"profile{count:05d}"
+            client.post("/users/register", json={
+                "email": f"{username}@example.com", "username": username, "password": "password1"
+            })
+            token = client.post("/users/login", json={"username": username, "password": "password1"}).json()
+            client.headers["Authorization"] = f"Bearer {token['access_token']}"
+            now = datetime.now(timezone.utc)
+            body = "\n".join(
+                json.dumps({"title": f"Entry {i}", "content": "A calm day.",
+                            "created_at": (now - timedelta(hours=i)).isoformat()})
+                for i in range(count)
+            )
+            if count:
+                client.post("/entries/bulk", content=body.encode("utf-8"))
+            results[count] = {
+                "profile": measure(client, {}),
+                "with entries": measure(client, {"include_entries": "true", "entries_limit": 5}),
+            }
+
+    failures = []
+    for variant in ("profile", "with entries"):
+        # A user with no entries has nothing to embed, compare the others
+        counts = [count for count in ENTRY_COUNTS if count or variant == "profile"]
+        queries = {count: results[count][variant][0] for count in counts}
+        sizes = {count: results[count][variant][1] for count in counts}
+        print(f"{variant:>12}: queries {queries}, bytes {sizes}")
+        if len(set(queries.values())) > 1:
+            failures.append(f"{variant}: query count depends on the number of entries")
+        if max(sizes.values()) - min(sizes.values()) > SIZE_TOLERANCE:
+            failures.append(f"{variant}: response size depends on the number of entries")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+# check_query_plans.py
+"""
+Runs every API route against a throwaway database and checks the SQLite
+query plan of each statement the routes execute. Every table a statement
+reads must be a SEARCH through an index or the rowid; anything else (a SCAN,
+even one USING an index, or an automatic index) needs an ALLOWED_SCANS entry.
+Exits with status 1 on any other scan, or when a route has no sample request
+below (so new routes can't skip the check).
+
+    python check_query_plans.py
+"""
+import os
+import re
+import sys
+import tempfile
+
+tmp_dir = tempfile.mkdtemp()
+os.environ["MINDMATE_DATABASE_URL"] = f"sqlite:///{os.path.join(tmp_dir, 'plans.db')}"
+
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.database import async_engine, engine
+from app.main import app
+
+# (method, path template, request kwargs) - {entry_id} is filled in below
+SAMPLE_REQUESTS = [
+    ("POST", "/entries/", {"json": {"title": "Plan", "content": "I feel happy and hopeful today."}}),
+    ("POST", "/entries/bulk", {"content": b'{"title": "Bulk", "content": "A calm day."}\n'
+                                          b'{"title": "Old", "content": "Sad.", "created_at": "2024-01-01T08:00:00Z"}\n'}),
+    ("GET", "/entries/", {}),
+    ("GET", "/entries/", {"params": {"limit": 2, "view": "summary"}}),
+    ("GET", "/entries/", {"params": {"limit": 2, "cursor": "{cursor}", "since": "2000-01-01T00:00:00"}}),
+    ("GET", "/entries/export", {}),
+    ("GET", "/entries/export", {"params": {"format": "csv", "gzip": "true"}}),
+    ("GET", "/entries/{entry_id}", {}),
+    ("GET", "/entries/{entry_id}/analysis", {}),
+    ("PUT", "/entries/{entry_id}", {"json": {"content": "Now I am worried and sad."}}),
+    ("GET", "/entries/weekly-summary", {}),
+    ("GET", "/entries/emotion-trends", {"params": {"days": 30}}),
+    ("GET", "/entries/search", {"params": {"q": "good day", "limit": 2}}),
+    ("GET", "/entries/search", {"params": {"q": "seed*", "since": "2020-01-01T00:00:00", "sentiment_label": "positive"}}),
+    ("GET", "/entries/trends", {}),
+    ("GET", "/entries/trends", {"params": {"bucket": "week", "tz": "America/New_York", "window": 12}}),
+    ("DELETE", "/entries/{entry_id}", {}),
+    ("GET", "/users/me", {}),
+    ("GET", "/users/me", {"params": {"include_entries": "true", "entries_limit": 5}}),
+    ("POST", "/users/refresh", {"json": {"refresh_token": "{refresh_token}"}}),
+    ("POST", "/users/password-reset-request", {"json": {"email": "plans@example.com"}}),
+    ("POST", "/users/password-reset", {"json": {"token": "not-a-token", "new_password": "password2"}}),
+    ("POST", "/users/logout", {}),
+]
+# Called by the setup below
+SETUP_ROUTES = {("POST", "/users/register"), ("POST", "/users/login")}
+
+# (statement prefix, plan row): why the scan is intended. The prefix is of
+# the statement with its whitespace collapsed, as the failure message prints it
+ALLOWED_SCANS = {
+    ("SELECT e.id, e.title, e.created_at, e.sentiment_score, e.sentiment_label, "
+     "snippet(journal_entries_fts,", "SCAN journal_entries_fts VIRTUAL TABLE INDEX 0:M4"):
+        "FTS5 answers MATCH from its full-text index, the plan shows it as a virtual table scan",
+}
+
+ACCESS_RE = re.compile(r"^(SCAN|SEARCH) (\(subquery-\d+\)|\d+ CONSTANT ROWS?|CONSTANT ROW|\S+)(.*)")
+INDEX_SEARCH_RE = re.compile(r"^ USING (?:COVERING INDEX|INDEX|INTEGER PRIMARY KEY|PRIMARY KEY) ")
+# Subqueries and CTEs are named in the plan before they are read
+DERIVED_RE = re.compile(r"^(?:CO-ROUTINE|MATERIALIZE) (.+)$")
+
+statements = []
+
+
+# The routes run on the async engine, the analysis workers on the sync one
+@event.listens_for(engine, "before_cursor_execute")
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def capture(conn, cursor, statement, parameters, context, executemany):
+    if not executemany and statement.lstrip().upper().startswith(("SELECT", "WITH", "UPDATE", "DELETE")):
+        statements.append((statement, parameters))
+
+
+def table_scans(conn, statement, parameters):
+    """Plan rows that read a table (or its alias) other than by an index search"""
+    plan = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+    derived = {match.group(1) for match in map(DERIVED_RE.match, plan) if match}
+    normalized = " ".join(statement.split())
+    scans = []
+    for detail in plan:
+        match = ACCESS_RE.match(detail)
+        if not match:
+            continue
+        kind, name, rest = match.groups()
+        if name in derived or name.startswith("(subquery-") or "CONSTANT ROW" in name:
+            continue  # not a table
+        if kind == "SEARCH" and INDEX_SEARCH_RE.match(rest):
+            continue
+        if any(normalized.startswith(prefix) and detail == row for prefix, row in ALLOWED_SCANS):
+            continue
+        scans.append(detail)
+    return scans
+
+
+def fill(value, values):
+    if isinstance(value, str):
+        return value.format(**values)
+    if isinstance(value, dict):
+        return {k: fill(v, values) for k, v in value.items()}
+    return value
+
+
+def main():
+    with TestClient(app) as client:
+        client.post("/users/register", json={
+            "email": "plans@example.com", "username": "plans", "password": "password1"
+        })
+        tokens = client.post("/users/login", json={"username": "plans", "password": "password1"}).json()
+        client.headers["Authorization"] = f"Bearer {tokens['access_token']}"
+        for i in range(5):
+            client.post("/entries/", json={"title": f"Seed {i}", "content": f"Seed entry number {i}, a good day."})
+        cursor = client.get("/entries/", params={"limit": 2}).headers["X-Next-Cursor"]
+
+        values = {"refresh_token": tokens["refresh_token"], "cursor": cursor}
+        covered = set(SETUP_ROUTES)
+        statements.clear()
+        for method, path, kwargs in SAMPLE_REQUESTS:
+            if "{entry_id}" in path:
+                values["entry_id"] = client.post("/entries/", json={"title": "Tmp", "content": "Temporary."}).json()["id"]
+            response = client.request(method, fill(path, values), **fill(kwargs, values))
+            if response.status_code >= 500:
+                print(f"FAIL {method} {path}: HTTP {response.status_code}")
+                return 1
+            covered.add((method, path))
+
+    failures = []
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.include_in_schema:
+            for method in route.methods:
+                path = route.path.replace("{entry_id:int}", "{entry_id}")
+                if (method, path) not in covered and path.startswith(("/entries", "/users")):
+                    failures.append(f"no sample request for {method} {route.path}")
+
+    seen = set()
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            if statement in seen:
+                continue
+            seen.add(statement)
+            for scan in table_scans(conn, statement, parameters):
+                failures.append(f"{scan}\n    {' '.join(statement.split())}")
+
+    print(f"Checked {len(seen)} distinct statements")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())